@@ -1,25 +1,94 @@
-from typing import Callable, Any
+from typing import Callable, Any, Optional
 import asyncio
+import time
 from chatty_config import NUM_INCOMING_AUDIO_BUFFERS
+from chatty_debug import trace
+
+
+class MailboxQueue(asyncio.Queue):
+    """ asyncio.Queue that wakes the AsyncMailbox it is attached to whenever an item is put.
+    Behaves exactly like asyncio.Queue for producers (put, put_nowait) and for plain consumers. """
+    def __init__(self, maxsize: int = 0):
+        super().__init__(maxsize)
+        self._mailbox: Optional['AsyncMailbox'] = None
+
+    def _put(self, item):
+        super()._put(item)
+        if self._mailbox is not None:
+            self._mailbox._wake()
+
+
+class AsyncMailbox:
+    """ One awaitable over several MailboxQueues, delivered in priority order (first source wins).
+    No tasks are created per call: when items are waiting get() returns immediately, otherwise it
+    parks on a single future that the queues resolve on put.  One consumer per mailbox, and a queue
+    belongs to at most one mailbox - it has one wakeup slot. """
+    def __init__(self, sources: list[tuple[str, MailboxQueue]]):
+        self._sources = list(sources)
+        self._waiter: Optional[asyncio.Future] = None
+        for name, queue in self._sources:
+            if queue._mailbox is not None:
+                # a second mailbox would silently take the first one's wakeups
+                raise RuntimeError(f"queue '{name}' is already attached to another AsyncMailbox")
+        for _, queue in self._sources:
+            queue._mailbox = self
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def pending(self) -> int:
+        """ total items waiting across all sources """
+        return sum(queue.qsize() for _, queue in self._sources)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[tuple[str, Any]]:
+        """ return (source_name, item) from the highest-priority non-empty source, or None on timeout """
+        while True:
+            for name, queue in self._sources:
+                if not queue.empty():
+                    return (name, queue.get_nowait())
+
+            if self._waiter is not None:
+                raise RuntimeError("AsyncMailbox supports a single consumer")
+
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._waiter = waiter
+            timer = loop.call_later(timeout, self._wake) if timeout is not None else None
+            try:
+                await waiter
+            finally:
+                self._waiter = None
+                if timer is not None:
+                    timer.cancel()
+
+            if timer is not None and not any(not queue.empty() for _, queue in self._sources):
+                # woken by the timer (or a put that was already consumed elsewhere)
+                return None
+
 
 class AsyncManager:
     """ Context for an async task.  manages an input queue for incoming work, an output queue for results that go to the next worker and
     a command queue for external control of the task.  Passed to the task as a parameter when kicked off"""
-    def __init__(self, name: str, task_function: Callable, input_q: asyncio.Queue[bytes] = None, kwargs: dict = {}):
+    def __init__(self, name: str, task_function: Callable, input_q: MailboxQueue = None, kwargs: dict = {}):
         self.name = name
         self.task_function = task_function
 
         # management commands to the task
-        self.command_q :asyncio.Queue[str] = asyncio.Queue()
+        self.command_q :MailboxQueue[str] = MailboxQueue()
 
         # events raised from the task
-        self.event_q :asyncio.Queue[str] = asyncio.Queue()
+        self.event_q :MailboxQueue[str] = MailboxQueue()
 
         # input and output buffers.  Create the output queue but use an
         # incoming input queue from another manager if provided.
         # override buffer size for speaker to handle long incoming audio streams
-        self.output_q :asyncio.Queue[Any] = asyncio.Queue(maxsize=100 if name != "speaker" else NUM_INCOMING_AUDIO_BUFFERS)
-        self.input_q :asyncio.Queue[Any] = input_q if input_q else asyncio.Queue(maxsize=2000)
+        self.output_q :MailboxQueue[Any] = MailboxQueue(maxsize=100 if name != "speaker" else NUM_INCOMING_AUDIO_BUFFERS)
+        self.input_q :MailboxQueue[Any] = input_q if input_q else MailboxQueue(maxsize=2000)
+
+        # commands take priority over input
+        self.mailbox = AsyncMailbox([("command", self.command_q), ("input", self.input_q)])
 
         # allow arbitrary kwargs
         self.kwargs = kwargs
@@ -34,33 +103,119 @@ class AsyncManager:
     async def wait_for_done(self):
         await self.task
 
-    async def wait_and_dispatch(self) -> list[tuple[str, Any]]:
-        # wait on the input queue and the command queue.  return the first one that completes.
-        command_task = asyncio.create_task(self.command_q.get())
-        input_task = asyncio.create_task(self.input_q.get())
+    async def wait_and_dispatch(self, timeout: float = 1) -> list[tuple[str, Any]]:
+        # wait on the command queue and the input queue (commands first).  returns [] on timeout.
+        try:
+            result = await self.mailbox.get(timeout=timeout)
+        except RuntimeError as e:
+            print(f"❌ Error in {self.name} queue: {e}")
+            return []
+
+        return [result] if result is not None else []
+
+
+class EventDispatcher:
+    """ Long-lived merge of the managers' event queues and a remote reader (the assistant websocket) into one stream.
+    The reader is a dedicated task that owns recv() for the life of the connection, so no receive is ever cancelled
+    mid-message.  Anything the reader raises (e.g. ConnectionClosed) is delivered in order as an item; the consumer
+    re-raises it.  Keeps per-source counts, throughput and queue depth for diagnostics.
+    taps divert reader messages that carry a marker near their start (e.g. audio deltas) straight to another
+    queue, so a stream that must keep flowing never waits behind the consumer's other work. """
+    STATS_LOG_INTERVAL_SECONDS = 60
+    TAP_MARKER_SPAN = 256  # markers are matched in this many leading characters
+
+    def __init__(self, managers: dict[str, 'AsyncManager'], reader_name: str = "assistant",
+                 taps: list[tuple[str, MailboxQueue]] = ()):
+        self.reader_name = reader_name
+        self.reader_q: MailboxQueue[Any] = MailboxQueue()
+        self._reader_source = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._taps = list(taps)
+        self.tapped = 0
+
+        # local events (wake word, barge-in) are rare and latency critical - they go ahead of the remote stream
+        sources = [(name, manager.event_q) for name, manager in managers.items()] + [(reader_name, self.reader_q)]
+        self._queues = dict(sources)
+        self.mailbox = AsyncMailbox(sources)
+
+        self.start_time = time.time()
+        self.last_stats_log_time = self.start_time
+        self.stale_dropped = 0
+        self.counts = {name: 0 for name in self._queues}
+        self.max_depth = {name: 0 for name in self._queues}
+
+    def attach_reader(self, source):
+        """ read from source (anything with an async recv()) until it fails.  None detaches.  No-op if unchanged. """
+        if source is self._reader_source:
+            return
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        # anything still queued belongs to the previous connection
+        while not self.reader_q.empty():
+            self.reader_q.get_nowait()
+            self.stale_dropped += 1
+        self._reader_source = source
+        if source is not None:
+            self._reader_task = asyncio.create_task(self._reader(source), name=self.reader_name+"_reader")
 
-        # Wait for the first task to complete (i.e., get an item from either queue)
-        done, pending = await asyncio.wait(
-            [command_task, input_task],
-            return_when=asyncio.FIRST_COMPLETED, 
-            timeout = 1
-        )
+    async def _reader(self, source):
+        try:
+            while True:
+                message = await source.recv()
+                for marker, queue in self._taps:
+                    if isinstance(message, str) and message.find(marker, 0, self.TAP_MARKER_SPAN) >= 0:
+                        # backpressure lands on the reader, never on the tapped stream's order
+                        await queue.put(message)
+                        self.tapped += 1
+                        break
+                else:
+                    self.reader_q.put_nowait(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # hand the failure to the consumer, after everything received before it
+            trace("dispatch", f"{self.reader_name} reader stopped: {type(e).__name__}")
+            self.reader_q.put_nowait(e)
 
-        # Process the result from the completed task
-        results = []
-        for task in done:
-            task_exception = task.exception()
-            if task_exception:
-                print(f"❌ Error in {self.name} queue: {task_exception}")
+    async def get(self, timeout: Optional[float] = None) -> Optional[tuple[str, Any]]:
+        """ next (source_name, item), or None on timeout.  items from the reader may be exceptions. """
+        result = await self.mailbox.get(timeout=timeout)
+        if result is not None:
+            name = result[0]
+            self.counts[name] += 1
+            depth = self._queues[name].qsize()
+            if depth > self.max_depth[name]:
+                self.max_depth[name] = depth
 
-            if task is command_task:
-                results.append(("command", task.result()))
-            elif task is input_task:
-                results.append(("input", task.result()))
+        now = time.time()
+        if now - self.last_stats_log_time > self.STATS_LOG_INTERVAL_SECONDS:
+            self.last_stats_log_time = now
+            self.log_stats()
+        return result
 
-        # close unused waits
-        for task in pending:
-            task.cancel()
+    def get_stats(self) -> dict:
+        """ per source: items delivered, items/sec since start, current and max queue depth """
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        return {name: {"items": self.counts[name],
+                       "per_sec": self.counts[name] / elapsed,
+                       "depth": queue.qsize(),
+                       "max_depth": self.max_depth[name]}
+                for name, queue in self._queues.items()}
 
-        return results
+    def log_stats(self):
+        stats = self.get_stats()
+        summary = ", ".join(f"{name}={s['items']} ({s['per_sec']:.1f}/s, depth {s['depth']}/{s['max_depth']})" for name, s in stats.items())
+        trace("dispatch", summary + (f", tapped={self.tapped}" if self.tapped else "")
+                          + (f", stale dropped={self.stale_dropped}" if self.stale_dropped else ""))
 
+    async def close(self):
+        self.log_stats()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        self._reader_source = None
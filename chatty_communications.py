@@ -90,3 +90,20 @@ async def chatty_send_sms(master_state, recipient, message):
 
     print("SMS RETRIES FAILED")
     return False, None
+
+#
+#  JobQueue handlers - notifications queued by the supervisor and cost alerts.  smtplib and the
+#  twilio client block, so these run on the queue's worker thread with an event loop of their own.
+#
+
+def send_email_job(master_state, payload):
+    if not (master_state.secrets_manager.get_secret('email_username') and master_state.secrets_manager.get_secret('email_password')):
+        print("Email service not configured - dropping queued email: " + payload["subject"])
+        return
+    if not asyncio.run(chatty_send_email(master_state, payload["recipient"], payload["subject"], payload["content"], payload.get("html_content"))):
+        raise Exception("email to " + payload["recipient"] + " not sent")
+
+def send_sms_job(master_state, payload):
+    sent, _ = asyncio.run(chatty_send_sms(master_state, payload["recipient"], payload["message"]))
+    if not sent:
+        raise Exception("SMS to " + payload["recipient"] + " not sent")
@@ -252,6 +252,16 @@ default_config = {
     # Auto-noise injection
     "NOISE_TARGET_FLOOR" : 120.0,         # Target ambient noise floor RMS
     "NOISE_MAX_INJECTION" : 85.0,         # Maximum synthetic noise to inject
+    # Where VAD/wake inference runs: "inline" on the event loop, or "worker" on a dedicated thread
+    "WAKE_INFERENCE_MODE" : "inline",
+    # Idle-listening cascade: energy gates VAD, VAD gates the wake model (skipped frames are replayed)
+    "WAKE_CASCADE" : True,                # Skip VAD/wake inference on quiet frames while asleep
+    "WAKE_CASCADE_MIN_RMS" : 80.0,        # Energy gate floor (raw RMS)
+    "WAKE_CASCADE_ENERGY_RATIO" : 2.0,    # Energy gate = ambient RMS x this (~6 dB over the room)
+    "WAKE_CASCADE_VAD_GATE" : 0.1,        # VAD score that opens the wake model
+    "WAKE_CASCADE_HANGOVER_FRAMES" : 12,  # Frames each tier stays open after activity (~1s)
+    "WAKE_CASCADE_REPLAY_FRAMES" : 8,     # Skipped frames re-fed to the wake model when it opens (~640ms)
+    "WAKE_TRIM_LATENCY_MS" : 160,         # Wake score peak lags the end of the spoken wake word by this much
     "SECONDS_TO_WAIT_FOR_MORE_VOICE" : 1.0,
     # Local VAD gating - only stream audio when voice is detected locally
     "LOCAL_VAD_GATE" : True,              # Enable local VAD gating (saves bandwidth/cost)
@@ -266,10 +276,30 @@ default_config = {
     "USER_NAME": "User",
     "ASSISTANT_EAGERNESS_TO_REPLY" : 50, # 0-100
     "AUTO_SUMMARIZE_EVERY_N_MESSAGES" : 100,
-    "AUTO_SUMMARIZE_MAX_TOKENS" : 50000,  # Auto-summarize when estimated token usage exceeds this
+    "AUTO_SUMMARIZE_MAX_TOKENS" : 50000,  # Auto-summarize when the session's context (input tokens per response) exceeds this
+    "SESSION_HANDOFF" : True,  # Roll long conversations onto a fresh session in the background instead of pausing to summarize
+    "SESSION_HANDOFF_RECENT_TURNS" : 12,  # Recent turns handed to the new session
+    "CONTEXT_WINDOW_TOKEN_BUDGET" : 16000,  # Old audio turns are replaced by a text recap once the context passes this (0 = off)
+    "CONTEXT_WINDOW_KEEP_ITEMS" : 8,  # Most recent conversation items always kept as they are
     "DAILY_COST_LIMIT" : None,  # None = no limit, or set to dollar amount (e.g., 10.0)
     "MONTHLY_COST_LIMIT" : None,  # None = no limit, or set to dollar amount
     "COST_ALERT_THRESHOLD" : None,  # Alert when daily cost exceeds this (but don't stop)
+    "AUDIO_WIRE_FORMAT" : "pcm",    # Realtime audio codec: "pcm" (24kHz 16-bit, 48KB/s) or "pcmu" (G.711 mu-law 8kHz, 8KB/s)
+    "AUDIO_WIRE_FORMAT_CHOICES" : ["pcm", "pcmu"],
+    # Realtime connection pre-warming: "off", "speculative" (open when the wake detector starts tracking)
+    # or "standby" (keep one configured session open while asleep).  Idle sessions bill no tokens, but each
+    # open is a connection the wake word may never use - opt in.
+    "REALTIME_PREWARM" : "off",
+    "REALTIME_PREWARM_CHOICES" : ["off", "speculative", "standby"],
+    "REALTIME_PREWARM_TTL_SECONDS" : 30,          # Speculative session is closed if the wake word isn't confirmed by then
+    "REALTIME_STANDBY_MAX_AGE_SECONDS" : 600,     # Standby session is replaced after this long (sessions are capped at 30 min)
+    "REALTIME_PREWARM_MAX_PER_HOUR" : 20,         # Budget of speculative/standby opens
+    "UPLINK_AGGREGATION_MS" : 160,  # Mic audio sent to the assistant in one append event per this many ms (80/160/240)
+    "PRE_SESSION_BUFFER_SECONDS" : 10,  # Speech held while the realtime session is being set up (oldest dropped beyond this)
+    # How the user's speech is transcribed: "full" (re-read the whole session every turn), "reference"
+    # (just the committed audio item) or "reference_summary" (the audio item plus a short recap of recent turns)
+    "OOB_TRANSCRIPTION_STRATEGY" : "reference_summary",
+    "OOB_TRANSCRIPTION_STRATEGY_CHOICES" : ["full", "reference", "reference_summary"],
     "NOISE_GATE_THRESHOLD" : None,  # None = disabled (recommended for RPi), or set threshold (e.g., 500.0). Lower = more aggressive noise gating
     "MAX_PROFILE_ENTRIES" : 1000,
     "WIFI_SSID" : None,
@@ -308,6 +338,16 @@ NUM_INCOMING_AUDIO_BUFFERS = int(SECONDS_OF_AUDIO_TO_BUFFER*1000 / CHUNK_DURATIO
 SAMPLE_RATE_HZ    = 16_000
 NATIVE_OAI_SAMPLE_RATE_HZ = 24_000
 
+# realtime wire formats (AUDIO_WIRE_FORMAT) - pcmu is G.711 mu-law, fixed at 8khz, one byte per sample
+WIRE_FORMAT_PCM  = "pcm"
+WIRE_FORMAT_PCMU = "pcmu"
+PCMU_SAMPLE_RATE_HZ = 8_000
+
+# out-of-band transcription strategies (OOB_TRANSCRIPTION_STRATEGY)
+OOB_TRANSCRIPTION_FULL = "full"
+OOB_TRANSCRIPTION_REFERENCE = "reference"
+OOB_TRANSCRIPTION_REFERENCE_SUMMARY = "reference_summary"
+
 # max output for audio tokens
 MAX_OUTPUT_TOKENS = 4096
 
@@ -315,6 +355,7 @@ AUDIO_BLOCKSIZE   = int(SAMPLE_RATE_HZ * CHUNK_DURATION_MS / 1000)
 
 # event types
 USER_SAID_WAKE_WORD     = "USER_SAID_WAKE_WORD"
+USER_MAY_SAY_WAKE_WORD  = "USER_MAY_SAY_WAKE_WORD"   # wake detector started tracking or had a near miss
 ASSISTANT_GO_TO_SLEEP   = "ASSISTANT_GO_TO_SLEEP"
 ASSISTANT_RESUME_AFTER_AUTO_SUMMARY = "ASSISTANT_RESUME_AFTER_AUTO_SUMMARY"
 ASSISTANT_STOP_SPEAKING = "ASSISTANT_STOP_SPEAKING"
@@ -399,10 +440,33 @@ class ConfigManager:
         self.config_file = config_file
         self.config = {}
         self.default_config = default_config
+        # key -> callbacks(key, value), called when a load or save changes that key's value
+        self._listeners = {}
         self.load_config()
 
+    def add_config_listener(self, key: str, callback):
+        """Push changes of key to callback(key, value) so hot paths can cache it instead of looking it up"""
+        self._listeners.setdefault(key, []).append(callback)
+
+    def remove_config_listener(self, key: str, callback):
+        try:
+            self._listeners.get(key, []).remove(callback)
+        except ValueError:
+            pass
+
+    def _notify_config_changes(self, prior_config: dict):
+        for key, callbacks in self._listeners.items():
+            value = self.get_config(key)
+            if callbacks and prior_config.get(key, self.default_config.get(key)) != value:
+                for callback in list(callbacks):
+                    try:
+                        callback(key, value)
+                    except Exception as e:
+                        print(f"Config listener error for {key}: {e}")
+
         
     def load_config(self):
+        prior_config = self.config
         loaded = False
         try:
             if os.path.exists(self.config_file):
@@ -445,6 +509,8 @@ class ConfigManager:
             print("missing keys: ", missing_keys)
             self.save_config({k: default_config[k] for k in missing_keys}, merge=False)
 
+        self._notify_config_changes(prior_config)
+
     def save_config(self, updated_config: dict=None, merge=True) -> tuple[bool, str]:
 
         """Save config to file"""
@@ -466,7 +532,9 @@ class ConfigManager:
                 json.dump(merged_config, f, indent=2)
             
             # Update in-memory config
+            prior_config = self.config
             self.config = merged_config
+            self._notify_config_changes(prior_config)
             return True, "Config updated successfully"
             
         except json.JSONDecodeError as e:
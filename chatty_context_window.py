@@ -0,0 +1,215 @@
+# Chatty Context Window
+# Finley 2025
+#
+#  Rolling window over the realtime conversation items ---------
+#
+#  The realtime session keeps every turn's audio until it is torn down, so each response re-reads
+#  more input than the last.  This tracks the session's items (id, role, estimated tokens, transcript)
+#  as they are created; once a main response's context passes CONTEXT_WINDOW_TOKEN_BUDGET the oldest
+#  audio turns are deleted with conversation.item.delete and folded into one text recap item at the
+#  start of the conversation.  Recent turns stay as audio, so the model still hears tone and
+#  delivery where it matters, and input tokens per response stay bounded without a summarize pause.
+#
+
+from collections import OrderedDict
+from chatty_debug import trace
+from chatty_realtime_messages import send_to_assistant
+
+# token estimates until response.done tells us better (realtime docs: ~10/s input audio, ~4 chars/token)
+INPUT_AUDIO_TOKENS_PER_SECOND = 10
+CHARS_PER_TEXT_TOKEN = 4
+# each pruned turn is trimmed to this many characters in the recap, and the recap keeps its newest lines within a cap
+RECAP_TURN_CHARS = 300
+RECAP_MAX_CHARS = 4000
+# a prune goes down to this fraction of the budget, so it doesn't run again on the very next turn
+PRUNE_TARGET_FRACTION = 0.5
+
+RECAP_HEADER = "Earlier in this conversation (the audio has been removed; this is what was said):\n"
+
+
+class ConversationItem:
+    __slots__ = ("item_id", "role", "audio", "tokens", "text")
+
+    def __init__(self, item_id: str, role: str = None):
+        self.item_id = item_id
+        self.role = role
+        self.audio = False
+        self.tokens = 0
+        self.text = None
+
+
+class ContextWindow:
+    """
+    The items of one realtime session, oldest first, and the recap standing in for pruned ones.
+
+    Fed from the event handlers in chatty_realtime_messages; maybe_prune() runs after each response.done.
+    """
+
+    def __init__(self, master_state):
+        self.master_state = master_state
+        self.items = OrderedDict()
+        self.speech_start_ms = {}
+        self.recap_lines = []
+        self.recap_item_id = None
+        self.recap_seq = 0
+
+        self.prunes = 0
+        self.items_pruned = 0
+        self.tokens_pruned = 0
+        self.recap_tokens = 0
+        self.peak_context_tokens = 0
+        self.context_before_prune = 0
+        self.context_after_prune = None
+        self._awaiting_after = False
+
+    def _item(self, item_id: str) -> ConversationItem:
+        item = self.items.get(item_id)
+        if item is None:
+            item = self.items[item_id] = ConversationItem(item_id)
+        return item
+
+    # --- tracking, from the realtime events ---
+
+    def on_item_added(self, item: dict):
+        """ conversation.item.added / created """
+        item_id = item.get("id")
+        if not item_id or item_id == self.recap_item_id:
+            return
+        tracked = self._item(item_id)
+        tracked.role = item.get("role") or item.get("type")
+        content = item.get("content") or []
+        tracked.audio = tracked.audio or any(part.get("type") in ("input_audio", "output_audio", "audio") for part in content)
+        texts = [part.get("text") or part.get("transcript") for part in content if part.get("text") or part.get("transcript")]
+        if texts and tracked.text is None:
+            tracked.text = " ".join(texts)
+            tracked.tokens = tracked.tokens or len(tracked.text) // CHARS_PER_TEXT_TOKEN
+
+    def on_item_deleted(self, item_id: str):
+        self.items.pop(item_id, None)
+
+    def on_speech_started(self, item_id: str, audio_start_ms: int):
+        if item_id:
+            self._item(item_id).audio = True
+            self.speech_start_ms[item_id] = audio_start_ms
+
+    def on_speech_stopped(self, item_id: str, audio_end_ms: int):
+        start_ms = self.speech_start_ms.pop(item_id, None)
+        if item_id and start_ms is not None and audio_end_ms is not None:
+            self._item(item_id).tokens = max(int((audio_end_ms - start_ms) / 1000 * INPUT_AUDIO_TOKENS_PER_SECOND), 1)
+
+    def set_text(self, item_id: str, role: str, text: str):
+        """ a transcript for an item: the assistant's own, or the OOB transcription of the user's """
+        if item_id and text:
+            item = self._item(item_id)
+            item.role = item.role or role
+            item.text = text
+
+    def on_response_done(self, response: dict):
+        """ size the response's output items from its usage (exact output token counts) """
+        outputs = [o.get("id") for o in response.get("output", []) if o.get("type") == "message" and o.get("id") in self.items]
+        if outputs:
+            output_tokens = (response.get("usage") or {}).get("output_tokens", 0)
+            for item_id in outputs:
+                self.items[item_id].audio = True
+                self.items[item_id].tokens = max(output_tokens // len(outputs), 1)
+
+    # --- pruning ---
+
+    async def maybe_prune(self, context_tokens: int):
+        """ called with each main response's input tokens; prunes old audio turns past the budget """
+        self.peak_context_tokens = max(self.peak_context_tokens, context_tokens)
+        if self._awaiting_after:
+            # the first response after a prune shows what it saved
+            self._awaiting_after = False
+            self.context_after_prune = context_tokens
+            trace("ws", f"context window: {self.context_before_prune} -> {context_tokens} input tokens after pruning")
+
+        conman = self.master_state.conman
+        try:
+            budget = int(conman.get_config("CONTEXT_WINDOW_TOKEN_BUDGET") or 0)
+            keep = max(int(conman.get_config("CONTEXT_WINDOW_KEEP_ITEMS") or 0), 2)
+        except (TypeError, ValueError):
+            return
+        if budget <= 0 or context_tokens <= budget:
+            return
+        if self.master_state.remote_assistant_state.get("responses_in_flight"):
+            # never pull items out from under a response being generated - next turn will do
+            return
+
+        to_free = context_tokens - int(budget * PRUNE_TARGET_FRACTION)
+        candidates = list(self.items.values())[:-keep]
+        victims, freed = [], 0
+        for item in candidates:
+            if freed >= to_free:
+                break
+            if not item.audio or item.text is None:
+                # only audio turns whose words we already have can be folded into the recap
+                continue
+            victims.append(item)
+            freed += item.tokens
+        if victims:
+            await self._prune(victims, freed, context_tokens)
+
+    async def _prune(self, victims: list, freed: int, context_tokens: int):
+        ws = self.master_state.ws
+        for item in victims:
+            line = ("User: " if item.role == "user" else "Assistant: ") + item.text.strip()
+            if len(line) > RECAP_TURN_CHARS:
+                line = line[:RECAP_TURN_CHARS] + "..."
+            self.recap_lines.append(line)
+        while sum(len(line) + 1 for line in self.recap_lines) > RECAP_MAX_CHARS and len(self.recap_lines) > 1:
+            self.recap_lines.pop(0)
+        recap = RECAP_HEADER + "\n".join(self.recap_lines)
+
+        # the new recap replaces the old one at the start of the conversation
+        old_recap_id = self.recap_item_id
+        self.recap_seq += 1
+        self.recap_item_id = f"recap_{self.recap_seq:03d}"
+        if old_recap_id:
+            await send_to_assistant(ws, {"type": "conversation.item.delete", "item_id": old_recap_id})
+        for item in victims:
+            await send_to_assistant(ws, {"type": "conversation.item.delete", "item_id": item.item_id})
+            self.items.pop(item.item_id, None)
+        await send_to_assistant(ws, {
+            "type": "conversation.item.create",
+            "previous_item_id": "root",
+            "item": {
+                "id": self.recap_item_id,
+                "type": "message",
+                "role": "system",
+                "content": [{"type": "input_text", "text": recap}]
+            }
+        })
+
+        recap_tokens = len(recap) // CHARS_PER_TEXT_TOKEN
+        self.prunes += 1
+        self.items_pruned += len(victims)
+        self.tokens_pruned += freed
+        self.recap_tokens = recap_tokens
+        self.context_before_prune = context_tokens
+        self._awaiting_after = True
+        trace("ws", f"context window: {context_tokens} input tokens - pruned {len(victims)} audio items (~{freed} tokens) "
+                    f"into a {recap_tokens} token recap, {len(self.items)} items left")
+
+    def get_stats(self) -> dict:
+        """ pruning so far this session and what it saved (token figures for pruned items are estimates) """
+        return {
+            "items": len(self.items),
+            "prunes": self.prunes,
+            "items_pruned": self.items_pruned,
+            "tokens_pruned": self.tokens_pruned,
+            "recap_tokens": self.recap_tokens,
+            "peak_context_tokens": self.peak_context_tokens,
+            "context_before_prune": self.context_before_prune,
+            "context_after_prune": self.context_after_prune,
+        }
+
+    def log_stats(self):
+        s = self.get_stats()
+        if not s["prunes"]:
+            return
+        trace("ws",
+            f"context window: {s['prunes']} prunes, {s['items_pruned']} items (~{s['tokens_pruned']} tokens) "
+            f"replaced by a {s['recap_tokens']} token recap, peak context {s['peak_context_tokens']}, "
+            f"last prune {s['context_before_prune']} -> {s['context_after_prune']}"
+        )
@@ -8,6 +8,7 @@
 import asyncio
 import json
 import platform
+import threading
 from collections import deque
 from datetime import datetime
 from typing import Optional
@@ -15,6 +16,9 @@ from typing import Optional
 # Global server instance
 _server: Optional['DebugLogServer'] = None
 
+# name -> callable returning a JSON-able dict, served to clients that send "stats"
+_stats_providers: dict = {}
+
 # On macOS, also dump trace output to the console since there's typically
 # no TCP debug client connected during local development.
 _console_trace: bool = platform.system().lower() == 'darwin'
@@ -29,6 +33,7 @@ class DebugLogServer:
     - Bounded queue and buffer to prevent memory growth
     - Max client limit to reduce CPU/network overhead
     - Graceful shutdown with timeout
+    - trace() from worker threads is handed to the loop thread
     """
     
     MAX_CLIENTS = 3
@@ -44,9 +49,13 @@ class DebugLogServer:
         self._shutdown: asyncio.Event = asyncio.Event()
         self._server: Optional[asyncio.Server] = None
         self._processor_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
     
     async def start(self):
         """Start the debug server and log processor."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
         try:
             self._server = await asyncio.start_server(
                 self._handle_client,
@@ -152,10 +161,13 @@ class DebugLogServer:
             # Keep connection alive until client disconnects or shutdown
             while not self._shutdown.is_set():
                 try:
-                    # Check if client is still connected by reading
-                    data = await asyncio.wait_for(reader.read(1), timeout=5.0)
+                    # Check if client is still connected by reading - a "stats" line asks for a snapshot
+                    data = await asyncio.wait_for(reader.readline(), timeout=5.0)
                     if not data:
                         break  # Client disconnected
+                    if data.strip() == b"stats":
+                        writer.write((json.dumps({"stats": collect_stats()}, default=str) + '\n').encode('utf-8'))
+                        await writer.drain()
                 except asyncio.TimeoutError:
                     # Just a timeout, client still connected
                     continue
@@ -176,7 +188,8 @@ class DebugLogServer:
     def post(self, component: str, msg: str):
         """
         Post a trace entry to the queue (non-blocking).
-        Silently drops if queue is full.
+        Silently drops if queue is full.  asyncio.Queue is not thread-safe, so
+        entries posted from other threads (e.g. wake inference) hop to the loop.
         """
         if self._shutdown.is_set():
             return
@@ -187,6 +200,12 @@ class DebugLogServer:
             "m": msg
         }
         
+        if self._loop is not None and threading.get_ident() != self._loop_thread_id:
+            self._loop.call_soon_threadsafe(self._enqueue, entry)
+        else:
+            self._enqueue(entry)
+
+    def _enqueue(self, entry: dict):
         try:
             self._queue.put_nowait(entry)
         except asyncio.QueueFull:
@@ -194,6 +213,21 @@ class DebugLogServer:
             pass
 
 
+def register_stats_provider(name: str, provider):
+    """ make provider() (a get_stats-style dict) available to debug clients under name """
+    _stats_providers[name] = provider
+
+
+def collect_stats() -> dict:
+    stats = {}
+    for name, provider in _stats_providers.items():
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
+
+
 async def start_debug_server(port: int = 9999) -> bool:
     """
     Start the global debug log server.
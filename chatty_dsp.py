@@ -8,38 +8,71 @@ b64 = lambda blob: base64.b64encode(blob).decode()
 import numpy as np
 import base64
 
-def chatty_tone(freq_duration_pairs, volume=0.5):
-   """Generate base64 encoded audio buffer for tone sequences.
+def chatty_tone(freq_duration_pairs, volume=0.5, fade_ms=3.0):
+   """Render a tone sequence to int16 audio.
    
    Args:
        freq_duration_pairs: List of tuples (frequency_hz, duration_ms)
                           frequency of 0 means silence
+       volume: 0.0 - 1.0 (applied to the amplitude twice, as the songs were tuned with)
+       fade_ms: linear fade in/out on each tone so segment edges don't click
    
    Returns:
        audio data (16-bit mono, 24000 Hz)
    """
    sample_rate = NATIVE_OAI_SAMPLE_RATE_HZ
-   audio_data = np.array([], dtype=np.int16)
    if volume > 1.0 or volume < 0.0:
         volume = 0.5
    sample_multiplier = int(32767*volume)
-   
-   for freq, duration_ms in freq_duration_pairs:
-       num_samples = int(sample_rate * duration_ms / 1000)
-       
-       if freq == 0:
-           # Silence
-           samples = np.zeros(num_samples, dtype=np.int16)
-       else:
-           # Generate sine wave
+   fade_samples = int(sample_rate * fade_ms / 1000)
+
+   # one output buffer, each segment rendered into its slice
+   segment_samples = [int(sample_rate * duration_ms / 1000) for _, duration_ms in freq_duration_pairs]
+   audio_data = np.zeros(sum(segment_samples), dtype=np.int16)
+   start = 0
+   for (freq, _), num_samples in zip(freq_duration_pairs, segment_samples):
+       if freq != 0 and num_samples > 0:
            t = np.arange(num_samples) / sample_rate
-           samples = (np.sin(2 * np.pi * freq * t) * sample_multiplier).astype(np.int16)
-       
-       audio_data = np.concatenate([audio_data, samples])
-   
-   return audio_data * volume
+           # quantize then scale again, as the songs have always been rendered
+           samples = (np.sin(2 * np.pi * freq * t) * sample_multiplier).astype(np.int16) * volume
+           fade = min(fade_samples, num_samples // 4)
+           if fade > 0:
+               ramp = np.arange(1, fade + 1) / (fade + 1)
+               samples[:fade] *= ramp
+               samples[-fade:] *= ramp[::-1]
+           np.copyto(audio_data[start:start + num_samples], samples, casting="unsafe")
+       start += num_samples
+
+   return audio_data
+
+
+class ToneBank:
+   """
+   int16 renderings of a song table (chatty_songs), made once per (song, volume) and shared.
+
+   Buffers are marked read-only so a caller can hand them straight to the playback ring.
+   """
 
-def apply_simple_noise_gate(audio_16, threshold=500.0):
+   def __init__(self, songs, fade_ms=3.0):
+       self.songs = songs
+       self.fade_ms = fade_ms
+       self._rendered = {}
+
+   def render_all(self, volume=0.5):
+       for song in self.songs:
+           self.get(song, volume)
+
+   def get(self, song, volume=0.5):
+       """Rendered audio for song (KeyError if unknown)."""
+       key = (song, volume)
+       audio = self._rendered.get(key)
+       if audio is None:
+           audio = chatty_tone(self.songs[song], volume, self.fade_ms)
+           audio.flags.writeable = False
+           self._rendered[key] = audio
+       return audio
+
+def apply_simple_noise_gate(audio_16, threshold=500.0, features=None):
     """
     Lightweight noise gate optimized for Raspberry Pi.
     Uses fast energy estimation instead of full RMS calculation.
@@ -53,13 +86,15 @@ def apply_simple_noise_gate(audio_16, threshold=500.0):
     Args:
         audio_16: numpy array of int16 samples (typically 1280 samples = 80ms @ 16kHz)
         threshold: Energy threshold below which audio is gated
+        features: FrameFeatures for audio_16 (defaults to the ones attached to the frame, if any)
     
     Returns:
         numpy array: Audio with noise gate applied (same array if above threshold)
     """
     # Fast energy check: use mean absolute value (faster than RMS)
     # For int16, we can use int32 to avoid overflow
-    energy = np.mean(np.abs(audio_16.astype(np.int32)))
+    features = features or frame_features(audio_16)
+    energy = features.mean_abs if features else np.mean(np.abs(audio_16.astype(np.int32)))
     
     # Early exit optimization: if clearly above threshold, return original
     # This avoids the zero-copy operation for most speech
@@ -73,7 +108,7 @@ def apply_simple_noise_gate(audio_16, threshold=500.0):
     
     return audio_16
 
-def normalize_audio(audio_16, target_energy=2000, max_gain=20.0):
+def normalize_audio(audio_16, target_energy=2000, max_gain=20.0, features=None):
     """
     Normalize audio to a target energy level for consistent input to speech recognition.
     
@@ -84,13 +119,14 @@ def normalize_audio(audio_16, target_energy=2000, max_gain=20.0):
         audio_16: numpy array of int16 samples
         target_energy: Target mean absolute value (default 2000, good for speech)
         max_gain: Maximum amplification factor to prevent noise amplification (default 20x)
+        features: FrameFeatures for audio_16 (defaults to the ones attached to the frame, if any)
     
     Returns:
         numpy array: Normalized int16 audio
     """
-    # Calculate current energy
-    audio_32 = audio_16.astype(np.int32)
-    current_energy = np.mean(np.abs(audio_32))
+    # Calculate current energy (already measured if the frame carries its features)
+    features = features or frame_features(audio_16)
+    current_energy = features.mean_abs if features else np.mean(np.abs(audio_16.astype(np.int32)))
     
     # Skip if already silent (avoid amplifying pure noise)
     if current_energy < 5:
@@ -104,7 +140,7 @@ def normalize_audio(audio_16, target_energy=2000, max_gain=20.0):
         return audio_16
     
     # Apply gain with clipping protection
-    amplified = audio_32 * gain
+    amplified = audio_16.astype(np.int32) * gain
     amplified = np.clip(amplified, -32768, 32767)
     
     return amplified.astype(np.int16)
@@ -154,3 +190,543 @@ def upsample_audio_efficient(audio_16, normalize=True):
         output[-1] = audio_16[-1]
     
     return output.tobytes()
+
+
+def design_lowpass_taps(num_taps, cutoff, beta=8.0):
+    """
+    Kaiser-windowed sinc lowpass filter.
+
+    Args:
+        num_taps: filter length
+        cutoff: cutoff frequency as a fraction of the sample rate (0 < cutoff < 0.5)
+        beta: Kaiser window shape (higher = more stopband attenuation, wider transition)
+
+    Returns:
+        numpy float64 array of taps with unity DC gain
+    """
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    taps = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(num_taps, beta)
+    return taps / np.sum(taps)
+
+
+class PolyphaseResampler:
+    """
+    Stateful, fully vectorized streaming polyphase resampler (rational up/down ratio).
+
+    Built for the 80ms mic frames that go to the assistant (16kHz -> 24kHz is up=3, down=2),
+    but any small integer ratio works (e.g. 16kHz -> 8kHz or 8kHz -> 24kHz).
+
+    - Filter history is carried across calls so consecutive frames join without seams
+    - Input that doesn't fill a whole down-sampling period is held until the next call
+    - Output is written into a preallocated int16 buffer that is reused between calls,
+      so the returned array is only valid until the next call to process()
+
+    Per output sample n the filter reads input window q = (n*down)//up with phase
+    (n*down) % up.  That pattern repeats every `up` outputs / `down` inputs, so each phase
+    is a single matrix-vector product over a strided window view - no Python per-sample loop.
+    """
+
+    def __init__(self, up=3, down=2, taps_per_phase=16, max_frame_samples=4096):
+        from math import gcd
+        g = gcd(up, down)
+        self.up = up // g
+        self.down = down // g
+        self.taps_per_phase = taps_per_phase
+
+        # lowpass at the lower of the two Nyquist limits (slightly inside to leave a transition band)
+        cutoff = 0.5 / max(self.up, self.down) * 0.9
+        taps = design_lowpass_taps(self.up * taps_per_phase, cutoff) * self.up
+
+        # phase p uses taps p, p+up, p+2*up... reversed so a forward window view can be dotted directly
+        self._phase_kernels = np.stack([taps[p::self.up][::-1] for p in range(self.up)]).astype(np.float32)
+
+        # for one period of `up` outputs: (input offset within the period, phase)
+        self._period = [((k * self.down) // self.up, (k * self.down) % self.up) for k in range(self.up)]
+
+        self._history_len = taps_per_phase - 1
+        self._pending = 0
+        self._allocate(max_frame_samples)
+
+    def _allocate(self, max_frame_samples):
+        """(re)allocate the work buffers for frames up to max_frame_samples long"""
+        max_periods = (max_frame_samples + self.down) // self.down + 1
+        old_work = getattr(self, "_work", None)
+        self._work = np.zeros(self._history_len + max_periods * self.down, dtype=np.float32)
+        if old_work is not None:
+            keep = self._history_len + self._pending
+            self._work[:keep] = old_work[:keep]
+        self._accumulator = np.empty(max_periods, dtype=np.float32)
+        self._output = np.empty(max_periods * self.up, dtype=np.int16)
+        self._max_frame_samples = max_frame_samples
+
+    def reset(self):
+        """Forget filter history (e.g. at the start of a new stream)."""
+        self._work[:self._history_len] = 0
+        self._pending = 0
+
+    def output_length(self, num_samples):
+        """Number of samples process() will return for the next frame of num_samples."""
+        return ((self._pending + num_samples) // self.down) * self.up
+
+    def process(self, audio):
+        """
+        Resample one frame.
+
+        Args:
+            audio: numpy int16 array (any length)
+
+        Returns:
+            numpy int16 array view into the preallocated output buffer
+        """
+        n = len(audio)
+        if n > self._max_frame_samples:
+            self._allocate(n)
+
+        hist = self._history_len
+        start = hist + self._pending
+        self._work[start:start + n] = audio
+
+        available = self._pending + n
+        periods = available // self.down
+        consumed = periods * self.down
+        out = self._output[:periods * self.up]
+
+        if periods:
+            # windows[q] covers input samples q-(taps_per_phase-1)..q of this call's input
+            windows = np.lib.stride_tricks.sliding_window_view(self._work[:hist + consumed], self.taps_per_phase)
+            acc = self._accumulator[:periods]
+            out_periods = out.reshape(periods, self.up)
+            for k, (offset, phase) in enumerate(self._period):
+                np.matmul(windows[offset::self.down][:periods], self._phase_kernels[phase], out=acc)
+                np.rint(acc, out=acc)
+                np.clip(acc, -32768, 32767, out=acc)
+                out_periods[:, k] = acc
+
+        # carry filter history plus any unconsumed input to the front of the work buffer
+        remaining = hist + available - consumed
+        self._work[:remaining] = self._work[consumed:consumed + remaining]
+        self._pending = available - consumed
+
+        return out
+
+
+def _build_mulaw_tables():
+    """G.711 mu-law tables: encode indexed by the int16 sample's bit pattern, decode by the 8-bit code."""
+    bias, clip = 0x84, 32635
+
+    samples = np.arange(-32768, 32768, dtype=np.int32)
+    sign = np.where(samples < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(samples), clip) + bias
+    exponent = np.floor(np.log2(magnitude >> 7 | 1)).astype(np.int32)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    codes = (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+    # reorder so the table is indexed by the sample reinterpreted as uint16
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[samples.astype(np.int16).view(np.uint16)] = codes
+
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    decoded = (((code & 0x0F) << 3) + bias << ((code >> 4) & 0x07)) - bias
+    decode = np.where(code & 0x80, -decoded, decoded).astype(np.int16)
+    return encode, decode
+
+MULAW_ENCODE_TABLE, MULAW_DECODE_TABLE = _build_mulaw_tables()
+
+
+def mulaw_encode(audio_16, out=None):
+    """int16 samples -> G.711 mu-law codes (uint8), one table lookup per sample (out is reused if given)."""
+    return np.take(MULAW_ENCODE_TABLE, np.asarray(audio_16, dtype=np.int16).view(np.uint16), out=out)
+
+
+def mulaw_decode(codes, out=None):
+    """G.711 mu-law codes (uint8 array or bytes-like) -> int16 samples (out is reused if given)."""
+    if not isinstance(codes, np.ndarray):
+        codes = np.frombuffer(codes, dtype=np.uint8)
+    return np.take(MULAW_DECODE_TABLE, codes, out=out)
+
+
+# clipping threshold shared by the feature extractor and the mic quality check (close to int16 max)
+CLIP_THRESHOLD = 32000
+
+
+class FrameFeatures:
+    """Per-frame level measurements, computed once when the frame enters the pipeline."""
+    __slots__ = ("num_samples", "rms", "mean_abs", "peak", "clip_count")
+
+    def __init__(self, num_samples, rms, mean_abs, peak, clip_count):
+        self.num_samples = num_samples
+        self.rms = rms
+        self.mean_abs = mean_abs
+        self.peak = peak
+        self.clip_count = clip_count
+
+
+class AudioFrame(np.ndarray):
+    """
+    int16 mic frame that carries its FrameFeatures (and capture bookkeeping) downstream.
+
+    Views and results of numpy operations come back as AudioFrame with features=None, so
+    a measurement never follows audio that has been changed - consumers fall back to computing.
+    """
+
+    def __array_finalize__(self, obj):
+        self.features = None
+        self.seq = None
+        self.capture_time = None
+
+
+def frame_features(audio_16):
+    """FrameFeatures attached to audio_16, or None if it is a plain array (or was modified)."""
+    return getattr(audio_16, "features", None)
+
+
+class FrameFeatureExtractor:
+    """
+    Computes RMS, mean-abs, peak and clip count for a frame with one int16 -> float32 conversion
+    into preallocated scratch; the reductions then run over that cache-resident buffer with no
+    per-frame allocations.  Replaces the separate converted copies made by the noise gate,
+    normalizer, RMS and quality checks.  One extractor per thread (the scratch is shared).
+    """
+
+    def __init__(self, max_frame_samples=4096):
+        self._allocate(max_frame_samples)
+
+    def _allocate(self, max_frame_samples):
+        self._samples = np.empty(max_frame_samples, dtype=np.float32)
+        self._clipped = np.empty(max_frame_samples, dtype=bool)
+        self._max_frame_samples = max_frame_samples
+
+    def compute(self, audio_16):
+        """
+        Args:
+            audio_16: numpy int16 array
+
+        Returns:
+            FrameFeatures
+        """
+        n = len(audio_16)
+        if n == 0:
+            return FrameFeatures(0, 0.0, 0.0, 0, 0)
+        if n > self._max_frame_samples:
+            self._allocate(n)
+
+        samples = self._samples[:n]
+        np.copyto(samples, audio_16, casting="unsafe")
+        sum_squares = float(np.dot(samples, samples))
+        np.abs(samples, out=samples)
+        mean_abs = float(samples.sum(dtype=np.float64)) / n
+        peak = int(samples.max())
+        clip_count = int(np.count_nonzero(np.greater(samples, CLIP_THRESHOLD, out=self._clipped[:n])))
+        return FrameFeatures(n, (sum_squares / n) ** 0.5, mean_abs, peak, clip_count)
+
+    def attach(self, audio_16, features=None):
+        """Return audio_16 as an AudioFrame (no copy) carrying features (computed here unless given)."""
+        frame = audio_16.view(AudioFrame)
+        frame.features = features or self.compute(audio_16)
+        return frame
+
+
+class NoiseBank:
+    """
+    Gaussian noise injection from a table generated once, for the wake detector's auto-noise.
+
+    The table holds N(0, 1) samples in Q10 int16.  Each frame takes a slice at a random offset,
+    scales it by the requested RMS level in Q6 fixed point (Q10 x Q6 -> >> 16) and adds it to the
+    audio with saturation in int32 scratch, writing into a preallocated int16 output - no float64
+    noise, copies or allocations per frame.  With a 64K table and random offsets, consecutive frames
+    see unrelated noise, which is all the wake model needs from it.  When the frame's peak is known
+    (FrameFeatures) and the loudest possible noise sample cannot push it past int16, the saturation
+    step is skipped - the usual case for the quiet frames that get noise at all.
+    """
+    TABLE_Q = 10
+    GAIN_Q = 6
+
+    def __init__(self, table_size=1 << 16, max_frame_samples=4096, seed=None):
+        import random
+        rng = np.random.default_rng(seed)
+        self._offsets = random.Random(seed)
+        self.table_size = table_size
+        # exactly zero mean / unit variance so a finite table adds no DC offset or level error
+        noise = rng.standard_normal(table_size)
+        noise = (noise - noise.mean()) / noise.std()
+        self._base = np.clip(np.rint(noise * (1 << self.TABLE_Q)), -32768, 32767).astype(np.int16)
+        self._base_peak = int(np.max(np.abs(self._base.astype(np.int32))))
+        self._allocate(max_frame_samples)
+
+    def _allocate(self, max_frame_samples):
+        # repeat the head after the end so a slice starting anywhere in the table never wraps
+        self._table = np.concatenate([self._base, np.resize(self._base, max_frame_samples)])
+        self._scratch = np.empty(max_frame_samples, dtype=np.int32)
+        self._output = np.empty(max_frame_samples, dtype=np.int16)
+        self._max_frame_samples = max_frame_samples
+
+    def inject(self, audio_16, level):
+        """
+        Add Gaussian noise with RMS `level` to a frame.
+
+        Args:
+            audio_16: numpy int16 array (left untouched)
+            level: noise RMS in int16 units (AutoNoiseManager.update() output)
+
+        Returns:
+            numpy int16 array view into the preallocated output buffer (valid until the next call),
+            or audio_16 itself when level rounds to zero
+        """
+        gain = int(round(level * (1 << self.GAIN_Q)))
+        if gain <= 0:
+            return audio_16
+
+        n = len(audio_16)
+        if n > self._max_frame_samples:
+            self._allocate(n)
+
+        offset = self._offsets.randrange(self.table_size)
+        acc = self._scratch[:n]
+        np.multiply(self._table[offset:offset + n], gain, out=acc, dtype=np.int32)
+        # back from Q16 with rounding, then saturating add
+        acc += 1 << (self.TABLE_Q + self.GAIN_Q - 1)
+        np.right_shift(acc, self.TABLE_Q + self.GAIN_Q, out=acc)
+        acc += audio_16
+        features = frame_features(audio_16)
+        if features is None or features.peak + ((self._base_peak * gain) >> (self.TABLE_Q + self.GAIN_Q)) + 1 > 32767:
+            np.minimum(acc, 32767, out=acc)
+            np.maximum(acc, -32768, out=acc)
+        out = self._output[:n]
+        np.copyto(out, acc, casting="unsafe")
+        return out
+
+
+# per-frame record kept by the wake detector for lookback and post-detection dumps
+WAKE_FRAME_FIELDS = [("t", np.float64), ("vad", np.float32), ("wake", np.float32),
+                     ("rms", np.float32), ("noise", np.float32), ("tracking", np.bool_)]
+
+
+class FrameHistoryRing:
+    """
+    Fixed-capacity history of per-frame records in a numpy structured array.
+
+    Every record is written twice (slot i and i + capacity), so the newest n records are always one
+    contiguous, oldest-first slice of the buffer - queries never wrap, copy or build lists.  Queries
+    address records from the newest end: `count` records ending `skip` records before the newest.
+    Comparisons use a preallocated mask, so a query allocates nothing proportional to the history.
+    """
+
+    def __init__(self, capacity, fields=WAKE_FRAME_FIELDS):
+        self.capacity = capacity
+        self._buf = np.zeros(2 * capacity, dtype=fields)
+        self._mask = np.empty(capacity, dtype=bool)
+        self._next = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        self._next = 0
+        self._len = 0
+
+    def append(self, *values):
+        """Add one record (field values in field order), dropping the oldest when full."""
+        p = self._next
+        self._buf[p] = values
+        self._buf[p + self.capacity] = values
+        self._next = (p + 1) % self.capacity
+        if self._len < self.capacity:
+            self._len += 1
+
+    def recent(self, count=None, skip=0):
+        """Oldest-first structured view of `count` records (default: all) ending `skip` before the newest."""
+        end = self._next + self.capacity - skip
+        available = max(self._len - skip, 0)
+        count = available if count is None else min(count, available)
+        return self._buf[end - count:end]
+
+    def _compare(self, field, threshold, count, skip, or_equal):
+        values = self.recent(count, skip)[field]
+        mask = self._mask[:len(values)]
+        (np.greater_equal if or_equal else np.greater)(values, threshold, out=mask)
+        return mask
+
+    def count_above(self, field, threshold, count=None, skip=0, or_equal=False):
+        """Number of records in the window whose field is above (or at, with or_equal) threshold."""
+        return int(np.count_nonzero(self._compare(field, threshold, count, skip, or_equal)))
+
+    def window_max(self, field, count=None, skip=0, default=0.0):
+        """Largest field value in the window (default if the window is empty)."""
+        values = self.recent(count, skip)[field]
+        return float(values.max()) if len(values) else default
+
+    def window_sum(self, field, count=None, skip=0):
+        return float(self.recent(count, skip)[field].sum(dtype=np.float64))
+
+    def run_length_before(self, field, threshold, skip=0):
+        """
+        Length of the unbroken run of records with field at or above threshold that ends
+        `skip` records before the newest (e.g. continuous voice before tracking started).
+        """
+        mask = self._compare(field, threshold, None, skip, True)
+        if not len(mask):
+            return 0
+        reversed_mask = mask[::-1]
+        first_below = int(np.argmin(reversed_mask))
+        return len(mask) if reversed_mask[first_below] else first_below
+
+    def any_above(self, field, threshold, count=None, skip=0, or_equal=False):
+        return bool(self._compare(field, threshold, count, skip, or_equal).any())
+
+
+class PcmRingBuffer:
+    """
+    Single-producer / single-consumer int16 sample ring between the event loop (write) and the
+    PortAudio callback (read).
+
+    Positions are monotonic sample counts: write_pos is advanced only by the producer, read_pos only
+    by the consumer, so neither side takes a lock.  flush() cannot move the consumer's read_pos, so it
+    publishes a flush position instead and the consumer skips to it on its next read - O(1) however
+    much audio is queued.  read_into() copies straight into a caller-owned buffer and allocates nothing.
+    """
+
+    def __init__(self, capacity, sample_rate=NATIVE_OAI_SAMPLE_RATE_HZ):
+        self.capacity = int(capacity)
+        self.sample_rate = sample_rate
+        self._buf = np.zeros(self.capacity, dtype=np.int16)
+        self.write_pos = 0
+        self.read_pos = 0
+        self._flush_pos = 0
+
+        # underrun: a read found fewer samples than requested (the rest was silence)
+        # overrun: a write found the ring full and dropped the samples that did not fit
+        self.underruns = 0
+        self.underrun_samples = 0
+        self.overruns = 0
+        self.overrun_samples = 0
+
+    def _start(self):
+        # consumer's view of where unplayed audio begins (a pending flush skips ahead)
+        flush_pos = self._flush_pos
+        return flush_pos if flush_pos > self.read_pos else self.read_pos
+
+    def available(self):
+        """Samples queued and not yet read."""
+        return self.write_pos - self._start()
+
+    def free(self):
+        return self.capacity - self.available()
+
+    def write(self, samples):
+        """Producer: append samples (cast to int16).  Returns how many were queued; the rest count as overrun."""
+        n = len(samples)
+        space = self.free()
+        if n > space:
+            self.overruns += 1
+            self.overrun_samples += n - space
+            n = space
+        if n <= 0:
+            return 0
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        np.copyto(self._buf[start:start + first], samples[:first], casting="unsafe")
+        if first < n:
+            np.copyto(self._buf[:n - first], samples[first:n], casting="unsafe")
+        # publish only after the samples are in place
+        self.write_pos += n
+        return n
+
+    def flush(self):
+        """Producer: drop everything queued so far."""
+        self._flush_pos = self.write_pos
+
+    def read_into(self, out):
+        """Consumer: fill out (int16) from the ring, padding with silence.  Returns samples read."""
+        start_pos = self._start()
+        n = min(len(out), self.write_pos - start_pos)
+        start = start_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        if first < n:
+            out[first:n] = self._buf[:n - first]
+        if n < len(out):
+            out[n:] = 0
+            if n > 0:
+                self.underruns += 1
+                self.underrun_samples += len(out) - n
+        self.read_pos = start_pos + n
+        return n
+
+    def get_stats(self):
+        return {
+            "queued_ms": self.available() * 1000 // self.sample_rate,
+            "underruns": self.underruns,
+            "underrun_samples": self.underrun_samples,
+            "overruns": self.overruns,
+            "overrun_samples": self.overrun_samples,
+        }
+
+
+class PlaybackGain:
+    """
+    Volume for the speaker callback as a Q15 fixed-point gain.
+
+    set_percent() is called off the audio thread (a config listener) and only publishes a target;
+    apply() runs in the callback: an int32 multiply-and-shift in place, with a short linear ramp
+    to each new target so volume changes don't click.  Nothing is looked up or allocated per call.
+    """
+    Q = 15
+    UNITY = 1 << Q
+
+    def __init__(self, percent=100, ramp_samples=480, max_frame_samples=4096):
+        self.ramp_samples = max(int(ramp_samples), 1)
+        self.target = self._gain_for(percent)
+        self.current = self.target
+        self._ramp_from = self.current
+        self._ramp_to = self.current
+        self._ramp_pos = 0
+        self._allocate(max_frame_samples)
+
+    def _allocate(self, max_frame_samples):
+        self._index = np.arange(1, max_frame_samples + 1, dtype=np.int32)
+        self._gains = np.empty(max_frame_samples, dtype=np.int32)
+        self._acc = np.empty(max_frame_samples, dtype=np.int32)
+        self._max_frame_samples = max_frame_samples
+
+    def _gain_for(self, percent):
+        try:
+            percent = max(0, min(int(percent), 100))
+        except (TypeError, ValueError):
+            percent = 100
+        return (percent * self.UNITY) // 100
+
+    def set_percent(self, percent):
+        """Publish a new volume (0-100); the callback ramps to it."""
+        self.target = self._gain_for(percent)
+
+    def apply(self, audio_16):
+        """Scale int16 audio in place by the current gain (ramping toward the target).  Returns audio_16."""
+        n = len(audio_16)
+        if n > self._max_frame_samples:
+            self._allocate(n)
+        target = self.target  # read once - may be republished mid-call
+        if target != self._ramp_to:
+            # new target: ramp from wherever we are now
+            self._ramp_from = self.current
+            self._ramp_to = target
+            self._ramp_pos = 0
+
+        acc = self._acc[:n]
+        if self.current == target:
+            if target == self.UNITY:
+                return audio_16
+            np.multiply(audio_16, np.int32(target), out=acc)
+        else:
+            # per-sample gain along the ramp, held at the target once the ramp ends
+            gains = self._gains[:n]
+            np.add(self._index[:n], self._ramp_pos, out=gains)
+            np.minimum(gains, self.ramp_samples, out=gains)
+            gains *= target - self._ramp_from
+            gains //= self.ramp_samples
+            gains += self._ramp_from
+            np.multiply(audio_16, gains, out=acc)
+            self._ramp_pos += n
+            self.current = int(gains[-1])
+        np.right_shift(acc, self.Q, out=acc)
+        np.copyto(audio_16, acc, casting="unsafe")
+        return audio_16
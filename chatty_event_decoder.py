@@ -0,0 +1,77 @@
+# Chatty Event Decoder
+# Finley 2025
+#
+#  Cheap classification and decoding of realtime websocket events ---------
+#
+#  Most of the downlink is response.output_audio.delta - tens of KB of base64 per second of speech.
+#  Those are classified from the first few hundred characters and their item id / delta pulled out
+#  with string searches, so no dict is ever built for them.  Everything else goes through the fastest
+#  JSON parser available (orjson if installed).
+#
+
+import re
+import json
+import binascii
+from typing import Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+AUDIO_DELTA_EVENT = "response.output_audio.delta"
+AUDIO_DONE_EVENT = "response.output_audio.done"
+
+# the realtime server writes "type" as the first key of every event; only look this far into a message
+# for it.  A "type" found inside a nested object (no top-level one ahead of it) is not trusted - the
+# caller gets None and parses fully, so a server that reorders keys costs speed, never correctness.
+EVENT_TYPE_SPAN = 256
+_EVENT_TYPE_RE = re.compile(r'"type"\s*:\s*"([^"\\]+)"')
+
+
+def parse_event(event_raw) -> dict:
+    """ full parse of one event (orjson when available) """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(event_raw)
+    return json.loads(event_raw)
+
+
+def sniff_event_type(event_raw: str) -> Optional[str]:
+    """ the event's type from its leading characters, or None if it isn't there (caller parses fully) """
+    match = _EVENT_TYPE_RE.search(event_raw, 0, EVENT_TYPE_SPAN)
+    if match is None or event_raw.find("{", 1, match.start()) >= 0:
+        # not within the span, or it belongs to a nested object
+        return None
+    return match.group(1)
+
+
+def sniff_string_field(event_raw: str, name: str, start: int = 0) -> Optional[str]:
+    """ a top-level string field of a flat event, or None if it is missing or escaped (caller parses fully) """
+    key = f'"{name}":'
+    begin = event_raw.find(key, start)
+    if begin < 0:
+        return None
+    begin += len(key)
+    while event_raw.startswith(" ", begin):
+        begin += 1
+    if not event_raw.startswith('"', begin):
+        return None
+    begin += 1
+    end = event_raw.find('"', begin)
+    if end < 0:
+        return None
+    value = event_raw[begin:end]
+    return None if "\\" in value else value
+
+
+def decode_audio_delta(event_raw: str) -> Optional[tuple[str, bytes]]:
+    """ (item_id, pcm bytes) for an audio delta event without parsing it, or None if it can't be sniffed """
+    if sniff_event_type(event_raw) != AUDIO_DELTA_EVENT:
+        return None
+    item_id = sniff_string_field(event_raw, "item_id")
+    delta = sniff_string_field(event_raw, "delta")
+    if item_id is None or delta is None:
+        return None
+    return item_id, binascii.a2b_base64(delta)
@@ -1,18 +1,21 @@
 # Chatty Friend
 # Finley 2025
 
-from chatty_async_manager import AsyncManager
+from chatty_async_manager import AsyncManager, EventDispatcher
 from chatty_mic import mic_listener
 from chatty_send_audio import stream_to_assistant
 from chatty_speaker import speaker_player
 from chatty_state import ChattyMasterState
 from chatty_realtime_messages import *
+from chatty_realtime_messages import DOWNLINK_AUDIO_EVENT_MARKER
 from chatty_wifi import is_online, what_is_my_ip
-from chatty_debug import start_debug_server, stop_debug_server, trace
+from chatty_debug import start_debug_server, stop_debug_server, register_stats_provider, trace
 
-from chatty_config import USER_SAID_WAKE_WORD, USER_STARTED_SPEAKING, ASSISTANT_STOP_SPEAKING, MASTER_EXIT_EVENT, ASSISTANT_RESUME_AFTER_AUTO_SUMMARY
+from chatty_config import USER_SAID_WAKE_WORD, USER_MAY_SAY_WAKE_WORD, USER_STARTED_SPEAKING, ASSISTANT_STOP_SPEAKING, MASTER_EXIT_EVENT, ASSISTANT_RESUME_AFTER_AUTO_SUMMARY
 from chatty_config import SPEAKER_PLAY_TONE, CHATTY_SONG_STARTUP, CHATTY_SONG_AWAKE
-from chatty_config import NORMAL_EXIT, UPGRADE_EXIT
+from chatty_config import NORMAL_EXIT, UPGRADE_EXIT, SECONDS_OF_AUDIO_TO_BUFFER, NATIVE_OAI_SAMPLE_RATE_HZ
+from chatty_dsp import PcmRingBuffer
+from chatty_jobs import JOB_DRAIN_SECONDS
 import websockets
 
 from typing import Any
@@ -22,49 +25,32 @@ import os
 WAKE_UP_INSTRUCTIONS = "You are starting a new conversation."
 SUMMARY_INSTRUCTIONS = "You were talking to the user a few minutes ago."
 
-async def grand_central_dispatch(master_state) -> list[tuple[str, Any]]:
+async def grand_central_dispatch(master_state, dispatcher: EventDispatcher) -> list[tuple[str, Any]]:
     """ main loop for the assistant.  listen for events from the remote AI and the mic/speaker/assistant managers
     parameters:
         master state
+        dispatcher: long-lived EventDispatcher over the managers' event queues and the websocket reader
     returns:
         list of tuples of (source, result) where source is the name of the manager that completed the task
     """
-
-    # create a task to monitor the websocket
-    websocket_task = asyncio.create_task(master_state.ws.recv()) if master_state.ws else None
-
-    # Create tasks to listen for events from each of the managers
-    manager_tasks = {}
-    for name, manager in master_state.task_managers.items():
-        manager_tasks[name] = asyncio.create_task(manager.event_q.get())
-
-    task_list = ([websocket_task] if websocket_task else [])+list(manager_tasks.values())
     results = []
 
     try:
 
         while True:
-            # Wait for the first task to complete (i.e., get an item from either queue)
-            done, pending = await asyncio.wait(
-                task_list,
-                timeout=10,
-                return_when=asyncio.FIRST_COMPLETED
-            )
-
-            if done:
+            # follow reconnects: the reader task owns recv() for whichever socket is current
+            dispatcher.attach_reader(master_state.ws)
+
+            result = await dispatcher.get(timeout=10)
+
+            if result is not None:
                 # got some activity.  reset the sleep timer and see what we got
                 master_state.last_activity_time = time.time()
-                for task in done:
-                    task_exception = task.exception()
-                    if task_exception:
-                        print(f"❌ Error in {task.get_name()} queue: {task_exception}")
-
-                    if task is websocket_task:
-                        results.append(("assistant", task.result()))
-                    else:
-                        for name, manager_task in manager_tasks.items():
-                            if task is manager_task:
-                                results.append((name, task.result()))
+                source, item = result
+                if isinstance(item, Exception):
+                    # the websocket reader failed - surface it here as if recv() had raised
+                    raise item
+                results.append(result)
 
                 # break out to process events
                 break
@@ -72,13 +58,12 @@ async def grand_central_dispatch(master_state) -> list[tuple[str, Any]]:
             # auto-expire if the socket has been open for too long
             await master_state.check_auto_summarize_time()
             master_state.check_assistant_timeout()
+            # quiet for a while - the web UI's snapshot catches up with the last turn
+            master_state.session_metrics.maybe_publish()
             
             if master_state.flow_control_event():
                 break
 
-        for task in pending:
-            task.cancel()
-
     except websockets.ConnectionClosed:
         print("🔄 Remote closed connection - summarizing")
         master_state.should_summarize = True
@@ -129,6 +114,11 @@ async def assistant_go_live():
     if master_state.conman.get_config("DEBUG_SERVER_ENABLED"):
         debug_port = master_state.conman.get_config("DEBUG_SERVER_PORT") or 9999
         await start_debug_server(port=debug_port)
+        register_stats_provider("conversation", master_state.session_metrics.get_stats)
+        register_stats_provider("jobs", master_state.jobs.get_stats)
+        register_stats_provider("usage", master_state.usage_ledger.get_stats)
+        # replaced with each realtime session, so looked up at call time
+        register_stats_provider("context", lambda: master_state.context_window.get_stats())
         trace("main", "chatty_friend starting")
 
     welcome_message = "Chatty Friend is named " + master_state.conman.get_config("WAKE_WORD_MODEL")
@@ -147,12 +137,17 @@ async def assistant_go_live():
         #     assistant (output) -> speaker (input)
         managers = {"mic"     : AsyncManager("mic",       mic_listener                                       )}
         managers["assistant"] = AsyncManager("assistant", stream_to_assistant, managers["mic"].output_q,     )
-        managers["speaker"]   = AsyncManager("speaker",   speaker_player,      managers["assistant"].output_q)
+        managers["speaker"]   = AsyncManager("speaker",   speaker_player,      managers["assistant"].output_q,
+                                             kwargs={"playback": PcmRingBuffer(SECONDS_OF_AUDIO_TO_BUFFER * NATIVE_OAI_SAMPLE_RATE_HZ)})
 
         print("🎙️ Chatty Friend is ready")
         trace("main", "ready - waiting for wake word")
 
-        await master_state.start_tasks(managers)
+        await master_state.start_tasks(managers, resuming=is_automated_restart_after_summary)
+
+        # one merged event stream for the life of this session - assistant audio is tapped off
+        # straight to the speaker, which decodes it and runs the jitter buffer
+        dispatcher = EventDispatcher(managers, taps=[(DOWNLINK_AUDIO_EVENT_MARKER, managers["speaker"].input_q)])
 
         if is_automated_restart_after_summary:
             if master_state.auto_summary_count < master_state.auto_summary_auto_resume_limit:
@@ -166,10 +161,14 @@ async def assistant_go_live():
             await managers["speaker"].command_q.put(SPEAKER_PLAY_TONE+":"+CHATTY_SONG_STARTUP)
             just_rebooted = False
 
+        # asleep: with REALTIME_PREWARM=standby a configured session waits for the wake word
+        if not master_state.ws:
+            master_state.realtime_connector.prewarm("standby")
+
         while not master_state.flow_control_event():
             try:
 
-                results = await grand_central_dispatch(master_state)
+                results = await grand_central_dispatch(master_state, dispatcher)
 
                 for source, result in results:
                     if source == "assistant":
@@ -181,6 +180,9 @@ async def assistant_go_live():
                             master_state.auto_summary_count = 0  # reset auto-resume budget on explicit wake
                             await master_state.add_to_transcript("system", await setup_assistant_session(master_state, WAKE_UP_INSTRUCTIONS))
                             await managers["speaker"].command_q.put(SPEAKER_PLAY_TONE+":"+CHATTY_SONG_AWAKE)
+                        elif result == USER_MAY_SAY_WAKE_WORD:
+                            # the wake detector started tracking (or nearly fired) - start connecting now
+                            master_state.realtime_connector.prewarm("tracking")
                         elif result == USER_STARTED_SPEAKING:
                             # within a session, user started speaking.stop audio that's already queued up
                             trace("main", "user started speaking")
@@ -216,7 +218,7 @@ async def assistant_go_live():
             deadman_audio_count = 0
             spkr = managers["speaker"]
             max_wait_iterations = 200  # Increased from 100 to 200 (20 seconds total)
-            while any([q.qsize() > 0 for q in [spkr.command_q, spkr.input_q, spkr.output_q]]):
+            while any([q.qsize() > 0 for q in [spkr.command_q, spkr.input_q]]) or spkr.playback.available() > 0:
                 await asyncio.sleep(0.1)
                 deadman_audio_count += 1
                 if deadman_audio_count > max_wait_iterations:
@@ -232,9 +234,16 @@ async def assistant_go_live():
             for manager in managers.values():
                 await manager.wait_for_done()
 
+            await dispatcher.close()
+
             if master_state.ws:
                 await master_state.ws.close()
 
+            if master_state.should_upgrade or master_state.should_quit:
+                # let queued supervisor / notification work finish - whatever doesn't stays spooled for the restart
+                await master_state.jobs.close(timeout=JOB_DRAIN_SECONDS)
+                master_state.usage_ledger.save()
+
             if master_state.should_upgrade:
                 print("🔄 UPGRADE REQUIRED")
                 exit(UPGRADE_EXIT)
@@ -251,6 +260,9 @@ async def assistant_go_live():
             traceback.print_exc()
 
     try:
+        await master_state.realtime_connector.close()
+        await master_state.jobs.close(timeout=JOB_DRAIN_SECONDS)
+        master_state.usage_ledger.save()
         master_state.pa.terminate()
     except Exception as e:
         print("error in assistant_go_live outer loop cleanup")
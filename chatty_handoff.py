@@ -0,0 +1,78 @@
+# Chatty Handoff
+# Finley 2025
+#
+#  Moving a long conversation onto a successor realtime session ---------
+#
+#  When a session nears its time / token / message limits a successor is opened alongside it with the
+#  recent turns in its instructions (see ChattyMasterState.request_session_rollover).  It is swapped in
+#  here at the next turn boundary - nothing being generated or streamed, the user not mid-utterance -
+#  or forced when the hard limit is close.  Turn boundaries are judged from state the main event path
+#  keeps, so the swap is retried at every response.done and every end of an audio stream.
+#
+
+import asyncio
+from chatty_context_window import ContextWindow
+from chatty_debug import trace
+
+# a handoff starts this long before the session hard limit and is forced this close to it
+SESSION_HANDOFF_LEAD_SECONDS = 180
+SESSION_HANDOFF_FORCE_SECONDS = 20
+# each recent turn handed to the successor session is trimmed to this many characters
+SESSION_HANDOFF_MAX_TURN_CHARS = 600
+
+
+def build_handoff_context(master_state) -> str:
+    """ the most recent turns, trimmed, for the successor session's instructions """
+    try:
+        max_turns = max(int(master_state.conman.get_config("SESSION_HANDOFF_RECENT_TURNS")), 1)
+    except:
+        max_turns = 12
+    turns = [item for item in master_state.transcript_history if item["role"] in ("user", "AI")][-max_turns:]
+    lines = []
+    for item in turns:
+        content = str(item["content"])
+        if len(content) > SESSION_HANDOFF_MAX_TURN_CHARS:
+            content = content[:SESSION_HANDOFF_MAX_TURN_CHARS] + "..."
+        lines.append(("User: " if item["role"] == "user" else "You: ") + content)
+    return "\n".join(lines)
+
+
+def is_at_turn_boundary(master_state) -> bool:
+    """ nothing in flight: no response being generated or streamed, and the user isn't mid-utterance """
+    state = master_state.remote_assistant_state
+    return not (state.get("responses_in_flight") or state.get("streaming_audio_item_ids") or state.get("user_speaking"))
+
+
+async def complete_session_handoff(master_state, force: bool = False) -> bool:
+    """ swap the successor session in, if one is ready and we're between turns (or force) """
+    prepared = master_state.pending_handoff
+    if prepared is None or not (force or is_at_turn_boundary(master_state)):
+        return False
+    master_state.pending_handoff = None
+
+    # one assignment moves every sender (mic uplink, tools) and the dispatcher's reader to the new socket;
+    # the old session's state (streaming items included) goes with it, so a barge-in only ever truncates
+    # items the current session knows
+    old_ws = master_state.ws
+    old_session_id = master_state.remote_assistant_state.get("session_id")
+    master_state.remote_assistant_state = {"session_open_time": prepared.open_time, "session_id": prepared.session_id}
+    master_state.wire_format = prepared.wire_format
+    master_state.ws = prepared.ws
+    master_state.session_metrics.start_realtime_session()
+    master_state.context_window.log_stats()
+    master_state.context_window = ContextWindow(master_state)
+    master_state.session_handoffs += 1
+
+    print(f"🔄 Session handed off {old_session_id} -> {prepared.session_id}")
+    trace("main", f"handoff: {old_session_id} -> {prepared.session_id}{' (forced)' if force else ''}, handoffs={master_state.session_handoffs}")
+    if old_ws is not None:
+        # the old session may still be flushing its close handshake - don't hold up the turn for it
+        asyncio.create_task(_close_retired_session(old_ws))
+    return True
+
+
+async def _close_retired_session(ws):
+    try:
+        await ws.close()
+    except Exception as e:
+        trace("main", f"handoff: closing old session failed: {e}")
@@ -0,0 +1,247 @@
+# Chatty Jobs
+# Finley 2025
+#
+#  Background work queue for the end of a conversation ---------
+#
+#  Supervisor analysis, notification emails / SMS and the cloud sync used to run inline when a
+#  conversation ended, before the mic listener was restarted - a wake word said in that window went
+#  unheard.  They are queued here instead and run one at a time behind the audio managers.
+#
+#  Every job is spooled to disk as JSON until it completes, so work queued before a restart or an
+#  upgrade still runs.  Failed jobs are retried with backoff and, once out of attempts, moved to the
+#  spool's failed/ directory for inspection.
+#
+
+import asyncio
+import itertools
+import json
+import os
+import time
+from chatty_debug import trace
+
+# job kinds
+JOB_SUPERVISOR_REPORT = "supervisor_report"
+JOB_EMAIL = "email"
+JOB_SMS = "sms"
+JOB_CLOUD_SYNC = "cloud_sync"
+
+JOB_SPOOL_DIR = "chatty_job_spool"
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 5
+JOB_RETRY_MAX_SECONDS = 300
+# how long shutdown waits for queued work before leaving it in the spool
+JOB_DRAIN_SECONDS = 15
+
+
+class JobQueue:
+    """
+    FIFO of spooled jobs, each {"id", "kind", "payload", "created", "attempts"}, run by a single worker task.
+
+    Handlers are registered per kind and called as handler(master_state, payload).  They report failure by
+    raising.  blocking=True handlers are plain functions run on a worker thread - use it for anything that
+    does network I/O synchronously (smtplib, the supabase client) so the event loop keeps serving audio.
+    """
+    STATS_LOG_INTERVAL_SECONDS = 60
+
+    def __init__(self, master_state, spool_dir: str = JOB_SPOOL_DIR, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.master_state = master_state
+        self.spool_dir = spool_dir
+        self.max_attempts = max_attempts
+        self._handlers = {}
+        self._queue = asyncio.Queue()
+        self._known = set()
+        self._retry_handles = set()
+        self._worker_task = None
+        self._spool_loaded = False
+        self._seq = itertools.count()
+        self.running = None
+
+        self.submitted = 0
+        self.recovered = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.last_error = None
+        self.last_stats_log_time = time.monotonic()
+
+    def register(self, kind: str, handler, blocking: bool = False):
+        self._handlers[kind] = (handler, blocking)
+
+    def _spool_path(self, job, failed: bool = False) -> str:
+        return os.path.join(self.spool_dir, "failed", job["id"] + ".json") if failed else os.path.join(self.spool_dir, job["id"] + ".json")
+
+    def _write_spool(self, job):
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = self._spool_path(job)
+            with open(path + ".tmp", "w") as f:
+                json.dump(job, f, default=str)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            # the job still runs from memory - it just won't survive a restart
+            print(f"⚠️ Could not spool {job['kind']} job: {e}")
+
+    def _remove_spool(self, job, failed: bool = False):
+        try:
+            if failed:
+                os.makedirs(os.path.join(self.spool_dir, "failed"), exist_ok=True)
+                os.replace(self._spool_path(job), self._spool_path(job, failed=True))
+            else:
+                os.remove(self._spool_path(job))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not clear spooled {job['kind']} job: {e}")
+
+    def _load_spool(self):
+        """ pick up jobs left over from before a restart, oldest first """
+        self._spool_loaded = True
+        try:
+            names = sorted(n for n in os.listdir(self.spool_dir) if n.endswith(".json"))
+        except FileNotFoundError:
+            return
+        for name in names:
+            try:
+                with open(os.path.join(self.spool_dir, name)) as f:
+                    job = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable spooled job {name}: {e}")
+                continue
+            if job.get("id") in self._known:
+                continue
+            self._known.add(job["id"])
+            self._queue.put_nowait(job)
+            self.recovered += 1
+        if self.recovered:
+            trace("jobs", f"recovered {self.recovered} spooled job(s)")
+
+    def start(self):
+        """ load the spool and start the worker (idempotent) """
+        if not self._spool_loaded:
+            self._load_spool()
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker(), name="job_worker")
+
+    def submit(self, kind: str, payload: dict) -> str:
+        """ queue a job; it is on disk before this returns """
+        created = time.time()
+        job = {"id": f"{int(created * 1000):013d}-{next(self._seq):04d}-{kind}",
+               "kind": kind, "payload": payload, "created": created, "attempts": 0}
+        self._write_spool(job)
+        self._known.add(job["id"])
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        trace("jobs", f"queued {kind} (depth {self.depth()})")
+        return job["id"]
+
+    def depth(self) -> int:
+        """ jobs waiting, waiting to retry or running """
+        return self._queue.qsize() + len(self._retry_handles) + (1 if self.running else 0)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.running = job
+            try:
+                await self._run(job)
+            finally:
+                self.running = None
+            self.maybe_log_stats()
+
+    async def _run(self, job):
+        handler, blocking = self._handlers.get(job["kind"], (None, False))
+        if handler is None:
+            print(f"⚠️ No handler for {job['kind']} job - leaving it in failed/")
+            self.failed += 1
+            self._remove_spool(job, failed=True)
+            return
+
+        job["attempts"] += 1
+        start = time.monotonic()
+        try:
+            if blocking:
+                await asyncio.to_thread(handler, self.master_state, job["payload"])
+            else:
+                await handler(self.master_state, job["payload"])
+        except asyncio.CancelledError:
+            # shutting down mid-job: it stays spooled and runs again after the restart
+            raise
+        except Exception as e:
+            self.last_error = f"{job['kind']}: {e}"
+            if job["attempts"] >= self.max_attempts:
+                print(f"❌ {job['kind']} job failed after {job['attempts']} attempts: {e}")
+                trace("jobs", f"{job['kind']} failed permanently after {job['attempts']} attempts: {e}")
+                self.failed += 1
+                self._remove_spool(job, failed=True)
+                return
+            delay = min(JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1), JOB_RETRY_MAX_SECONDS)
+            trace("jobs", f"{job['kind']} attempt {job['attempts']} failed ({e}) - retrying in {delay}s")
+            self.retries += 1
+            self._write_spool(job)
+            self._schedule_retry(job, delay)
+            return
+
+        latency = time.time() - job["created"]
+        self.completed += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self._remove_spool(job)
+        trace("jobs", f"{job['kind']} done in {(time.monotonic() - start) * 1000:.0f}ms, {latency:.1f}s after it was queued")
+
+    def _schedule_retry(self, job, delay: float):
+        handle = None
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(job)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def close(self, timeout: float = JOB_DRAIN_SECONDS):
+        """ give queued work up to timeout to finish, then stop.  Anything left stays spooled for next time. """
+        deadline = time.monotonic() + timeout
+        while (self._queue.qsize() or self.running) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker_task = None
+        self.log_stats()
+
+    def get_stats(self) -> dict:
+        """ queue depth, outcomes and queued-to-done latency (seconds) """
+        return {
+            "depth": self.depth(),
+            "submitted": self.submitted,
+            "recovered": self.recovered,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "latency_avg": self.latency_total / max(self.completed, 1),
+            "latency_max": self.latency_max,
+            "last_error": self.last_error,
+        }
+
+    def log_stats(self):
+        s = self.get_stats()
+        trace("jobs",
+            f"jobs: depth={s['depth']}, submitted={s['submitted']} (+{s['recovered']} recovered), "
+            f"completed={s['completed']}, failed={s['failed']}, retries={s['retries']}, "
+            f"latency={s['latency_avg']:.1f}/{s['latency_max']:.1f}s (avg/max)"
+            + (f", last error: {s['last_error']}" if s['last_error'] else "")
+        )
+
+    def maybe_log_stats(self):
+        now = time.monotonic()
+        if now - self.last_stats_log_time > self.STATS_LOG_INTERVAL_SECONDS:
+            self.last_stats_log_time = now
+            self.log_stats()
@@ -0,0 +1,160 @@
+# Chatty Metrics
+# Finley 2025
+#
+#  Running totals for the current conversation ---------
+#
+#  Tokens by type, cost, and message counts / bytes by role, updated in O(1) as responses finish and
+#  transcript entries arrive - the auto-summarize and cost checks read these instead of rescanning the
+#  transcript and usage history every turn.  A snapshot is published as JSON on the RAM drive for the
+#  web UI - at most once a second, so a busy turn isn't a file write per event - and the debug server
+#  serves get_stats() on request.
+#
+
+import json
+import os
+import time
+from chatty_debug import trace
+
+SESSION_METRICS_FILE = "/tmp/chatty_session_metrics.json"
+# the snapshot is rewritten at most this often; a change inside the interval waits for the next update
+# or the main loop's idle pass (maybe_publish)
+SESSION_METRICS_PUBLISH_SECONDS = 1.0
+
+# realtime usage -> (details key, cached?) per token type.  cached counts are a subset of their input type.
+TOKEN_TYPES = {
+    "input_text": ("input_token_details", False),
+    "input_audio": ("input_token_details", False),
+    "input_text_cached": ("input_token_details", True),
+    "input_audio_cached": ("input_token_details", True),
+    "output_text": ("output_token_details", False),
+    "output_audio": ("output_token_details", False),
+}
+
+# what a response was for, from the "kind" metadata set on its response.create (RESPONSE_MAIN if unset)
+RESPONSE_MAIN = "main"
+RESPONSE_TRANSCRIPTION = "transcription"
+RESPONSE_TOOL = "tool"
+RESPONSE_SYSTEM = "system"
+RESPONSE_KINDS = (RESPONSE_MAIN, RESPONSE_TRANSCRIPTION, RESPONSE_TOOL, RESPONSE_SYSTEM)
+
+
+def usage_token_counts(usage: dict) -> dict:
+    """ a response.done usage block as {token type: count} """
+    counts = {}
+    for token_type, (details_key, cached) in TOKEN_TYPES.items():
+        details = usage.get(details_key) or {}
+        if cached:
+            details = details.get("cached_tokens_details") or {}
+        counts[token_type] = details.get(token_type.split("_")[1] + "_tokens", 0)
+    return counts
+
+
+class SessionMetrics:
+    """
+    Totals for one conversation (wake to sleep), plus the part of it served by the current realtime
+    session - a session handoff starts those over while the conversation totals carry on.
+    """
+
+    def __init__(self, publish_path: str = SESSION_METRICS_FILE):
+        self.publish_path = publish_path
+        self.published_time = 0.0
+        self.unpublished = False
+        self.reset()
+
+    def reset(self):
+        """ a new conversation """
+        self.started_time = time.time()
+        self.tokens = dict.fromkeys(TOKEN_TYPES, 0)
+        self.total_tokens = 0
+        self.cost = 0.0
+        self.responses = 0
+        self.messages = {}
+        self.message_bytes = {}
+        self.message_count = 0
+        self.realtime_sessions = 0
+        self.start_realtime_session()
+        self.publish()
+
+    def start_realtime_session(self):
+        """ a new realtime session is serving the conversation """
+        self.realtime_sessions += 1
+        self.session_tokens = 0
+        self.session_cost = 0.0
+        self.session_responses = 0
+        self.context_tokens = 0  # input tokens of the latest main response: how much context the model re-reads
+
+    def record_response(self, usage: dict, cost: float, kind: str = RESPONSE_MAIN):
+        """ one response.done: its usage block, what it cost and what it was for """
+        for token_type, count in usage_token_counts(usage).items():
+            self.tokens[token_type] += count
+        if kind == RESPONSE_MAIN:
+            self.context_tokens = usage.get("input_tokens", 0)
+        tokens = usage.get("total_tokens", 0)
+        self.total_tokens += tokens
+        self.session_tokens += tokens
+        self.cost += cost
+        self.session_cost += cost
+        self.responses += 1
+        self.session_responses += 1
+        self.unpublished = True
+        self.maybe_publish()
+
+    def record_message(self, role: str, content):
+        self.messages[role] = self.messages.get(role, 0) + 1
+        self.message_bytes[role] = self.message_bytes.get(role, 0) + len(str(content).encode("utf-8"))
+        self.message_count += 1
+        self.unpublished = True
+        self.maybe_publish()
+
+    def get_stats(self) -> dict:
+        """ conversation totals, the current realtime session's share, and messages / bytes by role """
+        return {
+            "started": self.started_time,
+            "duration_s": time.time() - self.started_time,
+            "cost": self.cost,
+            "responses": self.responses,
+            "total_tokens": self.total_tokens,
+            "tokens": dict(self.tokens),
+            "realtime_sessions": self.realtime_sessions,
+            "session_cost": self.session_cost,
+            "session_tokens": self.session_tokens,
+            "session_responses": self.session_responses,
+            "context_tokens": self.context_tokens,
+            "message_count": self.message_count,
+            "messages": dict(self.messages),
+            "message_bytes": dict(self.message_bytes),
+        }
+
+    def log_stats(self):
+        s = self.get_stats()
+        trace("main",
+            f"conversation: {s['duration_s']:.0f}s, ${s['cost']:.3f}, {s['responses']} responses, {s['total_tokens']} tokens "
+            f"(session {s['session_tokens']}, context {s['context_tokens']}), messages={s['messages']}"
+        )
+
+    def maybe_publish(self):
+        """ publish pending changes unless the snapshot was written within SESSION_METRICS_PUBLISH_SECONDS """
+        if self.unpublished and time.monotonic() - self.published_time >= SESSION_METRICS_PUBLISH_SECONDS:
+            self.publish()
+
+    def publish(self):
+        """ write the snapshot for the web UI (atomic replace; never raises) """
+        self.published_time = time.monotonic()
+        self.unpublished = False
+        if not self.publish_path:
+            return
+        try:
+            with open(self.publish_path + ".tmp", "w") as f:
+                json.dump(self.get_stats(), f)
+            os.replace(self.publish_path + ".tmp", self.publish_path)
+        except Exception:
+            pass
+
+
+def load_session_metrics(path: str = SESSION_METRICS_FILE):
+    """ the last published snapshot, or None if there isn't one """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception:
+        return None
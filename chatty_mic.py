@@ -3,13 +3,16 @@
 
 import asyncio
 import sys
+import threading
 import time
 import numpy as np
 from chatty_async_manager import AsyncManager
 import pyaudio
-from chatty_config import USER_SAID_WAKE_WORD, USER_STARTED_SPEAKING, ASSISTANT_GO_TO_SLEEP, MASTER_EXIT_EVENT, SAMPLE_RATE_HZ, AUDIO_BLOCKSIZE, ASSISTANT_RESUME_AFTER_AUTO_SUMMARY
+from chatty_config import USER_SAID_WAKE_WORD, USER_MAY_SAY_WAKE_WORD, USER_STARTED_SPEAKING, ASSISTANT_GO_TO_SLEEP, MASTER_EXIT_EVENT, SAMPLE_RATE_HZ, AUDIO_BLOCKSIZE, ASSISTANT_RESUME_AFTER_AUTO_SUMMARY
 from chatty_config import SPEAKER_PLAY_TONE, CHATTY_SONG_NEAR_MISS
 from chatty_debug import trace
+from chatty_dsp import FrameFeatureExtractor, NoiseBank, FrameHistoryRing, frame_features, CLIP_THRESHOLD
+from chatty_wake_worker import WakeInferenceWorker, WakeDecision
 
 try:
     from openwakeword.model import Model as OpenWakewordModel
@@ -110,61 +113,156 @@ class AutoNoiseManager:
         }
 
 
+class WakeCascade:
+    """
+    Energy -> VAD -> wake model gate for idle listening.
+
+    Asleep in a quiet room nearly every frame is silence, so the models only run when there
+    is something to hear: frame energy above the ambient estimate opens VAD, and VAD activity
+    (or a tracked cluster / cooldown) opens the wake model.  Each tier stays open for a
+    hangover after its last hit, so both models end every active stretch on ~1s of real
+    ambient audio - their state is then what continuous silence would have left.
+
+    Frames that skip the wake model are kept (raw, with their noise level) in a short replay
+    ring and re-fed to it when the gate opens, so its streaming mel/embedding window holds the
+    real audio leading into the onset instead of audio from the last active stretch.
+    """
+
+    def __init__(self, replay_frames: int = 8, frame_samples: int = 1280):
+        self.enabled = True
+        self.min_rms = 80.0          # energy gate never drops below this (quiet room, warm ambient)
+        self.energy_ratio = 2.0      # energy gate = ambient RMS x ratio (~6 dB over the room)
+        self.vad_gate = 0.1          # VAD score that opens the wake model (below VAD_THRESHOLD)
+        self.hangover_frames = 12    # ~1s - covers the wake model's 200-400ms latency behind voice
+        self.frame_samples = frame_samples
+        self._allocate_replay(replay_frames)
+        self.reset()
+
+    def _allocate_replay(self, replay_frames: int):
+        self.replay_frames = replay_frames
+        self.replay_audio = np.zeros((max(replay_frames, 1), self.frame_samples), dtype=np.int16)
+        self.replay_noise = np.zeros(max(replay_frames, 1), dtype=np.float32)
+
+    def configure(self, cfg):
+        """Read gate settings from config (re-read each session so web UI edits apply)."""
+        enabled = cfg.get_config("WAKE_CASCADE")
+        self.enabled = True if enabled is None else bool(enabled)
+        self.min_rms = float(cfg.get_config("WAKE_CASCADE_MIN_RMS") or 80.0)
+        self.energy_ratio = float(cfg.get_config("WAKE_CASCADE_ENERGY_RATIO") or 2.0)
+        self.vad_gate = float(cfg.get_config("WAKE_CASCADE_VAD_GATE") or 0.1)
+        self.hangover_frames = int(cfg.get_config("WAKE_CASCADE_HANGOVER_FRAMES") or 12)
+        replay_frames = cfg.get_config("WAKE_CASCADE_REPLAY_FRAMES")
+        replay_frames = 8 if replay_frames is None else int(replay_frames)
+        if replay_frames != self.replay_frames:
+            self._allocate_replay(replay_frames)
+
+    def reset(self):
+        # gates start open: a new session runs both models until the room has been heard quiet
+        self.energy_quiet = 0
+        self.voice_quiet = 0
+        self.replay_count = 0
+        self.replay_next = 0
+
+        # tier stats (frames that reached the gate, and how many each tier let through)
+        self.frames = 0
+        self.energy_hits = 0
+        self.vad_runs = 0
+        self.vad_hits = 0
+        self.wake_runs = 0
+        self.replayed = 0
+        self.vad_ms_total = 0.0
+        self.wake_ms_total = 0.0
+
+    def vad_open(self, rms: float, ambient_rms) -> bool:
+        """Tier 1: run VAD on this frame?  Energy over the ambient estimate (or no estimate yet) opens it."""
+        self.frames += 1
+        self.energy_quiet += 1
+        self.voice_quiet += 1
+        if ambient_rms is None or rms >= max(self.min_rms, ambient_rms * self.energy_ratio):
+            self.energy_quiet = 0
+            self.energy_hits += 1
+        run = self.energy_quiet <= self.hangover_frames or self.voice_quiet <= self.hangover_frames
+        if run:
+            self.vad_runs += 1
+        return run
+
+    def wake_open(self, vad_score: float, busy: bool) -> bool:
+        """Tier 2: run the wake model?  VAD activity opens it; busy (tracking/cooldown) holds it open."""
+        if vad_score >= self.vad_gate:
+            self.voice_quiet = 0
+            self.vad_hits += 1
+        run = busy or self.voice_quiet <= self.hangover_frames
+        if run:
+            self.wake_runs += 1
+        return run
+
+    def hold(self, audio: np.ndarray, noise_level: float):
+        """Keep a frame the wake model skipped, for replay when the gate opens."""
+        if not self.replay_frames:
+            return
+        slot = self.replay_next
+        n = min(len(audio), self.frame_samples)
+        self.replay_audio[slot, :n] = audio[:n]
+        self.replay_audio[slot, n:] = 0
+        self.replay_noise[slot] = noise_level
+        self.replay_next = (slot + 1) % self.replay_frames
+        self.replay_count = min(self.replay_count + 1, self.replay_frames)
+
+    def drain(self):
+        """Yield held (audio, noise_level) pairs oldest-first and empty the ring."""
+        count = self.replay_count
+        self.replay_count = 0
+        start = self.replay_next - count
+        for i in range(start, start + count):
+            slot = i % self.replay_frames
+            self.replayed += 1
+            yield self.replay_audio[slot], float(self.replay_noise[slot])
+
+    def get_stats(self) -> dict:
+        """Per-tier pass rates and the share of model CPU the gate saved (estimated from measured model cost)."""
+        frames = max(self.frames, 1)
+        vad_ms = self.vad_ms_total / max(self.vad_runs, 1)
+        wake_ms = self.wake_ms_total / max(self.wake_runs + self.replayed, 1)
+        full_cost = self.frames * (vad_ms + wake_ms)
+        spent = self.vad_runs * vad_ms + (self.wake_runs + self.replayed) * wake_ms
+        return {
+            'frames': self.frames,
+            'energy_rate': self.energy_hits / frames,
+            'vad_rate': self.vad_runs / frames,
+            'voice_rate': self.vad_hits / frames,
+            'wake_rate': self.wake_runs / frames,
+            'replayed': self.replayed,
+            'vad_ms': vad_ms,
+            'wake_ms': wake_ms,
+            'cpu_saved': 1.0 - spent / full_cost if full_cost > 0 else 0.0,
+        }
+
+
 class WakeWordDetector:
-    """Wraps openwakeword model for wake word detection with cluster-based detection and auto-noise."""
+    """Wraps openwakeword model for wake word detection with cluster-based detection and auto-noise.
+
+    Loading the wake word model and the standalone VAD takes seconds on a Pi, so one detector
+    lives for the whole process (see get_wake_word_detector) and each mic_listener borrows it.
+    reset_session() clears the per-session tracking state; models and noise tracking stay warm.
+
+    lock is held by a WakeInferenceWorker for each frame it scores, and by reset_session(), so a new
+    session can't clear the history or cascade underneath a worker that is still finishing up.
+    """
     def __init__(self, master_state):
         self.model = None
         self.master_state = master_state
-        cfg = master_state.conman
+        self.lock = threading.RLock()
 
         # Audio characteristics: 80ms frames at 16kHz -> 1280 samples per call
         self.sample_rate = 16000
         self.frame_duration_sec = 0.08
         self.frame_samples = int(self.sample_rate * self.frame_duration_sec)  # 1280
 
-        # --- VAD history for is_voice detection
-        # Store actual VAD scores (not just booleans) for max_vad lookback
-        self.vad_history = deque(maxlen=25)
-        self.vad_score_history = deque(maxlen=25)  # Track actual scores for peak detection
-
         # --- Activity logging state (rate-limited to once per second)
         self.activity_log_interval = 1.0  # seconds between activity logs
-        self.last_vad_log_time = 0
-
-        # --- Cluster-based detection state
-        self.tracking = False
-        self.tracking_scores = []
-        self.tracking_vad_scores = []  # Track VAD during detection for gating
-        self.tracking_start_time = 0.0
-        self.cooldown_remaining = 0
 
-        # --- Detection thresholds from config
-        self.entry_threshold = cfg.get_config("WAKE_ENTRY_THRESHOLD") or 0.35
-        self.confirm_peak = cfg.get_config("WAKE_CONFIRM_PEAK") or 0.45
-        self.confirm_cumulative = cfg.get_config("WAKE_CONFIRM_CUMULATIVE") or 1.2
-        self.min_frames_above_entry = int(cfg.get_config("WAKE_MIN_FRAMES_ABOVE_ENTRY") or 2)
-        self.cooldown_frames = int(cfg.get_config("WAKE_COOLDOWN_FRAMES") or 5)
-        
-        # --- Near-miss chirp feedback
-        self.near_miss_peak_ratio = float(cfg.get_config("NEAR_MISS_PEAK_RATIO") or 0.80)
-        self.near_miss_cooldown_seconds = float(cfg.get_config("NEAR_MISS_COOLDOWN_SECONDS") or 5.0)
+        # --- Near-miss chirp feedback (cooldown spans sessions)
         self.last_near_miss_time = 0
-        self.near_miss_chirp = False  # Flag consumed by mic_listener to emit tone
-        
-        # --- Continuous speech rejection thresholds
-        # When wake word is detected in the middle of ongoing speech (not isolated utterance),
-        # it's contextually unlikely to be intentional - real wake words are typically spoken
-        # after a pause, not mid-conversation. Require very high confidence to override context.
-        self.continuous_speech_max_ms = float(cfg.get_config("WAKE_CONTINUOUS_SPEECH_MAX_MS") or 1500.0)
-        self.continuous_speech_peak = float(cfg.get_config("WAKE_CONTINUOUS_SPEECH_PEAK") or 0.88)
-        
-        # --- Stale voice rejection: sub-threshold overlap check
-        # When voice is only detected in lookback history (not during tracking),
-        # check for temporal co-occurrence of VAD and wake signals. In a real wake word,
-        # the decaying voice tail overlaps with the rising wake score. No overlap = stale voice.
-        self.overlap_vad_min = float(cfg.get_config("WAKE_OVERLAP_VAD_MIN") or 0.18)
-        self.overlap_wake_min = float(cfg.get_config("WAKE_OVERLAP_WAKE_MIN") or 0.05)
-        self.overlap_lookback_frames = int(cfg.get_config("WAKE_OVERLAP_LOOKBACK_FRAMES") or 8)
 
         # --- Platform-specific detection mode
         # On macOS, VAD and wake word model have timing desync (~300-500ms latency difference)
@@ -172,13 +270,13 @@ class WakeWordDetector:
         # Use simplified detection on Mac: trust high peak scores with voice-in-history only.
         self.is_macos = sys.platform == 'darwin'
 
-        # --- Auto-noise manager
-        noise_target = cfg.get_config("NOISE_TARGET_FLOOR") or 120.0
-        noise_max = cfg.get_config("NOISE_MAX_INJECTION") or 85.0
-        self.noise_manager = AutoNoiseManager(
-            target_floor=noise_target,
-            max_injection=noise_max
-        )
+        # --- Auto-noise manager (ambient estimate stays warm across sessions)
+        self.noise_manager = AutoNoiseManager()
+        # pre-generated noise table: injection runs on every idle frame, 24/7
+        self.noise_bank = NoiseBank()
+
+        # --- Idle-listening cascade: quiet frames skip VAD and/or the wake model
+        self.cascade = WakeCascade(frame_samples=self.frame_samples)
 
         # --- Standalone VAD model (separate from wake word model to avoid
         #     double-invocation of stateful LSTM and to use correct frame size)
@@ -192,6 +290,7 @@ class WakeWordDetector:
 
         # --- Load wake word model
         base_assistant_name = master_state.conman.get_wake_word_model()
+        self.model_name = base_assistant_name
         if OpenWakewordModel and base_assistant_name:
             oww = None
             for extension in ["tflite", "onnx"]:
@@ -229,6 +328,85 @@ class WakeWordDetector:
 
         # Periodic heartbeat logging for debugging (every 5 seconds)
         self.heartbeat_interval = 5.0
+
+        # --- Instrumentation ring buffer for wake word analysis
+        # Captures ~5 seconds of history (62 frames at 80ms each)
+        # Dumped to log on wake word detection to help diagnose false positives
+        # The current cluster's frames are the newest records, so cluster stats are ring queries too.
+        self.history_buffer_size = 62  # ~5 seconds
+        self.frame_history = FrameHistoryRing(self.history_buffer_size)
+
+        # --- VAD history for is_voice detection (every frame, including vad_only ones)
+        # Store actual VAD scores (not just booleans) for max_vad lookback
+        self.vad_score_history = FrameHistoryRing(25, fields=[("vad", np.float32)])
+
+        self.reset_session()
+
+    def _load_detection_config(self):
+        """Read detection thresholds from config (cheap - re-read each session so web UI edits apply)."""
+        cfg = self.master_state.conman
+
+        # --- Detection thresholds from config
+        self.entry_threshold = cfg.get_config("WAKE_ENTRY_THRESHOLD") or 0.35
+        self.confirm_peak = cfg.get_config("WAKE_CONFIRM_PEAK") or 0.45
+        self.confirm_cumulative = cfg.get_config("WAKE_CONFIRM_CUMULATIVE") or 1.2
+        self.min_frames_above_entry = int(cfg.get_config("WAKE_MIN_FRAMES_ABOVE_ENTRY") or 2)
+        self.cooldown_frames = int(cfg.get_config("WAKE_COOLDOWN_FRAMES") or 5)
+        
+        # --- Near-miss chirp feedback
+        self.near_miss_peak_ratio = float(cfg.get_config("NEAR_MISS_PEAK_RATIO") or 0.80)
+        self.near_miss_cooldown_seconds = float(cfg.get_config("NEAR_MISS_COOLDOWN_SECONDS") or 5.0)
+        
+        # --- Continuous speech rejection thresholds
+        # When wake word is detected in the middle of ongoing speech (not isolated utterance),
+        # it's contextually unlikely to be intentional - real wake words are typically spoken
+        # after a pause, not mid-conversation. Require very high confidence to override context.
+        self.continuous_speech_max_ms = float(cfg.get_config("WAKE_CONTINUOUS_SPEECH_MAX_MS") or 1500.0)
+        self.continuous_speech_peak = float(cfg.get_config("WAKE_CONTINUOUS_SPEECH_PEAK") or 0.88)
+        
+        # --- Stale voice rejection: sub-threshold overlap check
+        # When voice is only detected in lookback history (not during tracking),
+        # check for temporal co-occurrence of VAD and wake signals. In a real wake word,
+        # the decaying voice tail overlaps with the rising wake score. No overlap = stale voice.
+        self.overlap_vad_min = float(cfg.get_config("WAKE_OVERLAP_VAD_MIN") or 0.18)
+        self.overlap_wake_min = float(cfg.get_config("WAKE_OVERLAP_WAKE_MIN") or 0.05)
+        self.overlap_lookback_frames = int(cfg.get_config("WAKE_OVERLAP_LOOKBACK_FRAMES") or 8)
+
+        # --- Auto-noise targets (keeps the warm ambient estimate)
+        self.noise_manager.target_floor = cfg.get_config("NOISE_TARGET_FLOOR") or 120.0
+        self.noise_manager.max_injection = cfg.get_config("NOISE_MAX_INJECTION") or 85.0
+        self.noise_manager.max_ambient_rms = self.noise_manager.target_floor * 2
+
+        # --- Energy -> VAD -> wake model gate
+        self.cascade.configure(cfg)
+
+        # --- Wake trim: how far the wake score peak lags the end of the spoken wake word
+        self.wake_trim_latency_ms = float(cfg.get_config("WAKE_TRIM_LATENCY_MS") or 160.0)
+
+    def reset_session(self):
+        """
+        Clear per-session tracking state before a new mic_listener borrows the detector.
+        Models, VAD and the noise manager's ambient estimate are left warm.
+        """
+        with self.lock:
+            self._load_detection_config()
+
+            self.vad_score_history.clear()
+            self.frame_history.clear()
+            self.cascade.reset()
+
+            self.last_vad_log_time = 0
+
+            # --- Cluster-based detection state
+            self.tracking = False
+            self.tracking_frames = 0  # cluster length; its wake/VAD scores are the newest frame_history records
+            self.tracking_start_time = 0.0
+            self.cooldown_remaining = 0
+            self.near_miss_chirp = False  # Flag consumed by mic_listener to emit tone
+            self.tracking_started = False  # Flag consumed by mic_listener to pre-warm the realtime connection
+        self.post_wake_samples = 0  # Set on detection: samples at the end of the stream that follow the wake word
+
+        # Heartbeat stats
         self.last_heartbeat_time = 0
         self.frames_since_heartbeat = 0
         self.max_score_since_heartbeat = 0.0
@@ -236,13 +414,7 @@ class WakeWordDetector:
         self.max_rms_since_heartbeat = 0.0
         self.max_noise_since_heartbeat = 0.0
 
-        # --- Instrumentation ring buffer for wake word analysis
-        # Captures ~5 seconds of history (62 frames at 80ms each)
-        # Dumped to log on wake word detection to help diagnose false positives
-        self.history_buffer_size = 62  # ~5 seconds
-        self.frame_history = deque(maxlen=self.history_buffer_size)
-
-        # Log config values at startup
+        # Log config values for this session
         self._log_startup_config()
 
     def _log_startup_config(self):
@@ -262,7 +434,10 @@ class WakeWordDetector:
             f"cont_speech_max={self.continuous_speech_max_ms}ms, "
             f"cont_speech_peak={self.continuous_speech_peak}, "
             f"near_miss_ratio={self.near_miss_peak_ratio}, "
-            f"near_miss_cooldown={self.near_miss_cooldown_seconds}s"
+            f"near_miss_cooldown={self.near_miss_cooldown_seconds}s, "
+            f"cascade={'on' if self.cascade.enabled else 'off'}"
+            f"(min_rms={self.cascade.min_rms}, ratio={self.cascade.energy_ratio}, vad_gate={self.cascade.vad_gate}, "
+            f"hangover={self.cascade.hangover_frames}, replay={self.cascade.replay_frames})"
         )
         print(config_info)
         trace("wake", config_info)
@@ -271,14 +446,7 @@ class WakeWordDetector:
     def _record_frame(self, vad_score: float, wake_score: float, rms: float, 
                       noise_level: float, is_tracking: bool):
         """Record a frame's data to the history buffer for later analysis."""
-        self.frame_history.append({
-            't': time.time(),
-            'vad': vad_score,
-            'wake': wake_score,
-            'rms': rms,
-            'noise': noise_level,
-            'tracking': is_tracking,
-        })
+        self.frame_history.append(time.time(), vad_score, wake_score, rms, noise_level, is_tracking)
 
     def _dump_detection_history(self, detection_reason: str, num_frames: int, 
                                  duration_ms: float, scores: list):
@@ -286,38 +454,26 @@ class WakeWordDetector:
         Dump the frame history to logs when wake word is detected.
         This helps analyze false positives by showing context before detection.
         """
-        if not self.frame_history:
+        if not len(self.frame_history):
             return
         
-        history = list(self.frame_history)
-        
-        # Calculate derived metrics for analysis
-        vad_scores = [f['vad'] for f in history]
-        wake_scores = [f['wake'] for f in history]
-        rms_values = [f['rms'] for f in history]
+        history = self.frame_history.recent()
         
         # Find silence gaps (low VAD periods) in the history
         vad_threshold = self.master_state.conman.get_config("VAD_THRESHOLD") or 0.3
-        silence_frames = sum(1 for v in vad_scores if v < vad_threshold)
-        voice_frames = len(vad_scores) - silence_frames
+        voice_frames = self.frame_history.count_above('vad', vad_threshold, or_equal=True)
         
         # Check for pre-detection silence (was there quiet before tracking started?)
         # Look at the last 20 frames (~1.6s) before detection
-        recent_frames = history[-20:] if len(history) >= 20 else history
+        recent_frames = self.frame_history.recent(20)
         pre_silence_count = 0
-        for i, f in enumerate(recent_frames):
-            if f['tracking']:
-                # Count silence frames before tracking started
-                pre_silence_count = sum(1 for ff in recent_frames[:i] if ff['vad'] < vad_threshold)
-                break
+        tracked = np.flatnonzero(recent_frames['tracking'])
+        if len(tracked):
+            # Count silence frames before tracking started
+            pre_silence_count = int(np.count_nonzero(recent_frames['vad'][:tracked[0]] < vad_threshold))
         
         # Find continuous speech duration before detection
-        continuous_voice_before = 0
-        for f in reversed(history[:-num_frames] if num_frames < len(history) else []):
-            if f['vad'] >= vad_threshold:
-                continuous_voice_before += 1
-            else:
-                break
+        continuous_voice_before = self.frame_history.run_length_before('vad', vad_threshold, skip=num_frames) if num_frames < len(history) else 0
         continuous_voice_ms = continuous_voice_before * 80  # 80ms per frame
         
         # Build summary line
@@ -336,11 +492,12 @@ class WakeWordDetector:
         # Group into lines of ~10 frames for readability
         base_time = history[0]['t']
         frame_data = []
-        for f in history:
-            rel_t = (f['t'] - base_time) * 1000  # ms since start
-            tracking_flag = "T" if f['tracking'] else "."
+        for t, vad, wake, rms, tracking in zip(history['t'].tolist(), history['vad'].tolist(), history['wake'].tolist(),
+                                               history['rms'].tolist(), history['tracking'].tolist()):
+            rel_t = (t - base_time) * 1000  # ms since start
+            tracking_flag = "T" if tracking else "."
             # Compact format: time|vad|wake|rms|flag
-            frame_data.append(f"{rel_t:5.0f}|{f['vad']:.2f}|{f['wake']:.3f}|{f['rms']:5.0f}|{tracking_flag}")
+            frame_data.append(f"{rel_t:5.0f}|{vad:.2f}|{wake:.3f}|{rms:5.0f}|{tracking_flag}")
         
         # Log in chunks of 10 frames per line
         chunk_size = 10
@@ -353,7 +510,10 @@ class WakeWordDetector:
         trace("wake", f"  DETECTION SCORES: [{','.join(f'{s:.3f}' for s in scores)}]")
 
     def calculate_signal_strength(self, audio_samples: np.ndarray) -> float:
-        """Calculate RMS (Root Mean Square) amplitude of audio signal."""
+        """Calculate RMS (Root Mean Square) amplitude of audio signal (reuses the frame's features if attached)."""
+        features = frame_features(audio_samples)
+        if features:
+            return features.rms
         return np.sqrt(np.mean(audio_samples.astype(np.float64) ** 2))
     
     def detect_audio_quality_issues(self, audio_samples: np.ndarray) -> tuple[bool, str]:
@@ -363,21 +523,22 @@ class WakeWordDetector:
         Returns: (has_issues, issue_description)
         """
         issues = []
+        features = frame_features(audio_samples)
         
         # Fast checks first (avoid expensive operations if possible)
-        max_val = np.max(np.abs(audio_samples))
+        max_val = features.peak if features else np.max(np.abs(audio_samples.astype(np.int32)))
         
         # Check for clipping (samples at max/min values) - fast check
-        clipping_threshold = 32000  # Close to int16 max (32767)
+        clipping_threshold = CLIP_THRESHOLD  # Close to int16 max (32767)
         if max_val > clipping_threshold:
             # Only count clipped samples if we detected high values
-            clipped_count = np.sum(np.abs(audio_samples) > clipping_threshold)
+            clipped_count = features.clip_count if features else np.sum(np.abs(audio_samples.astype(np.int32)) > clipping_threshold)
             clipping_percent = clipped_count / len(audio_samples) * 100
             if clipping_percent > 1.0:  # More than 1% clipped
                 issues.append(f"clipping ({clipping_percent:.1f}%)")
         
         # Use fast energy estimate (mean abs) instead of full RMS for initial check
-        energy = np.mean(np.abs(audio_samples.astype(np.int32)))
+        energy = features.mean_abs if features else np.mean(np.abs(audio_samples.astype(np.int32)))
         
         # Check for very low signal or silence
         if energy < 10.0:
@@ -411,37 +572,37 @@ class WakeWordDetector:
         is_voice = vad_score > vad_threshold
         
         if self.tracking:
-            # We're tracking a potential wake word
-            self.tracking_scores.append(max_score)
-            self.tracking_vad_scores.append(vad_score)
+            # We're tracking a potential wake word (this frame is already the newest frame_history record)
+            self.tracking_frames += 1
+            # clusters longer than the history (~5s of above-entry scores) are judged on their newest frames
+            cluster = min(self.tracking_frames, len(self.frame_history))
+            history = self.frame_history
             
             # Log each frame while tracking for debugging
-            trace("wake", f"tracking: frame={len(self.tracking_scores)}, score={max_score:.3f}, vad={vad_score:.2f}, above_entry={above_entry}")
+            trace("wake", f"tracking: frame={self.tracking_frames}, score={max_score:.3f}, vad={vad_score:.2f}, above_entry={above_entry}")
             
             if not above_entry:
                 # Score dropped below entry - evaluate the cluster
-                peak_score = max(self.tracking_scores)
-                cumulative_score = sum(self.tracking_scores)
-                frames_above = sum(1 for s in self.tracking_scores if s >= self.entry_threshold)
+                peak_score = history.window_max('wake', cluster)
+                cumulative_score = history.window_sum('wake', cluster)
+                frames_above = history.count_above('wake', self.entry_threshold, cluster, or_equal=True)
                 
                 # VAD gating: check for voice DURING tracking OR in recent history
                 # Wake word model has ~200-300ms latency, so voice may have been
                 # detected before the wake score spiked
-                voice_frames_tracking = sum(1 for v in self.tracking_vad_scores if v > vad_threshold)
+                voice_frames_tracking = history.count_above('vad', vad_threshold, cluster)
                 
                 # Check VAD history (lookback ~10 frames = 800ms before tracking)
                 vad_lookback = 10
-                recent_vad = list(self.vad_history)[-vad_lookback:] if self.vad_history else []
-                voice_frames_history = sum(1 for v in recent_vad if v)  # vad_history stores booleans
+                voice_frames_history = self.vad_score_history.count_above('vad', vad_threshold, vad_lookback)
                 
                 has_voice = voice_frames_tracking > 0 or voice_frames_history > 0
-                max_vad_tracking = max(self.tracking_vad_scores) if self.tracking_vad_scores else 0
+                max_vad_tracking = history.window_max('vad', cluster)
                 
                 # Get max VAD from history window (BEFORE tracking started)
                 # This is critical: wake word model has ~200-400ms latency, so by the time
                 # the wake score spikes, the actual voice has often already passed
-                recent_vad_scores = list(self.vad_score_history)[-vad_lookback:] if self.vad_score_history else []
-                max_vad_history = max(recent_vad_scores) if recent_vad_scores else 0
+                max_vad_history = self.vad_score_history.window_max('vad', vad_lookback)
                 
                 # Use the MAXIMUM of tracking VAD and recent history VAD
                 # This accounts for wake word model latency where voice precedes wake score
@@ -466,18 +627,11 @@ class WakeWordDetector:
                 
                 # Calculate continuous voice duration before tracking started
                 # This detects if wake word appeared in middle of ongoing conversation
-                history = list(self.frame_history)
-                num_tracking_frames = len(self.tracking_scores)
+                num_tracking_frames = self.tracking_frames
                 continuous_voice_before_ms = 0
                 if len(history) > num_tracking_frames:
                     # Count consecutive voice frames before tracking started
-                    pre_tracking_history = history[:-num_tracking_frames] if num_tracking_frames > 0 else history
-                    continuous_voice_frames = 0
-                    for f in reversed(pre_tracking_history):
-                        if f['vad'] >= vad_threshold:
-                            continuous_voice_frames += 1
-                        else:
-                            break
+                    continuous_voice_frames = history.run_length_before('vad', vad_threshold, skip=num_tracking_frames)
                     continuous_voice_before_ms = continuous_voice_frames * 80  # 80ms per frame
                 
                 # Determine required peak based on speech context
@@ -494,13 +648,8 @@ class WakeWordDetector:
                 # voice only found further back in the lookback is stale/unrelated.
                 has_voice_proximity = False
                 if voice_frames_tracking == 0:
-                    overlap_start = max(0, len(history) - num_tracking_frames - self.overlap_lookback_frames)
-                    overlap_end = max(0, len(history) - num_tracking_frames)
-                    pre_tracking_window = history[overlap_start:overlap_end]
-                    for f in pre_tracking_window:
-                        if f['vad'] >= self.overlap_vad_min:
-                            has_voice_proximity = True
-                            break
+                    has_voice_proximity = history.any_above('vad', self.overlap_vad_min, self.overlap_lookback_frames,
+                                                            skip=num_tracking_frames, or_equal=True)
                 else:
                     # Voice during tracking = direct temporal overlap
                     has_voice_proximity = True
@@ -555,15 +704,20 @@ class WakeWordDetector:
                 
                 # Reset tracking state (save scores before clearing)
                 tracking_duration_ms = (time.time() - self.tracking_start_time) * 1000
-                num_frames = len(self.tracking_scores)
-                detection_scores = list(self.tracking_scores)  # Copy for history dump
-                scores_str = ",".join(f"{s:.2f}" for s in self.tracking_scores[-10:])  # Last 10 scores
-                vad_str = ",".join(f"{v:.2f}" for v in self.tracking_vad_scores[-10:])  # Last 10 VAD scores
+                num_frames = self.tracking_frames
+                cluster_frames = history.recent(cluster)
+                detection_scores = cluster_frames['wake'].tolist()  # Copy for history dump
+                scores_str = ",".join(f"{s:.2f}" for s in detection_scores[-10:])  # Last 10 scores
+                vad_str = ",".join(f"{v:.2f}" for v in cluster_frames['vad'][-10:].tolist())  # Last 10 VAD scores
                 self.tracking = False
-                self.tracking_scores = []
-                self.tracking_vad_scores = []
+                self.tracking_frames = 0
                 
                 if wake_detected:
+                    # the wake word ended ~wake_trim_latency_ms before the end of the peak frame; everything
+                    # after that (the rest of the cluster included) is the user talking to the assistant
+                    frames_after_peak = len(detection_scores) - 1 - int(np.argmax(cluster_frames['wake']))
+                    self.post_wake_samples = (frames_after_peak * self.frame_samples
+                                              + int(self.wake_trim_latency_ms * self.sample_rate / 1000))
                     self.cooldown_remaining = self.cooldown_frames
                     self.last_wake_word_detected = self._monotonic_time()
                     self.model.reset()
@@ -586,8 +740,8 @@ class WakeWordDetector:
             if above_entry:
                 # Start tracking - log this event
                 self.tracking = True
-                self.tracking_scores = [max_score]
-                self.tracking_vad_scores = [vad_score]
+                self.tracking_started = True
+                self.tracking_frames = 1
                 self.tracking_start_time = time.time()
                 trace("wake", f"TRACKING START - initial_score={max_score:.3f}, vad={vad_score:.2f}, entry_threshold={self.entry_threshold}")
         
@@ -611,32 +765,31 @@ class WakeWordDetector:
             is_voice = rms > 500.0  # simple fallback heuristic
             return (is_voice, False)
 
-        # --- 1. Get VAD score on raw audio first (before noise injection)
+        # --- 1. Calculate raw RMS (for the energy gate and auto-noise tracking)
+        raw_rms = self.calculate_signal_strength(audio_16ints)
+
+        # --- 2. Get VAD score on raw audio first (before noise injection)
         #     Uses standalone Silero VAD with frame_size=640 (1280/640 = 2 clean chunks,
         #     both above Silero's 512-sample minimum). Falls back to shared model VAD if standalone unavailable.
-        if self.vad is not None:
-            vad_score = self.vad.predict(audio_16ints, frame_size=640)
+        #     While asleep the cascade skips VAD on frames too quiet to hold voice.
+        cascade = self.cascade if self.cascade.enabled and not vad_only else None
+        if cascade is None or cascade.vad_open(raw_rms, self.noise_manager.ambient_ema):
+            start = time.perf_counter()
+            if self.vad is not None:
+                vad_score = self.vad.predict(audio_16ints, frame_size=640)
+            else:
+                vad_score = self.model.vad.predict(audio_16ints, frame_size=640)
+            if cascade:
+                cascade.vad_ms_total += (time.perf_counter() - start) * 1000.0
         else:
-            vad_score = self.model.vad.predict(audio_16ints, frame_size=640)
+            vad_score = 0.0
         vad_threshold = self.master_state.conman.get_config("VAD_THRESHOLD")
         is_voice = vad_score > vad_threshold
-        self.vad_history.append(is_voice)
         self.vad_score_history.append(vad_score)  # Track actual score for peak detection
 
-        # --- 2. Calculate raw RMS (for auto-noise tracking)
-        raw_rms = self.calculate_signal_strength(audio_16ints)
-
         # --- 3. Update noise manager, get injection level
         noise_level = self.noise_manager.update(raw_rms, vad_score)
 
-        # --- 4. Inject noise if needed
-        if noise_level > 0:
-            noise = np.random.randn(len(audio_16ints)) * noise_level
-            audio_16ints = np.clip(
-                audio_16ints.astype(np.float64) + noise,
-                -32768, 32767
-            ).astype(np.int16)
-
         now = time.time()
 
         # Track stats for heartbeat
@@ -652,15 +805,27 @@ class WakeWordDetector:
         if vad_only:
             return (is_voice, False)
 
-        # --- 5. Run wake word prediction on noise-augmented audio
-        scores_dict = self.model.predict(audio_16ints)
-        max_score = max(scores_dict.values()) if scores_dict else 0.0
+        # --- 4. Run wake word prediction on noise-augmented audio (the noise bank's buffer -
+        #     the raw frame is forwarded as-is).  Frames the cascade skips are held raw and
+        #     replayed, with their own noise level, the next time the model runs.
+        if cascade is None or cascade.wake_open(vad_score, self.tracking or self.cooldown_remaining > 0):
+            start = time.perf_counter()
+            if cascade:
+                for held_audio, held_noise in cascade.drain():
+                    self.model.predict(self.noise_bank.inject(held_audio, held_noise) if held_noise > 0 else held_audio)
+            scores_dict = self.model.predict(self.noise_bank.inject(audio_16ints, noise_level) if noise_level > 0 else audio_16ints)
+            max_score = max(scores_dict.values()) if scores_dict else 0.0
+            if cascade:
+                cascade.wake_ms_total += (time.perf_counter() - start) * 1000.0
+        else:
+            cascade.hold(audio_16ints, noise_level)
+            max_score = 0.0
 
         # Track max wake score for heartbeat
         if max_score > self.max_score_since_heartbeat:
             self.max_score_since_heartbeat = max_score
 
-        # --- 6. Record frame to history buffer for detection analysis
+        # --- 5. Record frame to history buffer for detection analysis
         self._record_frame(vad_score, max_score, raw_rms, noise_level, self.tracking)
 
         # Periodic heartbeat logging - shows we're alive even when nothing is happening
@@ -675,6 +840,13 @@ class WakeWordDetector:
                 f"ambient={noise_stats['ambient_rms']:.0f}, "
                 f"entry={self.entry_threshold}"
             )
+            if self.cascade.enabled:
+                c = self.cascade.get_stats()
+                trace("wake",
+                    f"cascade: frames={c['frames']}, energy={c['energy_rate']:.0%}, vad={c['vad_rate']:.0%}, "
+                    f"voice={c['voice_rate']:.0%}, wake={c['wake_rate']:.0%}, replayed={c['replayed']}, "
+                    f"vad_ms={c['vad_ms']:.1f}, wake_ms={c['wake_ms']:.1f}, cpu_saved={c['cpu_saved']:.0%}"
+                )
             # Reset heartbeat stats
             self.last_heartbeat_time = now
             self.frames_since_heartbeat = 0
@@ -690,7 +862,7 @@ class WakeWordDetector:
         if (now - self.last_vad_log_time) >= self.activity_log_interval:
             if max_score >= near_threshold or is_voice:
                 self.last_vad_log_time = now
-                tracking_info = f", TRACKING({len(self.tracking_scores)})" if self.tracking else ""
+                tracking_info = f", TRACKING({self.tracking_frames})" if self.tracking else ""
                 # Explain: vad=audio_activity, wake=wake_word_score
                 trace("wake", 
                     f"audio: vad={vad_score:.3f}(thr={vad_threshold}), "
@@ -698,35 +870,103 @@ class WakeWordDetector:
                     f"rms={raw_rms:.0f}, noise_inj={noise_level:.0f}{tracking_info}"
                 )
 
-        # --- 7. Cluster-based detection with VAD gating
+        # --- 6. Cluster-based detection with VAD gating
         self.near_miss_chirp = False  # Reset before evaluation; set by _evaluate if near miss
+        self.post_wake_samples = 0  # Set by _evaluate on detection
         is_wake_word = self._evaluate_cluster_detection(max_score, vad_score, vad_threshold)
 
         return (is_voice, is_wake_word)
 
 
+def trim_wake_word(wake_tail, post_wake_samples: int, sample_rate: int) -> tuple[list, float]:
+    """
+    Split the wake word off the end of a run of (capture_time, frame) pairs.
+
+    Returns the frames holding the last post_wake_samples samples (the first one sliced at the exact
+    sample) and the monotonic capture time of the first forwarded sample - the end of the wake word,
+    unless the tail was too short to reach back that far.  Frames are assumed contiguous, as the mic
+    stream delivers them.
+    """
+    if not wake_tail:
+        return [], time.monotonic()
+    last_time, last_frame = wake_tail[-1]
+    stream_end = last_time + len(last_frame) / sample_rate
+    post_wake_frames = []
+    remaining = post_wake_samples
+    for _, frame in reversed(wake_tail):
+        if remaining <= 0:
+            break
+        post_wake_frames.append(frame if remaining >= len(frame) else frame[len(frame) - remaining:])
+        remaining -= len(frame)
+    post_wake_frames.reverse()
+    forwarded = post_wake_samples - max(remaining, 0)
+    return post_wake_frames, stream_end - forwarded / sample_rate
+
+
+# process-lifetime detector shared by every mic_listener
+_wake_word_detector: WakeWordDetector = None
+
+
+def get_wake_word_detector(master_state) -> WakeWordDetector:
+    """
+    Get the process-lifetime WakeWordDetector, loading models only on first use
+    (or when the configured wake word changes, or a previous load failed).
+    Per-session state is cleared so the caller gets a detector ready for a new session.
+    """
+    global _wake_word_detector
+
+    if (_wake_word_detector is None
+            or _wake_word_detector.model is None
+            or _wake_word_detector.model_name != master_state.conman.get_wake_word_model()):
+        _wake_word_detector = WakeWordDetector(master_state)
+    else:
+        _wake_word_detector.master_state = master_state
+        _wake_word_detector.reset_session()
+
+    return _wake_word_detector
+
+
 async def mic_listener(manager: AsyncManager) -> None:
     """
     Capture raw mic.  when listening, send to assistant.  when not listening, send to wake word detector.
     """
 
     loop = asyncio.get_running_loop()
+
+    # levels are measured once per frame here and travel with it (detector, noise gate, normalizer)
+    feature_extractor = FrameFeatureExtractor()
+
+    wake_detector = None
+    if manager.master_state.conman.get_config("WAKE_WORD_MODEL"):
+        wake_detector = get_wake_word_detector(manager.master_state)
+        if not wake_detector.model:
+            wake_detector = None
+
+    # worker mode: the callback drops frames into the worker's ring and the loop only sees
+    # WakeDecision records; inline mode scores raw frames here on the loop
+    inference_worker = None
+    if wake_detector and manager.master_state.conman.get_config("WAKE_INFERENCE_MODE") == "worker":
+        inference_worker = WakeInferenceWorker(wake_detector)
+        inference_worker.start(loop, manager.input_q.put_nowait)
+        trace("mic", "wake inference running on worker thread")
+
     def _mic_input_callback(in_data, frame_count, time_info, status):
-        # PyAudio calling back with audio. Just add to the mic listener queue
+        # PyAudio calling back with audio. Just add to the mic listener queue (or the inference ring)
         try:
-            loop.call_soon_threadsafe(manager.input_q.put_nowait, in_data)
+            # monotonic time of the frame's first sample: now, less how long ago PortAudio says the ADC captured it
+            capture_time = time.monotonic()
+            if time_info and time_info.get('input_buffer_adc_time'):
+                capture_time -= max(time_info['current_time'] - time_info['input_buffer_adc_time'], 0.0)
+            if inference_worker:
+                inference_worker.submit(in_data, capture_time)
+            else:
+                loop.call_soon_threadsafe(manager.input_q.put_nowait, (in_data, capture_time))
         except Exception as e:
             print(f"Mic callback error: {e}")
         
         # Return None to continue streaming
         return (None, pyaudio.paContinue)
 
-    wake_detector = None
-    if manager.master_state.conman.get_config("WAKE_WORD_MODEL"):
-        wake_detector = WakeWordDetector(manager.master_state)
-        if not wake_detector.model:
-            wake_detector = None
-
     if wake_detector is None:
         # No wake detector available - go to always-on mode
         mic_is_live_to_assistant = True
@@ -750,6 +990,10 @@ async def mic_listener(manager: AsyncManager) -> None:
     
     if local_vad_gate_enabled:
         trace("mic", f"Local VAD gating enabled with {preroll_frame_count} frame pre-roll buffer")
+
+    # While asleep, the last ~1.3s of (capture_time, frame) - on a wake word the audio after it is
+    # cut from here (sample-exact) and forwarded, so "Amanda, what's the weather" keeps its question
+    wake_tail = deque(maxlen=16)
     
     # Open the stream
     stream = manager.master_state.pa.open(
@@ -799,51 +1043,83 @@ async def mic_listener(manager: AsyncManager) -> None:
                         # go to sleep
                         trace("mic", "going to sleep - listening for wake word")
                         mic_is_live_to_assistant = False
+                        if inference_worker:
+                            inference_worker.vad_only = False
                         preroll_buffer.clear()  # Clear pre-roll to avoid stale audio
+                        wake_tail.clear()
                         was_voice_active = False
                     elif event == ASSISTANT_RESUME_AFTER_AUTO_SUMMARY:
                         trace("mic", "resuming after auto-summary")
                         mic_is_live_to_assistant = True
+                        if inference_worker:
+                            inference_worker.vad_only = True
                         preroll_buffer.clear()  # Fresh start after summary
                         was_voice_active = False
 
                 elif event_type == "input":
 
-                    # Convert bytes to numpy array
-                    event = np.frombuffer(event, dtype=np.int16)
-
-                    # feed the new audio to the local model.  detect voice always so we can stop sending to the assistant if its just noise.
-                    # if we are currently not sending to the assistant, also check for wake word.
-                    if wake_detector:
-                        is_voice, is_wake_word = wake_detector.on_audio_buffer_in(event, vad_only=mic_is_live_to_assistant)
+                    near_miss = False
+                    tracking_started = False
+                    post_wake_samples = 0
+                    if isinstance(event, WakeDecision):
+                        # already scored on the worker thread - fetch the audio from its ring
+                        decision = event
+                        capture_time = decision.capture_time
+                        event = inference_worker.frame(decision.seq)
+                        if event is None:
+                            continue
+                        event = feature_extractor.attach(event, decision.features)
+                        is_voice, is_wake_word, near_miss = decision.is_voice, decision.is_wake_word, decision.near_miss
+                        tracking_started = decision.tracking_started
+                        post_wake_samples = decision.post_wake_samples
                     else:
-                        # No wake detector - always-on mode, always consider voice active
-                        is_voice = True
-                        is_wake_word = False
+                        # Convert bytes to numpy array and measure it once
+                        event, capture_time = event
+                        event = feature_extractor.attach(np.frombuffer(event, dtype=np.int16))
+
+                        # feed the new audio to the local model.  detect voice always so we can stop sending to the assistant if its just noise.
+                        # if we are currently not sending to the assistant, also check for wake word.
+                        if wake_detector:
+                            is_voice, is_wake_word = wake_detector.on_audio_buffer_in(event, vad_only=mic_is_live_to_assistant)
+                            near_miss = wake_detector.near_miss_chirp
+                            wake_detector.near_miss_chirp = False
+                            tracking_started = wake_detector.tracking_started
+                            wake_detector.tracking_started = False
+                            if is_wake_word:
+                                post_wake_samples = wake_detector.post_wake_samples
+                        else:
+                            # No wake detector - always-on mode, always consider voice active
+                            is_voice = True
+                            is_wake_word = False
 
                     if not mic_is_live_to_assistant:
+                        wake_tail.append((capture_time, event))
                         if is_wake_word:
                             mic_is_live_to_assistant = True
+                            if inference_worker:
+                                inference_worker.vad_only = True
                             await manager.event_q.put(USER_SAID_WAKE_WORD)
 
-                            # wait past the wake word and flush partial audio from input AND output queues
-                            await asyncio.sleep(1.0)
-                            try:
-                                deadman = 100
-                                while not manager.input_q.empty() and deadman > 0:
-                                    manager.input_q.get_nowait()
-                                    deadman -= 1
-                                # Also flush output queue to prevent stale audio reaching assistant
-                                deadman = 100
-                                while not manager.output_q.empty() and deadman > 0:
-                                    manager.output_q.get_nowait()
-                                    deadman -= 1
-                            except:
-                                print("❌ Error flushing partial audio")
-                                pass
-                        elif wake_detector and wake_detector.near_miss_chirp:
+                            # cut the wake word out of the tail and forward what followed it; frames still
+                            # queued behind this one are live audio and stream as usual
+                            post_wake_frames, wake_end_time = trim_wake_word(wake_tail, post_wake_samples, wake_detector.sample_rate)
+                            wake_tail.clear()
+                            for post_wake_frame in post_wake_frames:
+                                await manager.output_q.put(post_wake_frame)
+                            # the forwarded audio opens the utterance: the VAD gate's onset already happened
+                            preroll_buffer.clear()
+                            was_voice_active = bool(post_wake_frames)
+                            wake_latency_ms = (time.monotonic() - wake_end_time) * 1000
+                            trace("mic", f"wake trim: forwarded {sum(len(f) for f in post_wake_frames) * 1000 // wake_detector.sample_rate}ms "
+                                         f"after the wake word, wake->first audio {wake_latency_ms:.0f}ms")
+                            manager.master_state.add_log_for_next_summary(f"Wake-to-first-audio latency: {wake_latency_ms:.0f}ms")
+                        elif tracking_started:
+                            # a wake word may be on its way - let the main loop start connecting
+                            manager.event_q.put_nowait(USER_MAY_SAY_WAKE_WORD)
+                        elif near_miss:
+                            # they'll likely try again: keep (or get) a connection ready
+                            manager.event_q.put_nowait(USER_MAY_SAY_WAKE_WORD)
                             # Near miss - play a subtle chirp so user knows they're close
-                            wake_detector.near_miss_chirp = False
                             try:
                                 manager.master_state.task_managers["speaker"].command_q.put_nowait(
                                     SPEAKER_PLAY_TONE + ":" + CHATTY_SONG_NEAR_MISS
@@ -908,6 +1184,8 @@ async def mic_listener(manager: AsyncManager) -> None:
 
     stream.stop_stream()
     stream.close()
+    if inference_worker:
+        inference_worker.stop()
     trace("mic", "stream closed")
 
     print("🎤 Microphone MASTER_EXIT_EVENT.")
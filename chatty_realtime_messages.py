@@ -2,15 +2,21 @@
 # Finley 2025
 
 import json
+import binascii
 import websockets
+from typing import Optional
 from chatty_dsp import b64
+from chatty_event_decoder import AUDIO_DELTA_EVENT, AUDIO_DONE_EVENT, parse_event, sniff_event_type, decode_audio_delta
 from chatty_tools import dispatch_tool_call
-from chatty_config import NATIVE_OAI_SAMPLE_RATE_HZ, MAX_OUTPUT_TOKENS
+from chatty_config import NATIVE_OAI_SAMPLE_RATE_HZ, MAX_OUTPUT_TOKENS, WIRE_FORMAT_PCM, WIRE_FORMAT_PCMU
+from chatty_config import OOB_TRANSCRIPTION_FULL, OOB_TRANSCRIPTION_REFERENCE, OOB_TRANSCRIPTION_REFERENCE_SUMMARY
 from chatty_debug import trace
+from chatty_metrics import RESPONSE_MAIN, RESPONSE_TRANSCRIPTION, RESPONSE_TOOL, RESPONSE_SYSTEM
 
 import time
 import asyncio
 import jinja2
+from collections import deque
 #
 #  OUTGOING MESSAGES TO ASSISTANT
 #
@@ -33,6 +39,25 @@ async def send_audio_to_assistant(ws, buffer):
         "audio": b64(buffer),
     })
 
+async def send_encoded_audio_to_assistant(ws, frame):
+    """ send an already serialized input_audio_buffer.append event (bytes-like, see UplinkEncoder) as a text frame """
+    if ws:
+        try:
+            await ws.send(frame, text=True)
+            return True
+        except Exception as e:
+            print(f"Error sending websocket message: {e}")
+    else:
+        print("❌ No websocket to send message")
+
+    return False
+
+def wire_audio_format(wire_format):
+    """ the session.update / response.create audio format for a wire format (AUDIO_WIRE_FORMAT) """
+    if wire_format == WIRE_FORMAT_PCMU:
+        return {"type": "audio/pcmu"}
+    return {"type": "audio/pcm", "rate": NATIVE_OAI_SAMPLE_RATE_HZ}
+
 def get_speed_from_percentage_int_0_to_100(speed):
     # map [0-100] -> [0.25-1.5] (per spec); otherwise 1.0
     try:
@@ -43,155 +68,338 @@ def get_speed_from_percentage_int_0_to_100(speed):
 #
 #   SETUP realtime connection
 #
-async def setup_assistant_session(master_state, greet_user: str = None):
+REALTIME_ACK_TIMEOUT_SECONDS = 10
+# speculative/standby opens per hour when REALTIME_PREWARM_MAX_PER_HOUR is unset (0 allows none)
+REALTIME_PREWARM_MAX_PER_HOUR = 20
 
+async def open_realtime_connection(master_state, attempts: int = 10):
+    """ open the realtime websocket (TLS + upgrade), retrying once a second """
     url = master_state.conman.get_config("WS_URL") + master_state.conman.get_config("REALTIME_MODEL")
     headers = {"Authorization": f"Bearer {master_state.openai.api_key}"}
 
     trace("ws", f"connecting to OpenAI ({master_state.conman.get_config('REALTIME_MODEL')})")
 
-    ws = None
-    for retries in range(10):
+    for retries in range(attempts):
         try:
-            ws = await websockets.connect(url, 
-                                          additional_headers=headers, 
-                                          max_size      = 1 << 24)#,
-                                          #ping_interval = 30,
-                                          #ping_timeout  = 20,
-                                          #close_timeout = 20)
-            break
+            return await websockets.connect(url, 
+                                            additional_headers=headers, 
+                                            max_size      = 1 << 24)#,
+                                            #ping_interval = 30,
+                                            #ping_timeout  = 20,
+                                            #close_timeout = 20)
         except Exception as e:
             print(f"Error connecting to websocket: {e}")
             trace("ws", f"connection failed (attempt {retries+1}): {e}")
-            await asyncio.sleep(1)
+            if retries + 1 < attempts:
+                await asyncio.sleep(1)
 
-    if not ws:
-        raise Exception("❌ Failed to connect to websocket")
+    raise Exception("❌ Failed to connect to websocket")
 
-    # Wait until server sends session.created
-    async def wait_for_remote_ack(ws, event_type):
-        deadman = 100
-        while True:
+async def wait_for_remote_acks(ws, event_types, timeout: float = REALTIME_ACK_TIMEOUT_SECONDS) -> dict:
+    """ read until each of event_types has arrived (anything else is dropped); returns {event type: event}.
+    An error event (e.g. a rejected session.update) raises at once - the session is no use as configured """
+    pending = set(event_types)
+    acks = {}
+
+    async def read_acks():
+        while pending:
             msg = await ws.recv()
-            event = json.loads(msg)
-
-            if event["type"] == event_type:
-                return event
-            await asyncio.sleep(0.1)
-            deadman -= 1
-            if deadman < 0:
-                raise Exception("❌ Timeout waiting for "+str(event_type))
-
-    session = await wait_for_remote_ack(ws, "session.created")
-    if session:
-        master_state.remote_assistant_state["session_open_time"] = time.time()
-        master_state.remote_assistant_state["session_id"] = session["session"]["id"]
-
-        print("✅ session.created "+str(session["session"]["id"]))
-        trace("ws", f"session created id={session['session']['id']}")
-
-        sp = master_state.conman.get_config("VOICE_ASSISTANT_SYSTEM_PROMPT")
-        if not sp:
-            sp = master_state.conman.default_config["VOICE_ASSISTANT_SYSTEM_PROMPT"]
-
-        if sp:
-            sp = jinja2.Template(sp).render(**master_state.conman.config)
-
-        user_profile = master_state.conman.get_config("USER_PROFILE")
-        if user_profile:
-            sp += "\n\nHere are some FACTS that the user has told you in the past.  These are not examples, they are actual useful facts about the user.  Use them to make the conversation more interesting and personal.\n"
-            sp += "\n".join(user_profile)
-
-        resume_context = master_state.conman.get_resume_context()
-        if resume_context:
-            sp += "\n\n--- resuming context of prior conversation ---\n"
-            sp += "\n\nYou were just talking with the user and here is some context you need to use to continue the conversation.  This is just background about where you left off, don't call any tools or functions to take any actions based on this because that work was already done:\n"
-            sp += resume_context
-            sp += "\n--- end of resuming context of prior conversation ---\n"
-
-        user_name_for_assistant = master_state.conman.get_config("WAKE_WORD_MODEL")
-        if user_name_for_assistant:
-            sp += "\n\nYou are named " + user_name_for_assistant + ".  The user will call you this name and you can tell the user that is your name too.\n"
-
-        sp += "\n\nRespond in " + master_state.conman.get_config("LANGUAGE") + ".\n"
-        if greet_user:
-            greet_user = sp+"\n\n"+greet_user
-
-        # milliseconds before remote decides to start responding... 200 is super eager, 800 is not so eager
-        etr_percent = master_state.conman.get_percent_config_as_0_to_100_int("ASSISTANT_EAGERNESS_TO_REPLY")
-        etr_ms = int(200 + (800 - 200) * (etr_percent / 100.0))
-
-        session_update_message = {
-            "type": "session.update",
-            "session": {
-                "type": "realtime",
-                "model": master_state.conman.get_config("REALTIME_MODEL"),
-                "audio": {
-                    "input": {
-                        "format": {          
-                            "type": "audio/pcm",
-                            "rate": NATIVE_OAI_SAMPLE_RATE_HZ
-                        },
-                        "noise_reduction": {"type":"far_field"},
-                        "turn_detection": {
-                            "create_response": True,
-                            #"eagerness": "high" if etr_ms <= 200 else "auto" if etr_ms <= 800 else "low",
-                            "interrupt_response": True, # allow user to interrupt assistant's response
-                            "prefix_padding_ms": 300,
-                            "silence_duration_ms": etr_ms,
-                            "threshold": 0.5,
-                            "type": "server_vad"
-                            }
-                        },
-                    "output": {
-                        "format": {
-                            "type": "audio/pcm",
-                            "rate": NATIVE_OAI_SAMPLE_RATE_HZ
-                        },
-                        "speed":get_speed_from_percentage_int_0_to_100(master_state.conman.get_config("SPEED")),
-                        "voice": master_state.conman.get_config("VOICE"),
-                    }
-                },
-                "instructions": sp,
-                "max_output_tokens": MAX_OUTPUT_TOKENS,
-                "output_modalities": ["audio"],
-                # "temperature": 0.8,Failing as of sept 1 2025
-                "tool_choice": "auto",
-                "tools":[tool.get_model_function_call_metadata() for tool in master_state.tools_for_assistant],
-                "tracing": None,
-                "truncation":"auto"
-            }
+            etype = sniff_event_type(msg) or parse_event(msg).get("type")
+            if etype in pending:
+                acks[etype] = parse_event(msg)
+                pending.discard(etype)
+            elif etype == "error":
+                trace("ws", f"error during session setup: {msg[:200]}")
+                error = parse_event(msg).get("error") or {}
+                raise Exception("❌ Session setup rejected: " + str(error.get("message") or msg[:200]))
+
+    try:
+        await asyncio.wait_for(read_acks(), timeout)
+    except asyncio.TimeoutError:
+        raise Exception("❌ Timeout waiting for "+", ".join(sorted(pending)))
+    return acks
+
+def build_system_prompt(master_state, handoff_context: str = None):
+    """ the session instructions from the current config (prompt template, profile, resume context, name, language)
+    plus, for a session taking over a live conversation, the context handed to it """
+    sp = master_state.conman.get_config("VOICE_ASSISTANT_SYSTEM_PROMPT")
+    if not sp:
+        sp = master_state.conman.default_config["VOICE_ASSISTANT_SYSTEM_PROMPT"]
+
+    if sp:
+        sp = jinja2.Template(sp).render(**master_state.conman.config)
+
+    user_profile = master_state.conman.get_config("USER_PROFILE")
+    if user_profile:
+        sp += "\n\nHere are some FACTS that the user has told you in the past.  These are not examples, they are actual useful facts about the user.  Use them to make the conversation more interesting and personal.\n"
+        sp += "\n".join(user_profile)
+
+    resume_context = master_state.conman.get_resume_context()
+    if resume_context:
+        sp += "\n\n--- resuming context of prior conversation ---\n"
+        sp += "\n\nYou were just talking with the user and here is some context you need to use to continue the conversation.  This is just background about where you left off, don't call any tools or functions to take any actions based on this because that work was already done:\n"
+        sp += resume_context
+        sp += "\n--- end of resuming context of prior conversation ---\n"
+
+    if handoff_context:
+        sp += "\n\n--- conversation in progress ---\n"
+        sp += "\n\nYou are picking up a conversation that is still going on - the user doesn't know anything changed, so carry on naturally without greeting them or mentioning a pause.  These are the most recent turns; don't repeat any actions or tool calls from them:\n"
+        sp += handoff_context
+        sp += "\n--- end of conversation in progress ---\n"
+
+    user_name_for_assistant = master_state.conman.get_config("WAKE_WORD_MODEL")
+    if user_name_for_assistant:
+        sp += "\n\nYou are named " + user_name_for_assistant + ".  The user will call you this name and you can tell the user that is your name too.\n"
+
+    sp += "\n\nRespond in " + master_state.conman.get_config("LANGUAGE") + ".\n"
+    return sp
+
+def build_session_update(master_state, sp):
+    """ (session.update message, wire format) for the current config """
+
+    # milliseconds before remote decides to start responding... 200 is super eager, 800 is not so eager
+    etr_percent = master_state.conman.get_percent_config_as_0_to_100_int("ASSISTANT_EAGERNESS_TO_REPLY")
+    etr_ms = int(200 + (800 - 200) * (etr_percent / 100.0))
+
+    # both directions use the same codec; mic and speaker tasks follow master_state.wire_format
+    wire_format = WIRE_FORMAT_PCMU if master_state.conman.get_config("AUDIO_WIRE_FORMAT") == WIRE_FORMAT_PCMU else WIRE_FORMAT_PCM
+
+    session_update_message = {
+        "type": "session.update",
+        "session": {
+            "type": "realtime",
+            "model": master_state.conman.get_config("REALTIME_MODEL"),
+            "audio": {
+                "input": {
+                    "format": wire_audio_format(wire_format),
+                    "noise_reduction": {"type":"far_field"},
+                    "turn_detection": {
+                        "create_response": True,
+                        #"eagerness": "high" if etr_ms <= 200 else "auto" if etr_ms <= 800 else "low",
+                        "interrupt_response": True, # allow user to interrupt assistant's response
+                        "prefix_padding_ms": 300,
+                        "silence_duration_ms": etr_ms,
+                        "threshold": 0.5,
+                        "type": "server_vad"
+                        }
+                    },
+                "output": {
+                    "format": wire_audio_format(wire_format),
+                    "speed":get_speed_from_percentage_int_0_to_100(master_state.conman.get_config("SPEED")),
+                    "voice": master_state.conman.get_config("VOICE"),
+                }
+            },
+            "instructions": sp,
+            "max_output_tokens": MAX_OUTPUT_TOKENS,
+            "output_modalities": ["audio"],
+            # "temperature": 0.8,Failing as of sept 1 2025
+            "tool_choice": "auto",
+            "tools":[tool.get_model_function_call_metadata() for tool in master_state.tools_for_assistant],
+            "tracing": None,
+            "truncation":"auto"
         }
+    }
+    return session_update_message, wire_format
+
+class PreparedSession:
+    """ an open, configured realtime session that nobody is reading from yet """
+    __slots__ = ("ws", "session_id", "open_time", "session_update", "wire_format")
+
+    def __init__(self, ws, session_id, open_time, session_update, wire_format):
+        self.ws = ws
+        self.session_id = session_id
+        self.open_time = open_time
+        self.session_update = session_update
+        self.wire_format = wire_format
+
+async def prepare_realtime_session(master_state, attempts: int = 10, handoff_context: str = None) -> PreparedSession:
+    """ connect and configure a session.  session.update goes out right behind the handshake, so
+    session.created and session.updated arrive back to back instead of costing a round trip each """
+    ws = await open_realtime_connection(master_state, attempts)
+    try:
+        session_update, wire_format = build_session_update(master_state, build_system_prompt(master_state, handoff_context))
+        await ws.send(json.dumps(session_update))
+        acks = await wait_for_remote_acks(ws, ["session.created", "session.updated"])
+    except BaseException:
+        await ws.close()
+        raise
+    return PreparedSession(ws, acks["session.created"]["session"]["id"], time.time(), session_update, wire_format)
+
+class RealtimeConnector:
+    """
+    Opens realtime sessions - ahead of the wake word when REALTIME_PREWARM allows it.
+
+      "off"          connect once the wake word is confirmed
+      "speculative"  connect when the wake detector starts tracking (or on a near miss) and hold the
+                     session for REALTIME_PREWARM_TTL_SECONDS in case the wake word is confirmed
+      "standby"      keep one configured session open while asleep, replaced every REALTIME_STANDBY_MAX_AGE_SECONDS
+
+    An idle session bills no tokens; speculative and standby opens are capped at
+    REALTIME_PREWARM_MAX_PER_HOUR (default 20, 0 = no prewarm opens) so a noisy room can't churn connections.
+    """
+
+    def __init__(self, master_state):
+        self.master_state = master_state
+        self._standby: Optional[PreparedSession] = None
+        self._standby_task: Optional[asyncio.Task] = None
+        self._standby_settled = asyncio.Event()
+        self._open_times = deque()
+        self.prewarmed = 0
+        self.adopted = 0
+        self.expired = 0
+        self.throttled = 0
+        self.discarded = 0
+
+    def _policy(self):
+        return self.master_state.conman.get_config("REALTIME_PREWARM") or "off"
+
+    def prewarm(self, reason: str):
+        """ start opening a standby session, if the policy and hourly budget allow and none is open or opening """
+        policy = self._policy()
+        if policy not in ("speculative", "standby") or (reason == "standby" and policy != "standby"):
+            return
+        if self.master_state.ws is not None or (self._standby_task and not self._standby_task.done()):
+            return
+
+        now = time.monotonic()
+        while self._open_times and now - self._open_times[0] > 3600:
+            self._open_times.popleft()
+        max_per_hour = self.master_state.conman.get_config("REALTIME_PREWARM_MAX_PER_HOUR")
+        max_per_hour = REALTIME_PREWARM_MAX_PER_HOUR if max_per_hour is None else int(max_per_hour)
+        if len(self._open_times) >= max_per_hour:
+            self.throttled += 1
+            return
+        self._open_times.append(now)
+
+        if policy == "standby":
+            hold_seconds = float(self.master_state.conman.get_config("REALTIME_STANDBY_MAX_AGE_SECONDS") or 600)
+        else:
+            hold_seconds = float(self.master_state.conman.get_config("REALTIME_PREWARM_TTL_SECONDS") or 30)
+        self._standby_settled.clear()
+        self._standby_task = asyncio.create_task(self._hold_standby(reason, hold_seconds))
+
+    async def _hold_standby(self, reason, hold_seconds):
+        """ open a session and keep it for hold_seconds unless take() adopts it first """
+        prepared = None
+        start = time.monotonic()
+        try:
+            trace("ws", f"prewarming realtime session ({reason})")
+            prepared = await prepare_realtime_session(self.master_state, attempts=1)
+            self._standby = prepared
+            self.prewarmed += 1
+            trace("ws", f"standby session ready in {(time.monotonic() - start) * 1000:.0f}ms id={prepared.session_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            trace("ws", f"prewarm failed: {e}")
+        finally:
+            self._standby_settled.set()
+
+        if prepared is None:
+            return
+        try:
+            await asyncio.sleep(hold_seconds)
+        finally:
+            # still ours (not adopted) - let it go
+            if self._standby is prepared:
+                self._standby = None
+                self.expired += 1
+                trace("ws", f"standby session expired unused id={prepared.session_id}")
+                await prepared.ws.close()
+
+        if self._policy() == "standby":
+            asyncio.get_running_loop().call_soon(self.prewarm, "standby")
+
+    async def take(self) -> PreparedSession:
+        """ the standby session if one is open (or opening), otherwise a freshly prepared one """
+        start = time.monotonic()
+        if self._standby_task and not self._standby_task.done() and not self._standby_settled.is_set():
+            # already connecting - that is at least as far along as starting over
+            try:
+                await asyncio.wait_for(self._standby_settled.wait(), REALTIME_ACK_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+        prepared, self._standby = self._standby, None
+        if self._standby_task and not self._standby_task.done():
+            self._standby_task.cancel()
+        self._standby_task = None
+
+        if prepared is not None:
+            # the config may have changed since it was opened (a resume context, a new voice...)
+            session_update, wire_format = build_session_update(self.master_state, build_system_prompt(self.master_state))
+            if session_update != prepared.session_update:
+                try:
+                    await prepared.ws.send(json.dumps(session_update))
+                    await wait_for_remote_acks(prepared.ws, ["session.updated"])
+                    prepared.session_update, prepared.wire_format = session_update, wire_format
+                except Exception as e:
+                    # the update was refused (or the socket died while idle) - connect cold instead
+                    trace("ws", f"standby session discarded: {e}")
+                    self.discarded += 1
+                    await prepared.ws.close()
+                    prepared = None
+        if prepared is not None:
+            self.adopted += 1
+            source = "standby"
+        else:
+            prepared = await prepare_realtime_session(self.master_state)
+            source = "cold"
+
+        trace("ws", f"session ready in {(time.monotonic() - start) * 1000:.0f}ms ({source}) - "
+                    f"prewarmed={self.prewarmed}, adopted={self.adopted}, expired={self.expired}, throttled={self.throttled}, "
+                    f"discarded={self.discarded}")
+        return prepared
+
+    async def close(self):
+        """ drop any standby session (shutdown) """
+        if self._standby_task and not self._standby_task.done():
+            self._standby_task.cancel()
+            try:
+                await self._standby_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._standby_task = None
+
+async def setup_assistant_session(master_state, greet_user: str = None):
+
+    prepared = await master_state.realtime_connector.take()
+    session_update = prepared.session_update
+
+    master_state.remote_assistant_state["session_open_time"] = prepared.open_time
+    master_state.remote_assistant_state["session_id"] = prepared.session_id
 
-        # Configure session
-        if await send_to_assistant(ws, session_update_message):
-            response = await wait_for_remote_ack(ws, "session.updated")
+    print("✅ session.created "+str(prepared.session_id))
+    trace("ws", f"session created id={prepared.session_id}")
 
-            print("✅ session.updated")
-            trace("ws", "session updated - ready for audio")
+    sp = session_update["session"]["instructions"]
+    if greet_user:
+        greet_user = sp+"\n\n"+greet_user
 
-            master_state.ws = ws
+    print("✅ session.updated")
+    trace("ws", f"session updated - ready for audio ({prepared.wire_format})")
 
-            if greet_user:
-                await send_assistant_instructions(master_state, greet_user)
+    master_state.wire_format = prepared.wire_format
+    master_state.ws = prepared.ws
 
-            # resturn the system prompt for the supervisor to use
-            return sp
+    if greet_user:
+        await send_assistant_instructions(master_state, greet_user)
+
+    # resturn the system prompt for the supervisor to use
+    return sp
 
 async def send_assistant_instructions(master_state, greet_user):
     await send_to_assistant(master_state.ws, {
             "type": "response.create",
             "response": {
+                "metadata": {"kind": RESPONSE_SYSTEM},
                 "conversation":"auto",
                 "instructions": greet_user,
                 "max_output_tokens": MAX_OUTPUT_TOKENS,
                 "output_modalities": ["audio"],
                 "audio": {
                     "output": {
-                        "format": {
-                            "type": "audio/pcm",
-                            "rate": NATIVE_OAI_SAMPLE_RATE_HZ
-                        },
+                        "format": wire_audio_format(master_state.wire_format),
                         "voice": master_state.conman.get_config("VOICE"),
                     }
                 }
@@ -215,11 +423,16 @@ async def send_assistant_text_from_system(master_state, message):
     await send_to_assistant(master_state.ws, {
             "type": "response.create",
             "response": {
-                "modalities": ["text", "audio"],
+                "metadata": {"kind": RESPONSE_SYSTEM},
                 "instructions": "brief response",
-                "voice": master_state.conman.get_config("VOICE"),
-                "output_audio_format": "pcm16",
-                "max_output_tokens": 64
+                "max_output_tokens": 64,
+                "output_modalities": ["audio"],
+                "audio": {
+                    "output": {
+                        "format": wire_audio_format(master_state.wire_format),
+                        "voice": master_state.conman.get_config("VOICE"),
+                    }
+                }
             }
         })
 
@@ -249,12 +462,37 @@ async def assistant_session_cancel_audio(master_state):
 #  HANLDERS for incoming assistant realtime events
 #
 
+async def on_response_created(event, master_state):
+    """ count responses in flight - a session handoff waits for them to finish - and time them """
+    state = master_state.remote_assistant_state
+    state["responses_in_flight"] = state.get("responses_in_flight", 0) + 1
+    response_id = event.get("response", {}).get("id")
+    if response_id:
+        state.setdefault("response_started", {})[response_id] = time.monotonic()
+
 async def on_assistant_response_done(event, master_state):
     """ Digest events to collect usage, estimate costs, and handle OOB transcription. """
+    state = master_state.remote_assistant_state
+    state["responses_in_flight"] = max(0, state.get("responses_in_flight", 0) - 1)
+    # a cancelled response may never send output_audio.done - none of its items are streaming any more
+    for output in event.get("response", {}).get("output") or []:
+        if output.get("id"):
+            track_streaming_audio_item(AUDIO_DONE_EVENT, output["id"], master_state)
+
+    # what the response was for: tagged on its response.create, else told apart by its output
+    try:
+        transcription_text = extract_transcription_text(event)
+        transcription_error = None
+    except Exception as e:
+        transcription_text, transcription_error = None, e
+    response = event.get("response", {})
+    kind = (response.get("metadata") or {}).get("kind") or (RESPONSE_TRANSCRIPTION if transcription_text is not None else RESPONSE_MAIN)
+    started = state.get("response_started", {}).pop(response.get("id"), None)
+    latency_ms = (time.monotonic() - started) * 1000 if started else 0
 
     # --- Track usage for ALL responses (main + OOB transcription) ---
     try:
-        usage = event.get("response",{}).get("usage",{})
+        usage = response.get("usage",{})
 
         ONE_MILLION = 1_000_000
 
@@ -277,27 +515,42 @@ async def on_assistant_response_done(event, master_state):
         response_cost += usage.get("output_token_details",{}).get("text_tokens",0) * per_output_text_token
         response_cost += usage.get("output_token_details",{}).get("audio_tokens",0) * per_output_audio_token
 
-        master_state.accumulate_usage(response_cost)
+        master_state.accumulate_usage(response_cost, usage, kind, latency_ms)
     except Exception as e:
         print(f"❌ Error accumulating usage: {e}")
+    master_state.context_window.on_response_done(response)
 
     # --- Check if this is an OOB transcription response (text-only, no audio) ---
     # OOB transcription responses are the only text-only responses in the system.
     # All other responses (main assistant, system text, function follow-ups) include audio.
     try:
-        transcription_text = extract_transcription_text(event)
+        if transcription_error is not None:
+            raise transcription_error
         if transcription_text is not None:
             if transcription_text:
                 await master_state.add_to_transcript("user", transcription_text)
+                # the words of the user's audio item, for the recap if it is pruned later
+                master_state.context_window.set_text((response.get("metadata") or {}).get("item_id"), "user", transcription_text)
             else:
                 await master_state.add_to_transcript("user", "[transcription unavailable]")
     except Exception as e:
         print(f"❌ Error processing OOB transcription: {e}")
         await master_state.add_to_transcript("user", "[transcription unavailable]")
 
+    # keep the context this session re-reads every turn within budget
+    if kind == RESPONSE_MAIN:
+        try:
+            await master_state.context_window.maybe_prune(master_state.session_metrics.context_tokens)
+        except Exception as e:
+            print(f"❌ Error pruning conversation items: {e}")
+
+    # end of a turn - a successor session (if one is ready) takes over here
+    await master_state.complete_session_handoff()
+
 async def on_assistant_transcript(event, master_state):
     """ Track the assistant's own speech as text in the transcript. """
     await master_state.add_to_transcript("AI", event['transcript'])
+    master_state.context_window.set_text(event.get("item_id"), "assistant", event['transcript'])
 
 
 #
@@ -310,6 +563,11 @@ async def on_assistant_transcript(event, master_state):
 #  transcription because the model that understood the audio is the one producing the text.
 #
 
+# reference_summary recap: at most this many recent turns / characters, each turn trimmed
+OOB_CONTEXT_TURNS = 4
+OOB_CONTEXT_MAX_CHARS = 800
+OOB_CONTEXT_TURN_CHARS = 200
+
 def build_oob_transcription_instructions(master_state):
     """Build instructions for the out-of-band transcription request.
     
@@ -335,41 +593,73 @@ def build_oob_transcription_instructions(master_state):
     return instructions
 
 
-async def request_oob_transcription(master_state):
+def build_transcription_context(master_state) -> str:
+    """ a short rolling recap of the last few turns, for the reference_summary strategy:
+    enough for names and topic words to come out right, a few hundred tokens at most """
+    lines = []
+    budget = OOB_CONTEXT_MAX_CHARS
+    for item in reversed(master_state.transcript_history):
+        if item["role"] not in ("user", "AI"):
+            continue
+        content = str(item["content"])
+        if len(content) > OOB_CONTEXT_TURN_CHARS:
+            content = content[:OOB_CONTEXT_TURN_CHARS] + "..."
+        line = ("User: " if item["role"] == "user" else "Assistant: ") + content
+        if len(line) > budget or len(lines) >= OOB_CONTEXT_TURNS:
+            break
+        lines.append(line)
+        budget -= len(line)
+    return "\n".join(reversed(lines))
+
+
+def build_oob_transcription_request(master_state, committed_item_id: Optional[str] = None) -> dict:
+    """The response.create for an out-of-band transcription, per OOB_TRANSCRIPTION_STRATEGY:
+
+        full              - no "input": the model re-reads the whole session (instructions + every
+                            prior turn).  Best grounding, but every user turn costs the full context.
+        reference         - "input" is just the committed audio item: a few hundred tokens per turn,
+                            no grounding beyond the transcription instructions.
+        reference_summary - the committed audio item plus a short text recap of the last few turns
+                            in the instructions: most of the grounding at close to reference cost.
+
+    The reference strategies need the committed item id; without one this falls back to full, as
+    does an unset or unrecognised strategy.
+    """
+    strategy = master_state.conman.get_config("OOB_TRANSCRIPTION_STRATEGY")
+    if strategy not in (OOB_TRANSCRIPTION_FULL, OOB_TRANSCRIPTION_REFERENCE, OOB_TRANSCRIPTION_REFERENCE_SUMMARY):
+        strategy = OOB_TRANSCRIPTION_FULL
+    instructions = build_oob_transcription_instructions(master_state)
+    response = {
+        "metadata": {"kind": RESPONSE_TRANSCRIPTION},
+        "conversation": "none",
+        "output_modalities": ["text"],
+        "max_output_tokens": 4096,
+        "tool_choice": "none"
+    }
+
+    if committed_item_id:
+        # lets response.done hand the text to the context window for this item
+        response["metadata"]["item_id"] = committed_item_id
+    if strategy in (OOB_TRANSCRIPTION_REFERENCE, OOB_TRANSCRIPTION_REFERENCE_SUMMARY) and committed_item_id:
+        response["input"] = [{"type": "item_reference", "id": committed_item_id}]
+        if strategy == OOB_TRANSCRIPTION_REFERENCE_SUMMARY:
+            context = build_transcription_context(master_state)
+            if context:
+                instructions += ("\n\nFor context only - do NOT transcribe this - the conversation so far ended with:\n"
+                                 + context)
+
+    response["instructions"] = instructions
+    return {"type": "response.create", "response": response}
+
+
+async def request_oob_transcription(master_state, committed_item_id: Optional[str] = None):
     """Fire an out-of-band text-only response to transcribe the user's last turn.
     
     The response uses conversation="none" so it does not write back to the
-    conversation state.  Without an explicit "input" field the model sees the
-    full session context (instructions + all prior turns) for best grounding.
+    conversation state.  How much of the session it reads is set by
+    OOB_TRANSCRIPTION_STRATEGY (see build_oob_transcription_request).
     """
-
-    # COST REDUCTION: This currently uses full session context (~16-22x the cost of
-    # the old built-in transcription) because no "input" field is specified, so the
-    # model sees the entire conversation history for best grounding.
-    #
-    # To reduce to ~3-5x cost, add an "input" field referencing only the latest
-    # committed audio item (pass committed_item_id from the input_audio_buffer.committed
-    # event into this function):
-    #
-    #   "input": [{"type": "item_reference", "id": committed_item_id}]
-    #
-    # This limits the model to just the latest user audio turn, losing session
-    # context grounding but significantly reducing token consumption.
-    #
-    # A middle ground: include a text summary of recent turns in the instructions
-    # field while using the item_reference input, getting partial grounding at
-    # moderate cost.
-
-    await send_to_assistant(master_state.ws, {
-        "type": "response.create",
-        "response": {
-            "conversation": "none",
-            "output_modalities": ["text"],
-            "instructions": build_oob_transcription_instructions(master_state),
-            "max_output_tokens": 4096,
-            "tool_choice": "none"
-        }
-    })
+    await send_to_assistant(master_state.ws, build_oob_transcription_request(master_state, committed_item_id))
 
 
 async def on_audio_buffer_committed(event, master_state):
@@ -378,11 +668,9 @@ async def on_audio_buffer_committed(event, master_state):
     Fires an out-of-band transcription request so the Realtime model produces
     an accurate text transcript of what the user just said.
     """
-    # event contains "item_id" — the conversation item for the committed audio.
-    # Stored here for potential future cost reduction (see request_oob_transcription).
-    # committed_item_id = event.get("item_id")
-
-    await request_oob_transcription(master_state)
+    # event contains "item_id" — the conversation item for the committed audio,
+    # which the reference transcription strategies point the request at
+    await request_oob_transcription(master_state, event.get("item_id"))
 
 
 def extract_transcription_text(event):
@@ -475,22 +763,47 @@ async def on_assistant_error(event, master_state):
     print(f"❌ Error: {error_msg}")
     trace("ws", f"error: {error_msg}")
 
+async def on_content_part_added(event, master_state):
+    """ an audio stream started - track the item id for cancellations and turn boundaries """
+    part_type = event.get("part", {}).get("type")
+    if part_type in ("audio", "output_audio") and "item_id" in event:
+        track_streaming_audio_item(AUDIO_DELTA_EVENT, event["item_id"], master_state)
+
 async def on_assistant_audio(event, master_state):
-    """ stream audio to speaker and track the item id for cancellations """
-    # stream to speaker and track the active item id for cancellations
+    """ an audio stream ended - stop tracking the item; a session handoff waiting on it can go now """
+    # deltas never get here: they go to the speaker raw (on_assistant_input_event forwards this event too)
     if "item_id" not in event:
         return
-    if event["type"] == "response.output_audio.delta":
-        if "streaming_audio_item_ids" not in master_state.remote_assistant_state:
-            master_state.remote_assistant_state["streaming_audio_item_ids"] = []
-        if event["item_id"] not in master_state.remote_assistant_state["streaming_audio_item_ids"]:
-            master_state.remote_assistant_state["streaming_audio_item_ids"].append(event["item_id"])
-            trace("ws", f"audio stream started item={event['item_id'][:8]}...")
-        await master_state.task_managers["speaker"].input_q.put(event["delta"])
-    elif "streaming_audio_item_ids" in master_state.remote_assistant_state:
-        if event["item_id"] in master_state.remote_assistant_state["streaming_audio_item_ids"]:
-            master_state.remote_assistant_state["streaming_audio_item_ids"].remove(event["item_id"])
-            trace("ws", f"audio stream ended item={event['item_id'][:8]}...")
+    track_streaming_audio_item(event["type"], event["item_id"], master_state)
+    await master_state.complete_session_handoff()
+
+# downlink audio deltas carry this near the start of the raw message (the dispatcher taps them to the speaker)
+DOWNLINK_AUDIO_EVENT_MARKER = f'"{AUDIO_DELTA_EVENT}"'
+
+def track_streaming_audio_item(etype, item_id, master_state):
+    """ keep remote_assistant_state["streaming_audio_item_ids"] current (used to cancel on barge-in) """
+    # only ever called from the main event path, so it always describes the session on master_state.ws
+    item_ids = master_state.remote_assistant_state.setdefault("streaming_audio_item_ids", [])
+    if etype == AUDIO_DELTA_EVENT:
+        if item_id not in item_ids:
+            item_ids.append(item_id)
+            trace("ws", f"audio stream started item={item_id[:8]}...")
+    elif item_id in item_ids:
+        item_ids.remove(item_id)
+        trace("ws", f"audio stream ended item={item_id[:8]}...")
+
+def decode_downlink_audio_event(event_raw) -> Optional[bytes]:
+    """ speaker side of the downlink: a delta's PCM bytes (None for the end of a stream) """
+    # deltas are sniffed without building a dict; anything unusual gets a full parse
+    sniffed = decode_audio_delta(event_raw)
+    if sniffed is not None:
+        return sniffed[1]
+    if sniff_event_type(event_raw) == AUDIO_DONE_EVENT:
+        return None
+    event = parse_event(event_raw)
+    if event.get("type") == AUDIO_DELTA_EVENT and "delta" in event:
+        return binascii.a2b_base64(event["delta"])
+    return None
 
 async def on_function_call_arguments_done(event, master_state):
     """ receive and dispatch tool calls """
@@ -506,7 +819,7 @@ async def on_function_call_arguments_done(event, master_state):
         
         try:
             if await send_to_assistant(master_state.ws, result_message):
-                await send_to_assistant(master_state.ws, {"type": "response.create"})
+                await send_to_assistant(master_state.ws, {"type": "response.create", "response": {"metadata": {"kind": RESPONSE_TOOL}}})
             
         except Exception as e:
             print(f"❌ Failed to send tool call result: {e}")
@@ -527,6 +840,9 @@ async def on_speech_started(event, master_state):
     """Handle server VAD detecting user speech - stop speaker to allow interruption."""
     from chatty_config import ASSISTANT_STOP_SPEAKING
     
+    master_state.remote_assistant_state["user_speaking"] = True
+    master_state.context_window.on_speech_started(event.get("item_id"), event.get("audio_start_ms"))
+
     # Cancel any in-progress audio on the server side
     await assistant_session_cancel_audio(master_state)
     
@@ -534,23 +850,57 @@ async def on_speech_started(event, master_state):
     if "speaker" in master_state.task_managers:
         await master_state.task_managers["speaker"].command_q.put(ASSISTANT_STOP_SPEAKING)
 
+async def on_speech_stopped(event, master_state):
+    """Server VAD heard the user stop - the turn boundary comes with the response that follows."""
+    master_state.remote_assistant_state["user_speaking"] = False
+    master_state.context_window.on_speech_stopped(event.get("item_id"), event.get("audio_end_ms"))
+
+async def on_conversation_item_added(event, master_state):
+    """ track every item the session holds - the context window prunes the old ones """
+    master_state.context_window.on_item_added(event.get("item", {}))
+
+async def on_conversation_item_deleted(event, master_state):
+    master_state.context_window.on_item_deleted(event.get("item_id"))
+
 assistant_event_handlers = {
-    "response.output_audio.delta": on_assistant_audio,
+    "response.content_part.added": on_content_part_added,
     "response.output_audio.done": on_assistant_audio,
     "error": on_assistant_error,
     "response.done": on_assistant_response_done,
     "response.output_audio_transcript.done": on_assistant_transcript,
     "response.function_call_arguments.done": on_function_call_arguments_done,
     "input_audio_buffer.speech_started": on_speech_started,
+    "input_audio_buffer.speech_stopped": on_speech_stopped,
+    "response.created": on_response_created,
     "input_audio_buffer.committed": on_audio_buffer_committed,
+    "conversation.item.added": on_conversation_item_added,
+    "conversation.item.created": on_conversation_item_added,
+    "conversation.item.deleted": on_conversation_item_deleted,
 }
 
 async def on_assistant_input_event(event_raw, master_state):
     """ handle events from the assistant """
-    event = json.loads(event_raw)
-    etype = event["type"]
+    # classify from the leading characters: audio deltas go to the speaker as-is, events nobody
+    # handles are never parsed, and only the rest pay for a full parse
+    etype = sniff_event_type(event_raw)
+    event = None
+    if etype is None:
+        event = parse_event(event_raw)
+        etype = event.get("type")
+    if etype == AUDIO_DELTA_EVENT:
+        # untapped delivery (normally the dispatcher taps deltas straight to the speaker): the raw
+        # message goes as-is, the speaker decodes it
+        await master_state.task_managers["speaker"].input_q.put(event_raw)
+        return
 
     if etype in assistant_event_handlers:
-        await assistant_event_handlers[etype](event, master_state)
-    elif "error" in event_raw or "invalid" in event_raw:
+        await assistant_event_handlers[etype](event or parse_event(event_raw), master_state)
+        if etype == AUDIO_DONE_EVENT:
+            # the speaker ends the response on it, queued behind the stream's deltas - it goes after the
+            # handler so the item is already off the streaming list when the speaker looks
+            await master_state.task_managers["speaker"].input_q.put(event_raw)
+    elif etype is None or etype.endswith(".failed"):
+        # untyped messages and unhandled failure events (e.g. conversation.item.input_audio_transcription.failed,
+        # "error" has its own handler) - classified by type, never by scanning the payload, which may be a
+        # transcript saying anything
         print(f"❌ Invalid event: {event_raw}")
\ No newline at end of file
@@ -2,17 +2,171 @@
 # Finley 2025
 
 import asyncio
+import binascii
+import time
+from collections import deque
 from chatty_async_manager import AsyncManager
-from chatty_dsp import upsample_audio_efficient, apply_simple_noise_gate
+from chatty_dsp import PolyphaseResampler, normalize_audio, apply_simple_noise_gate, mulaw_encode
 import numpy as np
-from chatty_config import MASTER_EXIT_EVENT, CHUNK_DURATION_MS
+from chatty_config import MASTER_EXIT_EVENT, CHUNK_DURATION_MS, SAMPLE_RATE_HZ, NATIVE_OAI_SAMPLE_RATE_HZ
+from chatty_config import WIRE_FORMAT_PCMU, PCMU_SAMPLE_RATE_HZ
 from chatty_debug import trace
 
-from chatty_realtime_messages import send_audio_to_assistant
+from chatty_realtime_messages import send_encoded_audio_to_assistant
+
+# 16kHz -> 8kHz decimation has no spare bandwidth: the default 16 taps let 4.4kHz through at only
+# -14dB, folding it back into the speech band.  64 taps: flat to 3kHz, -80dB by 4.4kHz, ~60us a frame.
+PCMU_DECIMATOR_TAPS = 64
 #
 #  Audio OUT handling (mic voice, when active, to assistant) ---------
 #
 
+class UplinkEncoder:
+    """
+    Batches wire-format mic audio into input_audio_buffer.append frames, one per aggregation window.
+
+    Audio (24kHz 16-bit PCM, or 8kHz mu-law with sample_bytes=1) is copied into a preallocated accumulator; frame() base64-encodes it straight into a reusable
+    bytearray behind a pre-serialized JSON envelope, so there is no dict, str or json.dumps per frame.
+    The returned memoryview is only valid until the next frame() - send it before encoding again.
+    """
+    ENVELOPE_PREFIX = b'{"type":"input_audio_buffer.append","audio":"'
+    ENVELOPE_SUFFIX = b'"}'
+    STATS_LOG_INTERVAL_SECONDS = 60
+
+    def __init__(self, window_ms: int = CHUNK_DURATION_MS, sample_rate: int = NATIVE_OAI_SAMPLE_RATE_HZ, sample_bytes: int = 2):
+        self.window_ms = window_ms
+        self.sample_rate = sample_rate
+        self.bytes_per_second = sample_rate * sample_bytes
+        self.window_bytes = self.bytes_per_second * window_ms // 1000
+        self._pcm = bytearray(self.window_bytes * 2)
+        self._pending = 0
+        self._frame = bytearray()
+        self._reserve(len(self._pcm))
+
+        self.frames_sent = 0
+        self.audio_bytes_sent = 0
+        self.wire_bytes_sent = 0
+        self.encode_us_total = 0.0
+        self.encode_us_max = 0.0
+        self.started_time = None
+        self.last_stats_log_time = time.monotonic()
+
+    def _reserve(self, pcm_bytes: int):
+        """ grow the frame buffer to hold pcm_bytes of audio (rare: the first-connect burst) """
+        needed = len(self.ENVELOPE_PREFIX) + (pcm_bytes + 2) // 3 * 4 + len(self.ENVELOPE_SUFFIX)
+        if len(self._frame) < needed:
+            self._frame = bytearray(needed)
+            self._frame[:len(self.ENVELOPE_PREFIX)] = self.ENVELOPE_PREFIX
+
+    def append(self, pcm):
+        """ add wire-format audio (a numpy array or bytes-like) to the pending window """
+        pcm = memoryview(pcm).cast("B")
+        n = len(pcm)
+        if self._pending + n > len(self._pcm):
+            self._pcm.extend(bytes(self._pending + n - len(self._pcm)))
+            self._reserve(len(self._pcm))
+        self._pcm[self._pending:self._pending + n] = pcm
+        self._pending += n
+
+    def pending_ms(self) -> float:
+        return self._pending * 1000 / self.bytes_per_second
+
+    def ready(self) -> bool:
+        return self._pending >= self.window_bytes
+
+    def clear(self):
+        self._pending = 0
+
+    def frame(self) -> memoryview:
+        """ encode everything pending into one append event and reset the window """
+        start = time.perf_counter()
+        encoded = binascii.b2a_base64(memoryview(self._pcm)[:self._pending], newline=False)
+        offset = len(self.ENVELOPE_PREFIX)
+        end = offset + len(encoded)
+        self._frame[offset:end] = encoded
+        self._frame[end:end + len(self.ENVELOPE_SUFFIX)] = self.ENVELOPE_SUFFIX
+        end += len(self.ENVELOPE_SUFFIX)
+        encode_us = (time.perf_counter() - start) * 1e6
+
+        if self.started_time is None:
+            self.started_time = time.monotonic()
+        self.frames_sent += 1
+        self.audio_bytes_sent += self._pending
+        self.wire_bytes_sent += end
+        self.encode_us_total += encode_us
+        self.encode_us_max = max(self.encode_us_max, encode_us)
+        self._pending = 0
+        return memoryview(self._frame)[:end]
+
+    def get_stats(self) -> dict:
+        """ frames and wire bytes per second of streaming, audio sent and per-frame encode cost (us) """
+        elapsed = max(time.monotonic() - self.started_time, 1e-3) if self.started_time else 1.0
+        frames = max(self.frames_sent, 1)
+        return {
+            "window_ms": self.window_ms,
+            "frames": self.frames_sent,
+            "frames_per_sec": self.frames_sent / elapsed,
+            "bytes_per_sec": self.wire_bytes_sent / elapsed,
+            "audio_ms": self.audio_bytes_sent * 1000 // self.bytes_per_second,
+            "encode_us_avg": self.encode_us_total / frames,
+            "encode_us_max": self.encode_us_max,
+        }
+
+    def log_stats(self):
+        s = self.get_stats()
+        trace("audio_out",
+            f"uplink: window={s['window_ms']}ms, frames={s['frames']} ({s['frames_per_sec']:.1f}/s), "
+            f"{s['bytes_per_sec'] / 1024:.1f}KB/s, audio={s['audio_ms']}ms, "
+            f"encode={s['encode_us_avg']:.0f}/{s['encode_us_max']:.0f}us (avg/max)"
+        )
+
+    def maybe_log_stats(self):
+        now = time.monotonic()
+        if now - self.last_stats_log_time > self.STATS_LOG_INTERVAL_SECONDS:
+            self.last_stats_log_time = now
+            self.log_stats()
+
+
+class PreSessionBuffer:
+    """
+    Mic frames that arrive before the realtime session is ready (wake word -> session.updated).
+
+    Bounded to max_seconds of audio, oldest dropped first.  Frames are held as captured (16kHz) because
+    the wire format isn't known until the session is configured.
+    """
+
+    def __init__(self, max_seconds: float, frame_ms: int = CHUNK_DURATION_MS):
+        self.frame_ms = frame_ms
+        self.frames = deque(maxlen=max(1, int(max_seconds * 1000 / frame_ms)))
+        self.dropped = 0
+        self.first_hold_time = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def hold(self, frame):
+        if self.first_hold_time is None:
+            self.first_hold_time = time.monotonic()
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(frame)
+
+    def buffered_ms(self) -> int:
+        return len(self.frames) * self.frame_ms
+
+    def drain(self) -> list:
+        frames = list(self.frames)
+        self.frames.clear()
+        self.first_hold_time = None
+        self.dropped = 0
+        return frames
+
+
+# held audio goes out in appends of about this much once the session is ready
+PRE_SESSION_FLUSH_MS = 1000
+# how often to look for the session while audio is waiting for it
+PRE_SESSION_POLL_SECONDS = 0.02
+
 async def stream_to_assistant(manager: AsyncManager):
     """Read audio chunks from mic event queue and send as JSON events to the assistant."""
     should_exit = False
@@ -20,52 +174,118 @@ async def stream_to_assistant(manager: AsyncManager):
     have_not_sent_audio = True
     chunk_count = 0  # For rate-limited tracing
 
-    initial_buffers = []
+    # one append event per aggregation window - a few ms of latency for far fewer frames to build and send
+    window_ms = max(int(manager.master_state.conman.get_config("UPLINK_AGGREGATION_MS") or CHUNK_DURATION_MS), CHUNK_DURATION_MS)
+
+    # the wire format is negotiated in session.update; the pipeline is (re)built to match it
+    wire_format = None
+    resampler = None
+    encoder = UplinkEncoder(window_ms=window_ms)
+
+    def configure_wire_format():
+        """ 16kHz mic -> 24kHz PCM, or -> 8kHz G.711 mu-law; stateful resampler so chunks join without seams """
+        nonlocal wire_format, resampler, encoder
+        wire_format = manager.master_state.wire_format
+        if wire_format == WIRE_FORMAT_PCMU:
+            resampler = PolyphaseResampler(up=PCMU_SAMPLE_RATE_HZ, down=SAMPLE_RATE_HZ, taps_per_phase=PCMU_DECIMATOR_TAPS)
+            encoder = UplinkEncoder(window_ms=window_ms, sample_rate=PCMU_SAMPLE_RATE_HZ, sample_bytes=1)
+        else:
+            resampler = PolyphaseResampler(up=NATIVE_OAI_SAMPLE_RATE_HZ, down=SAMPLE_RATE_HZ)
+            encoder = UplinkEncoder(window_ms=window_ms)
+        trace("audio_out", f"uplink wire format: {wire_format}")
+
+    # everything said between the wake word and session.updated is held, then sent in a burst
+    pre_session = PreSessionBuffer(float(manager.master_state.conman.get_config("PRE_SESSION_BUFFER_SECONDS") or 10))
+
+    def encode_frame(event):
+        # Apply noise gate if configured (disabled by default for RPi performance)
+        # Only enable if experiencing significant background noise issues
+        # (mic frames arrive as AudioFrames, so the gate and normalizer reuse the levels measured at capture)
+        noise_gate_threshold = manager.master_state.conman.get_config("NOISE_GATE_THRESHOLD")
+        if noise_gate_threshold is not None and noise_gate_threshold > 0:
+            event = apply_simple_noise_gate(event, threshold=float(noise_gate_threshold))
+
+        if wire_format != manager.master_state.wire_format:
+            configure_wire_format()
+
+        # event is audio_16ints (np.ndarray) at 16000hz so we need to resample to the wire rate
+        # Normalize first (helps with quiet mics), then run the vectorized polyphase resampler.
+        # The resampler reuses its output buffer; the encoder copies it into its window.
+        audio_out = resampler.process(normalize_audio(event))
+        if wire_format == WIRE_FORMAT_PCMU:
+            audio_out = mulaw_encode(audio_out)
+        encoder.append(audio_out)
+
+    async def flush_pre_session():
+        """ the session is up: send the held audio as a few large appends """
+        nonlocal have_not_sent_audio
+        ready_time = time.monotonic()
+        if wire_format != manager.master_state.wire_format:
+            configure_wire_format()
+        waited_ms = (ready_time - pre_session.first_hold_time) * 1000
+        held_ms, dropped = pre_session.buffered_ms(), pre_session.dropped
+        appends = encoder.frames_sent
+        for frame in pre_session.drain():
+            encode_frame(frame)
+            if encoder.pending_ms() >= PRE_SESSION_FLUSH_MS:
+                await send_pending()
+                have_not_sent_audio = False
+        trace("audio_out", f"pre-session: held {held_ms}ms of audio ({dropped} frames dropped) for {waited_ms:.0f}ms "
+                           f"until the session was ready, flushed in {(time.monotonic() - ready_time) * 1000:.1f}ms "
+                           f"as {encoder.frames_sent - appends} appends")
+
+    async def send_pending():
+        nonlocal chunk_count
+        ws = manager.master_state.ws
+        if ws is None:
+            encoder.clear()
+            return
+        frame = encoder.frame()
+        await send_encoded_audio_to_assistant(ws, frame)
+        chunk_count += 1
+
+        # Rate-limited logging: log first chunk only
+        if chunk_count == 1:
+            print(f"🎙️ Streaming audio to OpenAI")
+            trace("audio_out", f"first audio buffer sent ({len(frame)}B)")
+        encoder.maybe_log_stats()
+
     while not should_exit:
         try:
-            events = await manager.wait_and_dispatch()
+            if pre_session and manager.master_state.ws:
+                await flush_pre_session()
+
+            # a partial window is flushed if the mic goes quiet (end of an utterance) rather than held back
+            flush_partial = not have_not_sent_audio and encoder.pending_ms() > 0
+            if pre_session:
+                timeout = PRE_SESSION_POLL_SECONDS
+            else:
+                timeout = encoder.window_ms / 1000 if flush_partial else 1
+            events = await manager.wait_and_dispatch(timeout=timeout)
+            if not events and flush_partial:
+                await send_pending()
             for event_type, event in events:
                 if event_type == "input":
-                    if not manager.master_state.ws:
-                        # WebSocket not connected yet, skip this audio chunk
+                    if not manager.master_state.ws or pre_session:
+                        # session not ready yet (or older audio still waiting for it) - hold on to this chunk
+                        pre_session.hold(event)
                         continue
-                    
-                    # Apply noise gate if configured (disabled by default for RPi performance)
-                    # Only enable if experiencing significant background noise issues
-                    noise_gate_threshold = manager.master_state.conman.get_config("NOISE_GATE_THRESHOLD")
-                    if noise_gate_threshold is not None and noise_gate_threshold > 0:
-                        event = apply_simple_noise_gate(event, threshold=float(noise_gate_threshold))
-                    
-                    # event is audio_16ints (np.ndarray) at 16000hz so we need to up-sample to 24000hz
-                    # This upsampling is optimized for RPi: simple linear interpolation, minimal CPU
-                    upsampled_buffer = upsample_audio_efficient(event)
+
+                    encode_frame(event)
 
                     # when socket first connects, hold on to a few frames so the assistant gets enough to infer language
                     if have_not_sent_audio:
-                        initial_buffers.append(upsampled_buffer)
-                        if len(initial_buffers) < int(1000/CHUNK_DURATION_MS):
-                            upsampled_buffer = None
-                        else:
-                            upsampled_buffer = b''.join(initial_buffers)
-                            have_not_sent_audio = False
-
-                    if upsampled_buffer:
-                        # Check WebSocket health before sending
-                        ws = manager.master_state.ws
-                        if ws is None:
-                            chunk_count += 1
+                        if encoder.pending_ms() < 1000:
                             continue
-                        
-                        await send_audio_to_assistant(ws, upsampled_buffer)
-                        chunk_count += 1
-                        
-                        # Rate-limited logging: log first chunk only
-                        if chunk_count == 1:
-                            print(f"🎙️ Streaming audio to OpenAI")
-                            trace("audio_out", f"first audio buffer sent ({len(upsampled_buffer)}B)")
+                        have_not_sent_audio = False
+                        await send_pending()
+                    elif encoder.ready():
+                        await send_pending()
 
                 elif event_type == "command":
                     if event == MASTER_EXIT_EVENT:
+                        if encoder.frames_sent:
+                            encoder.log_stats()
                         should_exit = True
                         break
         except asyncio.CancelledError:
@@ -8,28 +8,99 @@ import asyncio
 import numpy as np
 import pyaudio
 from chatty_async_manager import AsyncManager
-import base64
 import time
-from chatty_config import ASSISTANT_STOP_SPEAKING, MASTER_EXIT_EVENT, NATIVE_OAI_SAMPLE_RATE_HZ, CHUNK_DURATION_MS, SPEAKER_PLAY_TONE
-from chatty_config import chatty_songs, CHATTY_SONG_ERROR
-from chatty_dsp import chatty_tone
+from chatty_config import ASSISTANT_STOP_SPEAKING, MASTER_EXIT_EVENT, NATIVE_OAI_SAMPLE_RATE_HZ, CHUNK_DURATION_MS, SPEAKER_PLAY_TONE, SECONDS_OF_AUDIO_TO_BUFFER
+from chatty_config import chatty_songs, CHATTY_SONG_ERROR, WIRE_FORMAT_PCMU, PCMU_SAMPLE_RATE_HZ
+from chatty_dsp import ToneBank, PcmRingBuffer, PlaybackGain, PolyphaseResampler, mulaw_decode
 from chatty_debug import trace
+from chatty_realtime_messages import decode_downlink_audio_event
+
+# volume changes ramp over this long so they don't click
+VOLUME_RAMP_MS = 20
+
+# every song rendered once at startup - tones (tool calls, near-miss chirps) just enqueue a cached buffer
+tone_bank = ToneBank(chatty_songs)
+tone_bank.render_all()
 
 def chatty_tone_buffer(event):
 
     try:
         song = event.split(":",1)[1].upper()
-        return chatty_tone(chatty_songs[song])
+        return tone_bank.get(song)
     except:
-        return chatty_tone(chatty_songs[CHATTY_SONG_ERROR])
+        return tone_bank.get(CHATTY_SONG_ERROR)
+
+class PlayoutPolicy:
+    """
+    Adaptive jitter buffer for assistant audio: how much to queue before (re)starting playback.
+
+    A response starts playing once target_ms is queued, once its audio is complete, or once audio has
+    been held for twice the target (a slow trickle still gets heard).  Each time a response runs dry
+    mid-stream the target grows by step_ms; each response that plays through cleanly relaxes it.
+    """
+
+    def __init__(self, target_ms=120, min_ms=60, max_ms=480, step_ms=60, relax_ms=20):
+        self.target_ms = target_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.step_ms = step_ms
+        self.relax_ms = relax_ms
+
+    def should_start(self, queued_ms: float, held_ms: float, stream_complete: bool) -> bool:
+        return stream_complete or queued_ms >= self.target_ms or held_ms >= 2 * self.target_ms
+
+    def on_rebuffer(self):
+        self.target_ms = min(self.max_ms, self.target_ms + self.step_ms)
+
+    def on_clean_response(self):
+        self.target_ms = max(self.min_ms, self.target_ms - self.relax_ms)
+
 
-async def speaker_player(manager: AsyncManager) -> None:
-    """Play audio chunks from the assistant to the speaker."""
+async def speaker_player(manager: AsyncManager, playback: PcmRingBuffer = None) -> None:
+    """Play audio chunks from the assistant to the speaker.
+
+    Audio is queued in playback, a preallocated sample ring the PortAudio callback reads straight
+    from (pass one in to watch its depth from outside, as the session teardown does).
+    """
     should_exit = False
     speaker_stream = None
-    unused_buffer = None
     last_cancel_time = None
 
+    # downlink: the dispatcher taps raw audio events to our input_q; they are decoded in batches and
+    # held back by the jitter buffer until enough is queued to play through a busy loop
+    playout = PlayoutPolicy()
+    response_streaming = False   # a response's audio is still arriving
+    response_played = False      # ...and has started playing
+    rebuffering = False          # ...and ran dry mid-stream (waiting to refill)
+    response_rebuffers = 0
+    response_samples = 0
+    response_underruns = 0
+    holding_since = None         # audio queued but not playing yet
+    first_delta_time = None
+    first_sample_pos = None      # set by the loop, cleared by the callback once playback passes it
+    first_sample_time = None
+
+    # G.711 sessions (AUDIO_WIRE_FORMAT=pcmu) send 8kHz mu-law: decoded and upsampled to the 24kHz stream
+    pcmu_upsampler = PolyphaseResampler(up=NATIVE_OAI_SAMPLE_RATE_HZ, down=PCMU_SAMPLE_RATE_HZ)
+
+    if playback is None:
+        playback = PcmRingBuffer(SECONDS_OF_AUDIO_TO_BUFFER * NATIVE_OAI_SAMPLE_RATE_HZ)
+
+    # callback scratch: PortAudio asks for one chunk per call, so this is sized once
+    chunk_samples = int(NATIVE_OAI_SAMPLE_RATE_HZ * CHUNK_DURATION_MS / 1000)
+    out_samples = np.zeros(chunk_samples, dtype=np.int16)
+
+    # volume is pushed in by the config manager when it changes - the callback never looks it up
+    conman = manager.master_state.conman
+    gain = PlaybackGain(conman.get_percent_config_as_0_to_100_int("VOLUME"),
+                        ramp_samples=NATIVE_OAI_SAMPLE_RATE_HZ * VOLUME_RAMP_MS // 1000, max_frame_samples=chunk_samples)
+
+    def _on_volume_changed(key, value):
+        gain.set_percent(conman.get_percent_config_as_0_to_100_int(key))
+        trace("spkr", f"volume -> {conman.get_percent_config_as_0_to_100_int(key)}%")
+
+    conman.add_config_listener("VOLUME", _on_volume_changed)
+
     def _speaker_callback(in_data, frame_count, time_info, status):
         """ Implement the PyAudio callback protocol."""
         # frame_count is the number of frames requested
@@ -38,55 +109,24 @@ async def speaker_player(manager: AsyncManager) -> None:
         if status:
             print(f"*** Speaker callback status: {status}")
 
-        nonlocal unused_buffer
+        nonlocal out_samples, first_sample_pos, first_sample_time
+        if frame_count > len(out_samples):
+            out_samples = np.zeros(frame_count, dtype=np.int16)
 
-        # peek in the output queue to see how many buffers we can use
-        if unused_buffer is not None:
-            buffers_to_play = [unused_buffer]
-            frames_available = len(unused_buffer)
-            unused_buffer = None
-        else:
-            buffers_to_play = []
-            frames_available = 0
-        
-        while frames_available < frame_count and not manager.output_q.empty():
-            # see if the next buffer will fit in the remaining space
-            try:
-                next_buffer = manager.output_q.get_nowait()
-                buffers_to_play.append(next_buffer)
-                frames_available += len(next_buffer)
-            except:
-                break
-        
-        if frames_available > frame_count:
-            # trim excess audio and keep for next time
-            trim_frames = frames_available - frame_count
-            frames_available = frame_count
-            unused_buffer = buffers_to_play[-1][-trim_frames:]
-            buffers_to_play[-1] = buffers_to_play[-1][:-trim_frames]
-        
-        # prep to play the audio
-        should_exit = False
-        if buffers_to_play:
-            audio_array = np.concatenate(buffers_to_play)
-        else:
-            # nothing to play? stop the stream
-            audio_array = np.array([], dtype=np.int16)
-            should_exit = True
-        
-        if frames_available < frame_count:
-            # pad with silence so we get the correct number of frames
-            audio_array = np.concatenate([audio_array, np.zeros(frame_count - frames_available, dtype=np.int16)])
-        
-        # Convert numpy array to bytes for PyAudio
-        try:
-            volume = manager.master_state.conman.get_percent_config_as_0_to_100_int("VOLUME")/100.0
-        except:
-            volume = 1.0
+        # copy from the ring (silence-padded) into the preallocated chunk
+        audio_array = out_samples[:frame_count]
+        frames_played = playback.read_into(audio_array)
+        if first_sample_pos is not None and playback.read_pos > first_sample_pos:
+            first_sample_time = time.monotonic()
+            first_sample_pos = None
+
+        gain.apply(audio_array)
 
-        out_data = (audio_array * volume).astype(np.int16).tobytes()
-        
-        if should_exit:
+        # PyAudio's callback protocol takes bytes back - the one copy per chunk
+        out_data = audio_array.tobytes()
+
+        # nothing to play? stop the stream
+        if frames_played == 0:
             return (out_data, pyaudio.paComplete)
         else:
             return (out_data, pyaudio.paContinue)
@@ -94,7 +134,9 @@ async def speaker_player(manager: AsyncManager) -> None:
     def stop_speaker_stream(speaker_stream):
         if speaker_stream:
             print("🔈 Stopping speaker stream")
-            trace("spkr", "stream stopped")
+            stats = playback.get_stats()
+            trace("spkr", f"stream stopped (queued={stats['queued_ms']}ms, underruns={stats['underruns']}/{stats['underrun_samples']} samples, "
+                          f"overruns={stats['overruns']}/{stats['overrun_samples']} samples)")
             speaker_stream.stop_stream()
             speaker_stream.close()
         return None
@@ -121,9 +163,84 @@ async def speaker_player(manager: AsyncManager) -> None:
 
         return speaker_stream
 
+    def speaker_playing(speaker_stream):
+        return speaker_stream is not None and speaker_stream.is_active()
+
+    def maybe_start_playout(speaker_stream):
+        """ start (or restart) the stream once the jitter buffer says enough is queued """
+        nonlocal holding_since, rebuffering, response_played
+        if speaker_playing(speaker_stream) or playback.available() == 0:
+            holding_since = None
+            return speaker_stream
+        now = time.monotonic()
+        if holding_since is None:
+            holding_since = now
+        queued_ms = playback.available() * 1000 / NATIVE_OAI_SAMPLE_RATE_HZ
+        if not playout.should_start(queued_ms, (now - holding_since) * 1000, not response_streaming):
+            return speaker_stream
+        holding_since = None
+        rebuffering = False
+        response_played = response_played or response_streaming
+        return prepare_to_speak(speaker_stream)
+
+    def on_downlink_audio(event, speaker_stream):
+        """ decode one tapped audio event into the ring; track the response it belongs to """
+        nonlocal response_streaming, response_played, rebuffering, response_rebuffers, response_samples
+        nonlocal response_underruns, first_delta_time, first_sample_pos, first_sample_time, last_cancel_time
+
+        pcm = decode_downlink_audio_event(event)
+
+        # catch buffers incoming after a user cancel but before response stops
+        if last_cancel_time and time.time() - last_cancel_time < 0.5:
+            return
+        last_cancel_time = None
+
+        if pcm is None:
+            # an audio stream finished - the response is complete once none are left
+            if response_streaming and not manager.master_state.remote_assistant_state.get("streaming_audio_item_ids"):
+                response_streaming = False
+                if response_rebuffers == 0:
+                    playout.on_clean_response()
+                latency = (first_sample_time - first_delta_time) * 1000 if first_sample_time else None
+                trace("spkr", f"response audio {response_samples * 1000 // NATIVE_OAI_SAMPLE_RATE_HZ}ms, "
+                              f"first delta->first sample {f'{latency:.0f}ms' if latency is not None else 'pending'}, "
+                              f"rebuffers={response_rebuffers}, underruns={playback.underruns - response_underruns}, "
+                              f"playout target={playout.target_ms}ms")
+            return
+
+        if not response_streaming:
+            # first delta of a new response
+            response_streaming = True
+            response_played = False
+            rebuffering = False
+            response_rebuffers = 0
+            response_samples = 0
+            response_underruns = playback.underruns
+            first_delta_time = time.monotonic()
+            first_sample_time = None
+            first_sample_pos = playback.write_pos
+            pcmu_upsampler.reset()
+        elif response_played and not rebuffering and not speaker_playing(speaker_stream):
+            # ran dry mid-response: hold audio back for a deeper buffer next time
+            rebuffering = True
+            response_rebuffers += 1
+            playout.on_rebuffer()
+            trace("spkr", f"rebuffering - playout target now {playout.target_ms}ms")
+
+        if manager.master_state.wire_format == WIRE_FORMAT_PCMU:
+            samples = pcmu_upsampler.process(mulaw_decode(pcm))
+        else:
+            samples = np.frombuffer(pcm, dtype=np.int16)
+        playback.write(samples)
+        response_samples += len(samples)
+
     while not should_exit:
         try:
-            events = await manager.wait_and_dispatch()
+            # while holding audio back, wake up soon to re-check the jitter buffer
+            events = await manager.wait_and_dispatch(timeout=0.02 if holding_since is not None else 1)
+            if not events:
+                speaker_stream = maybe_start_playout(speaker_stream)
+                continue
             for event_type, event in events:
                 if event_type == "command":
                     if event == MASTER_EXIT_EVENT:
@@ -133,30 +250,24 @@ async def speaker_player(manager: AsyncManager) -> None:
                     elif event.startswith(SPEAKER_PLAY_TONE):
                         tone_name = event.split(":", 1)[1] if ":" in event else "unknown"
                         trace("spkr", f"playing tone: {tone_name}")
-                        manager.output_q.put_nowait(chatty_tone_buffer(event))
+                        playback.write(chatty_tone_buffer(event))
                         speaker_stream = prepare_to_speak(speaker_stream)
                     elif event == ASSISTANT_STOP_SPEAKING:
                         trace("spkr", "interrupted by user - clearing queue")
                         last_cancel_time = time.time()
                         speaker_stream = stop_speaker_stream(speaker_stream)
-                        # clear the output queue
-                        while not manager.output_q.empty():
-                            try:
-                                manager.output_q.get_nowait()
-                            except:
-                                break
-                        unused_buffer = None
+                        # drop everything queued for playback
+                        playback.flush()
+                        response_streaming = False
+                        holding_since = None
+                        first_sample_pos = None
 
                 elif event_type == "input":
-
-                    # catch buffers incoming after a user cancel but before response stops
-                    if last_cancel_time and time.time() - last_cancel_time < 0.5:
-                        continue
-                    last_cancel_time = None
-
-                    event_buffer = base64.b64decode(event)
-                    manager.output_q.put_nowait(np.frombuffer(event_buffer, dtype=np.int16))                    
-                    speaker_stream = prepare_to_speak(speaker_stream)
+                    # decode this event and everything else already queued in one pass
+                    on_downlink_audio(event, speaker_stream)
+                    while not manager.input_q.empty():
+                        on_downlink_audio(manager.input_q.get_nowait(), speaker_stream)
+                    speaker_stream = maybe_start_playout(speaker_stream)
 
         except asyncio.CancelledError:
             should_exit = True
@@ -172,5 +283,6 @@ async def speaker_player(manager: AsyncManager) -> None:
         deadman -= 1
 
     stop_speaker_stream(speaker_stream)
+    conman.remove_config_listener("VOLUME", _on_volume_changed)
 
     print("🎤 Speaker MASTER_EXIT_EVENT.")
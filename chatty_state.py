@@ -5,15 +5,21 @@ from openai import AsyncOpenAI, OpenAI
 import pyaudio
 from chatty_tools import load_tool_config
 from chatty_secrets import SecretsManager
-from chatty_config import ConfigManager, ASSISTANT_GO_TO_SLEEP, SPEAKER_PLAY_TONE, CHATTY_SONG_SLEEP, OPENAI_SESSION_HARD_LIMIT_SECONDS, EMBEDDED_PHRASES
+from chatty_config import ConfigManager, ASSISTANT_GO_TO_SLEEP, SPEAKER_PLAY_TONE, CHATTY_SONG_SLEEP, OPENAI_SESSION_HARD_LIMIT_SECONDS, EMBEDDED_PHRASES, WIRE_FORMAT_PCM
 import asyncio
 import platform
 import time
-from chatty_supervisor import report_conversation_to_supervisor
-from chatty_realtime_messages import send_assistant_text_from_system
+from chatty_supervisor import report_conversation_to_supervisor, report_conversation, queue_email
+from chatty_metrics import SessionMetrics, RESPONSE_MAIN
+from chatty_context_window import ContextWindow
+import chatty_handoff
+from chatty_handoff import SESSION_HANDOFF_LEAD_SECONDS, SESSION_HANDOFF_FORCE_SECONDS
+from chatty_usage_ledger import UsageLedger
+from chatty_jobs import JobQueue, JOB_SUPERVISOR_REPORT, JOB_EMAIL, JOB_SMS, JOB_CLOUD_SYNC
+from chatty_realtime_messages import send_assistant_text_from_system, RealtimeConnector, prepare_realtime_session
+from chatty_debug import trace
 from chatty_embed import ChattyEmbed
-from chatty_communications import chatty_send_email
-from chatty_communications import chatty_send_email
+from chatty_communications import send_email_job, send_sms_job
 
 DEBUGGING = True
 PAUSING_FOR_SUMMARY_INSTRUCTIONS = "You're going offline for a moment.  let the user know you need a moment and will be back soon."
@@ -56,9 +62,8 @@ class ChattyMasterState:
         self.auto_summary_count = 0
         self.auto_summary_auto_resume_limit = 3
         
-        # Cost tracking
-        self.daily_cost_history = {}  # date_string -> total_cost
-        self.monthly_cost_history = {}  # year-month -> total_cost
+        # Cost tracking: per-response ledger with daily / monthly rollups that survive restarts
+        self.usage_ledger = UsageLedger()
         self.last_cost_alert_date = None
         self.cost_alert_sent_today = False
 
@@ -71,6 +76,27 @@ class ChattyMasterState:
         self.async_openai = AsyncOpenAI(api_key=openai_api_key)
         self.pa = pyaudio.PyAudio()
 
+        # opens realtime sessions, ahead of the wake word when REALTIME_PREWARM allows
+        self.realtime_connector = RealtimeConnector(self)
+
+        # SESSION_HANDOFF: a successor session opened alongside a long-running one, swapped in between turns
+        self.handoff_task = None
+        self.pending_handoff = None
+        self.session_handoffs = 0
+
+        # end-of-conversation work (supervisor, notifications, cloud sync) runs here, behind the audio managers
+        self.jobs = JobQueue(self)
+        self.jobs.register(JOB_SUPERVISOR_REPORT, report_conversation_to_supervisor)
+        self.jobs.register(JOB_EMAIL, send_email_job, blocking=True)
+        self.jobs.register(JOB_SMS, send_sms_job, blocking=True)
+        self.jobs.register(JOB_CLOUD_SYNC, ChattyMasterState._sync_to_supabase)
+        self.upgrade_after_session = False
+
+        # running totals for the current conversation - read by the auto-summarize and cost checks
+        self.session_metrics = SessionMetrics()
+        # the current realtime session's conversation items - old audio turns are pruned into a text recap
+        self.context_window = ContextWindow(self)
+
         self._data_lock = threading.RLock()
 
         self.tool_dispatch_map, self.tools_for_assistant = load_tool_config(self)
@@ -88,8 +114,9 @@ class ChattyMasterState:
         self.logs_for_next_summary = []
         return logs
 
-    async def start_tasks(self, task_managers):
-        await self.reset_session_state_variables()
+    async def start_tasks(self, task_managers, resuming=False):
+        self.jobs.start()
+        await self.reset_session_state_variables(resuming)
         self.task_managers = task_managers
         for manager in self.task_managers.values():
             manager.start(self)
@@ -131,12 +158,26 @@ class ChattyMasterState:
             else:
                 print(message)
 
-    async def reset_session_state_variables(self):
+    async def reset_session_state_variables(self, resuming=False):
+        """ end the previous conversation; resuming = a session starts again right away (auto-summary) """
+
+        await self.cancel_session_handoff()
+
+        if self.upgrade_after_session:
+            # the cloud sync flagged an upgrade while a conversation was running
+            self.upgrade_after_session = False
+            self.should_upgrade = True
 
         if hasattr(self, "transcript_history") and self.transcript_history:
-            await report_conversation_to_supervisor(self)
-            session_cost = sum([u['cost'] for u in self.usage_history])
-            message_count = len(self.transcript_history)
+            # queued, not awaited, so the mic listener restarts now - except when resuming, whose prompt needs
+            # the resume context the supervisor writes
+            await report_conversation(self, resuming)
+            session_cost = self.session_metrics.cost
+            message_count = self.session_metrics.message_count
+            self.session_metrics.log_stats()
+            self.context_window.log_stats()
+            self.usage_ledger.save()
+            self.usage_ledger.log_stats()
             print(f"**** Total cost : ${session_cost:.2f} ***** ")
             
             # Reset cost alert flag for new day
@@ -145,57 +186,56 @@ class ChattyMasterState:
             if self.last_cost_alert_date != today:
                 self.cost_alert_sent_today = False
             
-            # Supabase sync: try once, don't block on failure
-            await self._sync_to_supabase(session_cost, message_count)
+            self.jobs.submit(JOB_CLOUD_SYNC, {"cost": session_cost, "message_count": message_count})
 
         self.transcript_history = []
         self.usage_history = []
+        self.session_metrics.reset()
+        self.context_window = ContextWindow(self)
         self.logs_for_next_summary = []
         self.remote_assistant_state = {}
         self.ws = None
+        self.wire_format = WIRE_FORMAT_PCM  # audio codec negotiated for the current session
         self.last_activity_time = None
     
-    async def _sync_to_supabase(self, session_cost: float, message_count: int):
+    async def _sync_to_supabase(self, usage_stats: dict):
         """
-        Sync usage stats and check for updates from Supabase.
-        Try once at conversation end, fail silently if unsuccessful.
+        JobQueue handler: sync usage stats ({"cost", "message_count"}) and check for updates from Supabase.
+        The client blocks, so its calls run on a worker thread; a failed sync raises and is retried.
         """
         try:
             from chatty_supabase import get_supabase_manager
-            
-            supabase = get_supabase_manager(self.conman, self.secrets_manager)
-            
-            if not supabase.is_device_linked():
-                return  # Not linked to Supabase, skip sync
-            
-            usage_stats = {
-                "cost": session_cost,
-                "message_count": message_count
-            }
-            
-            # Try to sync - this pushes usage and checks for config/upgrade flags
-            success, new_config, new_secrets = supabase.sync_at_conversation_end(
-                usage_stats,
-                self.conman.config if self.conman else None
-            )
-            
-            if success:
-                # Apply new config if received (cloud wins, volume stays local)
-                if new_config:
-                    print("☁️ Applying updated configuration from cloud")
-                    self.conman.save_config(new_config)
-                
-                # Check for upgrade flag
-                if supabase.check_upgrade_pending():
-                    print("☁️ Upgrade pending - will trigger upgrade on next cycle")
-                    self.should_upgrade = True
-            
         except ImportError:
             # Supabase module not available, skip silently
-            pass
-        except Exception as e:
-            # Log but don't fail - device operation is more important than sync
-            print(f"☁️ Supabase sync skipped: {e}")
+            return
+
+        supabase = await asyncio.to_thread(get_supabase_manager, self.conman, self.secrets_manager)
+
+        if not supabase.is_device_linked():
+            return  # Not linked to Supabase, skip sync
+
+        # Try to sync - this pushes usage and checks for config/upgrade flags
+        success, new_config, new_secrets = await asyncio.to_thread(
+            supabase.sync_at_conversation_end,
+            usage_stats,
+            self.conman.config if self.conman else None
+        )
+        if not success:
+            raise Exception("Supabase sync failed")
+
+        # Apply new config if received (cloud wins, volume stays local)
+        if new_config:
+            print("☁️ Applying updated configuration from cloud")
+            self.conman.save_config(new_config)
+
+        # Check for upgrade flag
+        if await asyncio.to_thread(supabase.check_upgrade_pending):
+            print("☁️ Upgrade pending - will trigger upgrade on next cycle")
+            if self.ws is None:
+                self.should_upgrade = True
+            else:
+                # a conversation started while the sync ran - don't cut it off
+                self.upgrade_after_session = True
 
     def flow_control_event(self):
         return any([self.should_quit, self.should_upgrade, self.should_reset_session, self.should_summarize])
@@ -208,32 +248,19 @@ class ChattyMasterState:
     async def check_auto_summarize_n_messages(self):
         """Check if we should auto-summarize based on token usage or message count"""
         # Check token-based summarization first (more accurate)
-        if hasattr(self, 'usage_history') and self.usage_history:
-            # Estimate total tokens used so far
-            # Rough estimate: 1 audio token ≈ 0.6 seconds of audio, 1 text token ≈ 4 characters
-            # We track costs, so we can estimate tokens from costs
+        if self.session_metrics.context_tokens:
+            # real counts from response.done: the input tokens of the latest main response are the
+            # context the model re-reads every turn - this realtime session only, a handoff starts fresh
             try:
-                total_cost = sum([u.get("cost", 0) for u in self.usage_history])
-                cost_sheet = self.conman.get_config("TOKEN_COST_PER_MILLION")
-                if cost_sheet:
-                    # Estimate tokens: cost / (cost_per_million / 1_000_000)
-                    # Use average of input and output token costs
-                    avg_input_cost = (cost_sheet.get("per_input_text_token", 0) + 
-                                     cost_sheet.get("per_input_audio_token", 0)) / 2_000_000
-                    avg_output_cost = (cost_sheet.get("per_output_text_token", 0) + 
-                                      cost_sheet.get("per_output_audio_token", 0)) / 2_000_000
-                    # Rough split: 60% input, 40% output
-                    estimated_tokens = int((total_cost * 0.6 / avg_input_cost) + (total_cost * 0.4 / avg_output_cost))
-                    
-                    # Auto-summarize if we've used more than ~50k tokens (roughly $0.50-1.00 depending on model)
-                    max_tokens_before_summary = self.conman.get_config("AUTO_SUMMARIZE_MAX_TOKENS")
-                    if max_tokens_before_summary is None:
-                        max_tokens_before_summary = 50000  # default
-                    
-                    if estimated_tokens > max_tokens_before_summary:
-                        print(f"🔄 Auto-summarizing due to token usage: ~{estimated_tokens} tokens")
-                        await self.do_auto_summarize()
-                        return
+                max_tokens_before_summary = self.conman.get_config("AUTO_SUMMARIZE_MAX_TOKENS")
+                if max_tokens_before_summary is None:
+                    max_tokens_before_summary = 50000  # default
+
+                context_tokens = self.session_metrics.context_tokens
+                if context_tokens > max_tokens_before_summary:
+                    print(f"🔄 Auto-summarizing due to token usage: {context_tokens} tokens of context")
+                    await self.request_session_rollover("tokens")
+                    return
             except Exception as e:
                 print(f"⚠️ Error in token-based summarization check: {e}")
         
@@ -245,15 +272,71 @@ class ChattyMasterState:
             n = 30
 
         if self.transcript_history and self.transcript_history[-1]["role"] == "AI":
-            ai_message_count = sum(1 for item in self.transcript_history if item["role"] == "AI")
+            ai_message_count = self.session_metrics.messages.get("AI", 0)
             if ai_message_count % n == 0:
-                await self.do_auto_summarize()
+                await self.request_session_rollover("messages")
 
     async def check_auto_summarize_time(self):
         if self.remote_assistant_state:
             if "session_open_time" in self.remote_assistant_state:
-                if time.time() - self.remote_assistant_state["session_open_time"] > OPENAI_SESSION_HARD_LIMIT_SECONDS-60:
-                    self.do_auto_summarize()
+                session_age = time.time() - self.remote_assistant_state["session_open_time"]
+                if self.pending_handoff:
+                    # no turn boundary came along in time - swap anyway rather than hit the limit
+                    await self.complete_session_handoff(force=session_age > OPENAI_SESSION_HARD_LIMIT_SECONDS-SESSION_HANDOFF_FORCE_SECONDS)
+                elif session_age > OPENAI_SESSION_HARD_LIMIT_SECONDS-(SESSION_HANDOFF_LEAD_SECONDS if self.conman.get_config("SESSION_HANDOFF") else 60):
+                    await self.request_session_rollover("time limit")
+
+    async def request_session_rollover(self, reason):
+        """ the session is full (time, tokens or messages): hand off to a successor if SESSION_HANDOFF is on,
+        otherwise pause, summarize and restart """
+        if self.conman.get_config("SESSION_HANDOFF") and self.ws is not None:
+            if self.handoff_task is None and self.pending_handoff is None:
+                self.handoff_task = asyncio.create_task(self._prepare_session_handoff(reason))
+            return
+        await self.do_auto_summarize()
+
+    def build_handoff_context(self):
+        return chatty_handoff.build_handoff_context(self)
+
+    async def _prepare_session_handoff(self, reason):
+        start = time.monotonic()
+        trace("main", f"handoff: opening successor session ({reason})")
+        try:
+            self.pending_handoff = await prepare_realtime_session(self, attempts=3, handoff_context=self.build_handoff_context())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Session handoff failed ({e}) - summarizing instead")
+            trace("main", f"handoff: failed ({e}) - falling back to auto-summarize")
+            self.handoff_task = None
+            await self.do_auto_summarize()
+            return
+        self.handoff_task = None
+        trace("main", f"handoff: successor ready in {(time.monotonic() - start) * 1000:.0f}ms id={self.pending_handoff.session_id}")
+        await self.complete_session_handoff()
+
+    def is_at_turn_boundary(self):
+        return chatty_handoff.is_at_turn_boundary(self)
+
+    async def complete_session_handoff(self, force=False):
+        """ swap the successor session in at a turn boundary (or force) - see chatty_handoff """
+        return await chatty_handoff.complete_session_handoff(self, force)
+
+    async def cancel_session_handoff(self):
+        """ the conversation is ending - drop any successor being prepared or waiting """
+        if self.handoff_task is not None:
+            self.handoff_task.cancel()
+            try:
+                await self.handoff_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.handoff_task = None
+        if self.pending_handoff is not None:
+            try:
+                await self.pending_handoff.ws.close()
+            except Exception:
+                pass
+            self.pending_handoff = None
 
     async def do_auto_summarize(self):
         self.auto_summary_count += 1
@@ -263,6 +346,7 @@ class ChattyMasterState:
 
     async def add_to_transcript(self, role, content):
         self.transcript_history.append({"role": role, "content": content})
+        self.session_metrics.record_message(role, content)
         print(f"🔄 {role}: {content}")
         await self.check_auto_summarize_n_messages()
 
@@ -286,23 +370,14 @@ class ChattyMasterState:
             if embedding_match[0] in EMBEDDED_PHRASES:
                 self.dismiss_assistant()
 
-    def accumulate_usage(self, cost):
+    def accumulate_usage(self, cost, usage=None, kind=RESPONSE_MAIN, latency_ms=0):
         self.usage_history.append({"cost":cost})
+        self.session_metrics.record_response(usage or {}, cost, kind)
         #print(f"Just spent ${cost:0.4f} on this response")
         #print(f"Total cost so far: ${sum([u['cost'] for u in self.usage_history]):0.2f}")
         
         # Update daily and monthly cost tracking
-        from chatty_config import get_current_date_string
-        today = get_current_date_string()
-        month_key = today[:7]  # YYYY-MM
-        
-        if today not in self.daily_cost_history:
-            self.daily_cost_history[today] = 0.0
-        self.daily_cost_history[today] += cost
-        
-        if month_key not in self.monthly_cost_history:
-            self.monthly_cost_history[month_key] = 0.0
-        self.monthly_cost_history[month_key] += cost
+        self.usage_ledger.record(usage or {}, cost, kind, latency_ms)
         
         # Check cost limits and alerts
         self.check_cost_limits()
@@ -313,9 +388,9 @@ class ChattyMasterState:
         import asyncio
         
         today = get_current_date_string()
-        daily_cost = self.daily_cost_history.get(today, 0.0)
+        daily_cost = self.usage_ledger.daily_cost(today)
         month_key = today[:7]
-        monthly_cost = self.monthly_cost_history.get(month_key, 0.0)
+        monthly_cost = self.usage_ledger.monthly_cost(month_key)
         
         daily_limit = self.conman.get_config("DAILY_COST_LIMIT")
         monthly_limit = self.conman.get_config("MONTHLY_COST_LIMIT")
@@ -344,27 +419,18 @@ class ChattyMasterState:
                 supervisor_contact = self.conman.get_contact_by_type("primary")
                 if supervisor_contact and hasattr(self, 'secrets_manager') and self.secrets_manager.has_email_configured():
                     try:
-                        # Use asyncio to send email (if we're in an async context)
-                        loop = None
-                        try:
-                            loop = asyncio.get_event_loop()
-                        except RuntimeError:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                        
-                        if loop and not loop.is_closed():
-                            for supervisor in supervisor_contact:
-                                if supervisor and supervisor.get("email"):
-                                    subject = f"Chatty Friend Cost Alert - ${daily_cost:.2f} today"
-                                    message = f"Daily cost has reached ${daily_cost:.2f}, exceeding the alert threshold of ${alert_threshold:.2f}.\n\n"
-                                    message += f"Monthly cost so far: ${monthly_cost:.2f}\n"
-                                    if daily_limit:
-                                        message += f"Daily limit: ${daily_limit:.2f}\n"
-                                    if monthly_limit:
-                                        message += f"Monthly limit: ${monthly_limit:.2f}\n"
-                                    
-                                    # Schedule email send
-                                    asyncio.create_task(chatty_send_email(self, supervisor["email"], subject, message))
+                        for supervisor in supervisor_contact:
+                            if supervisor and supervisor.get("email"):
+                                subject = f"Chatty Friend Cost Alert - ${daily_cost:.2f} today"
+                                message = f"Daily cost has reached ${daily_cost:.2f}, exceeding the alert threshold of ${alert_threshold:.2f}.\n\n"
+                                message += f"Monthly cost so far: ${monthly_cost:.2f}\n"
+                                if daily_limit:
+                                    message += f"Daily limit: ${daily_limit:.2f}\n"
+                                if monthly_limit:
+                                    message += f"Monthly limit: ${monthly_limit:.2f}\n"
+
+                                # queued - smtplib would stall the conversation's audio
+                                queue_email(self, supervisor["email"], subject, message)
                     except Exception as e:
                         print(f"⚠️ Error sending cost alert email: {e}")
 
@@ -8,7 +8,7 @@
 
 import jinja2
 from chatty_config import get_current_date_string, CONTACT_TYPE_PRIMARY_SUPERVISOR, CHATTY_FRIEND_VERSION_NUMBER
-from chatty_communications import chatty_send_email, chatty_send_sms
+from chatty_jobs import JOB_SUPERVISOR_REPORT, JOB_EMAIL, JOB_SMS
 import asyncio
 
 SUPERVISOR_SYSTEM_PROMPT = """
@@ -80,10 +80,11 @@ response_vars = [
     "other_points_of_note"
 ]
 
-def format_summary_email(master_state, responses):
+def format_summary_email(master_state, responses, conversation):
     # Format the email content
     subject = f"Chatty Summary for {get_current_date_string(with_time=True)}"
-    logs_to_include = master_state.get_logs_for_next_summary()
+    transcript_history = conversation["transcript_history"]
+    logs_to_include = conversation["logs"]
 
     if responses["escalation"]:
         subject += " - Escalation"
@@ -236,7 +237,7 @@ def format_summary_email(master_state, responses):
                 <p>Here is a transcript of the conversation for future reference:</p>
     """
 
-    for item in master_state.transcript_history[1:]:
+    for item in transcript_history[1:]:
         speaker = "Chatty Friend" if item["role"] == "AI" else master_state.conman.get_config("USER_NAME")
         message = item["content"].replace('<', '&lt;').replace('>', '&gt;').replace(chr(10), '<br>')
         html_content += f"""
@@ -269,13 +270,13 @@ def format_summary_email(master_state, responses):
             <div class="section">
                 <p>The following context was provided to Chatty Friend at the start of the conversation:</p>
                 <div class="transcript">
-                    {master_state.transcript_history[0]["content"].replace('<', '&lt;').replace('>', '&gt;').replace(chr(10), '<br>')}
+                    {transcript_history[0]["content"].replace('<', '&lt;').replace('>', '&gt;').replace(chr(10), '<br>')}
                 </div>
             </div>
     """
 
     # Add cost section
-    total_cost = sum([u["cost"] for u in master_state.usage_history])
+    total_cost = sum([u["cost"] for u in conversation["usage_history"]])
     html_content += f"""
             <div class="cost">
                 💰 Total Cost: ${total_cost:.2f}
@@ -311,11 +312,11 @@ def format_summary_email(master_state, responses):
 
     """
     plain_text += "TRANSCRIPT:\n"
-    for item in master_state.transcript_history[1:]:
+    for item in transcript_history[1:]:
         speaker = "Chatty Friend" if item["role"] == "AI" else master_state.conman.get_config("USER_NAME")
         plain_text += f"{speaker}: {item['content']}\n"
 
-    plain_text += f"\nSETUP: {master_state.transcript_history[0]['content']}\n"
+    plain_text += f"\nSETUP: {transcript_history[0]['content']}\n"
 
     if logs_to_include:
         plain_text += "\n\n---------LOGS:\n"
@@ -331,14 +332,37 @@ def format_summary_email(master_state, responses):
 
     return subject, html_content, plain_text
 
-async def report_conversation_to_supervisor(master_state):
+def snapshot_conversation(master_state) -> dict:
+    """ what the supervisor needs from a finished conversation, as a JSON-serializable job payload """
+    return {
+        "transcript_history": list(master_state.transcript_history),
+        "usage_history": list(master_state.usage_history),
+        "logs": master_state.get_logs_for_next_summary(),
+    }
+
+async def report_conversation(master_state, resuming: bool = False):
+    """ hand a finished conversation to the supervisor: queued, unless the next session starts straight away
+    (auto-summary) - its prompt reads the resume_context this report writes, so that one is awaited """
+    conversation = snapshot_conversation(master_state)
+    if resuming:
+        # the notifications it produces are still queued; only the analysis holds up the next session
+        await report_conversation_to_supervisor(master_state, conversation)
+    else:
+        master_state.jobs.submit(JOB_SUPERVISOR_REPORT, conversation)
+
+def queue_email(master_state, recipient, subject, content, html_content=None):
+    master_state.jobs.submit(JOB_EMAIL, {"recipient": recipient, "subject": subject, "content": content, "html_content": html_content})
+
+async def report_conversation_to_supervisor(master_state, conversation):
+    """ JobQueue handler: analyse a finished conversation (from snapshot_conversation) and queue the resulting notifications """
+    transcript_history = conversation["transcript_history"]
 
-    if not master_state.transcript_history or not master_state.conman.get_config("SUPERVISOR_MODEL") or not master_state.secrets_manager.get_secret("chat_api_key"):
+    if not transcript_history or not master_state.conman.get_config("SUPERVISOR_MODEL") or not master_state.secrets_manager.get_secret("chat_api_key"):
         return None
 
     # don't summarize if the user never spoke
-    user_message_count = sum(1 for item in master_state.transcript_history if item["role"] == "user")
-    if not user_message_count and not master_state.logs_for_next_summary:
+    user_message_count = sum(1 for item in transcript_history if item["role"] == "user")
+    if not user_message_count and not conversation["logs"]:
         return None
 
     # make sure we have the latest config
@@ -353,7 +377,7 @@ async def report_conversation_to_supervisor(master_state):
             "escalation_contact_configured": master_state.secrets_manager.has_escalation_contact_configured(),
             "summary_email_configured": master_state.secrets_manager.has_email_configured() and supervisor_contact,
             "prior_pre_escalation_notes": master_state.conman.get_config("PRIOR_PRE_ESCALATION_NOTES"),
-            "transcript_history": master_state.transcript_history,
+            "transcript_history": transcript_history,
             "today": get_current_date_string(),
             "user_name": master_state.conman.get_config("USER_NAME")
         }
@@ -388,9 +412,9 @@ async def report_conversation_to_supervisor(master_state):
             if supervisor_contact:
                 for supervisor in supervisor_contact:
                     if supervisor and supervisor.get("email"):
-                        await chatty_send_email(
-                            master_state, 
-                            supervisor["email"], 
+                        queue_email(
+                            master_state,
+                            supervisor["email"],
                             "Chatty Friend Supervisor Error " + get_current_date_string(),
                             f"Supervisor analysis failed after multiple attempts. Error: {last_error}\n\nConversation transcript was available but could not be analyzed."
                         )
@@ -435,9 +459,9 @@ async def report_conversation_to_supervisor(master_state):
                 escalation_message += "Chatty Friend has determined the need to make the following escalation:\n\n"+escalation[:1000]
                 for contact in escalation_contacts:
                     if contact.get("email"):
-                        await chatty_send_email(master_state, contact["email"], "Urgent Escalation from Chatty Friend "+get_current_date_string(), escalation_message)
+                        queue_email(master_state, contact["email"], "Urgent Escalation from Chatty Friend "+get_current_date_string(), escalation_message)
                     if contact.get("phone"):
-                        await chatty_send_sms(master_state, contact["phone"], escalation_message[:250])
+                        master_state.jobs.submit(JOB_SMS, {"recipient": contact["phone"], "message": escalation_message[:250]})
 
         # these two tags get the same treatment: break up, add date and push to config
         try:
@@ -458,10 +482,10 @@ async def report_conversation_to_supervisor(master_state):
             master_state.conman.save_resume_context(responses["resume_context"])
 
         if responses["summary"] and supervisor_contact:
-            subject, html_summary, plain_summary = format_summary_email(master_state, responses)
+            subject, html_summary, plain_summary = format_summary_email(master_state, responses, conversation)
             for supervisor in supervisor_contact:
                 if supervisor and supervisor.get("email"):
-                    await chatty_send_email(master_state, supervisor["email"], subject, plain_summary, html_summary)
+                    queue_email(master_state, supervisor["email"], subject, plain_summary, html_summary)
 
 
     except Exception as e:
@@ -471,4 +495,4 @@ async def report_conversation_to_supervisor(master_state):
         if supervisor_contact:
             for supervisor in supervisor_contact:
                 if supervisor and supervisor.get("email"):
-                    await chatty_send_email(master_state, supervisor["email"], "Chatty Friend "+get_current_date_string()+" unable to summarize and escalate", "Please review configuration and try again.  Error: "+str(e))
\ No newline at end of file
+                    queue_email(master_state, supervisor["email"], "Chatty Friend "+get_current_date_string()+" unable to summarize and escalate", "Please review configuration and try again.  Error: "+str(e))
\ No newline at end of file
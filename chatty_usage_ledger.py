@@ -0,0 +1,228 @@
+# Chatty Usage Ledger
+# Finley 2025
+#
+#  Per-response token accounting ---------
+#
+#  Every response.done appends one fixed-size binary record (time, kind, latency, cost and the exact
+#  token counts by modality, cached and uncached) to a per-day file on the RAM drive, so the SD card
+#  isn't written per response.  Daily and monthly rollups are kept up to date in memory as records
+#  arrive and written to disk at the end of each conversation and when the day changes, so cost
+#  limits and reports survive restarts.  After a crash the records the rollup hasn't seen yet are
+#  folded back in from the RAM drive (a power cut loses at most the conversation in progress).
+#
+
+import json
+import os
+import struct
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from chatty_config import get_current_date_string
+from chatty_debug import trace
+from chatty_metrics import TOKEN_TYPES, RESPONSE_KINDS, RESPONSE_MAIN, usage_token_counts
+
+USAGE_LEDGER_DIR = "/tmp/chatty_usage"
+USAGE_ROLLUP_FILE = "chatty_usage_rollup.json"
+# ledger files older than this are removed from the RAM drive (their totals live on in the rollup)
+USAGE_LEDGER_KEEP_DAYS = 7
+
+# unix time, kind index, latency ms, cost $, then one count per TOKEN_TYPES entry
+LEDGER_RECORD = struct.Struct("<dBId" + "I" * len(TOKEN_TYPES))
+LEDGER_DTYPE = np.dtype([("time", "<f8"), ("kind", "u1"), ("latency_ms", "<u4"), ("cost", "<f8")]
+                        + [(token_type, "<u4") for token_type in TOKEN_TYPES])
+assert LEDGER_DTYPE.itemsize == LEDGER_RECORD.size
+
+
+def empty_rollup() -> dict:
+    return {"cost": 0.0, "responses": 0, "latency_ms": 0,
+            "tokens": dict.fromkeys(TOKEN_TYPES, 0), "kinds": dict.fromkeys(RESPONSE_KINDS, 0)}
+
+
+class UsageLedger:
+    """
+    Append-only per-response usage records plus daily / monthly rollups.
+
+    rollup file: {"daily": {date: rollup}, "monthly": {YYYY-MM: rollup}, "folded": {date: records}}
+    where "folded" counts the ledger records already added to the rollups, per day file.
+    """
+
+    def __init__(self, ledger_dir: str = USAGE_LEDGER_DIR, rollup_path: str = USAGE_ROLLUP_FILE):
+        self.ledger_dir = ledger_dir
+        self.rollup_path = rollup_path
+        self.rollups = {"daily": {}, "monthly": {}, "folded": {}}
+        self.dirty = False
+        self.current_day = None
+        self.records_written = 0
+        self.write_errors = 0
+        self._load_rollups()
+        self._recover()
+
+    def _day_path(self, day: str) -> str:
+        return os.path.join(self.ledger_dir, day + ".bin")
+
+    def _load_rollups(self):
+        try:
+            with open(self.rollup_path) as f:
+                loaded = json.load(f)
+            for key in self.rollups:
+                self.rollups[key] = loaded.get(key, {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Usage rollup unreadable, starting fresh: {e}")
+
+    def _recover(self):
+        """ fold in records written after the last rollup save (a crash or kill since then) """
+        try:
+            days = {n[:-len(".bin")] for n in os.listdir(self.ledger_dir) if n.endswith(".bin")}
+        except FileNotFoundError:
+            days = set()
+        recovered = reset = 0
+        for day in sorted(days | set(self.rollups["folded"])):
+            records = self.load_day(day)
+            folded = self.rollups["folded"].get(day, 0)
+            if len(records) < folded:
+                # the RAM drive was wiped (a reboot) after the rollup saved - what's there now is all new;
+                # saved straight away, or a crash before the next save would skip records appended meanwhile
+                self.rollups["folded"][day] = folded = len(records)
+                self.dirty = True
+                reset += 1
+            for record in records[folded:]:
+                counts = {token_type: int(record[token_type]) for token_type in TOKEN_TYPES}
+                self._fold(day, RESPONSE_KINDS[record["kind"]] if record["kind"] < len(RESPONSE_KINDS) else RESPONSE_MAIN,
+                           counts, float(record["cost"]), int(record["latency_ms"]))
+                recovered += 1
+        if reset:
+            trace("main", f"usage ledger: {reset} day file(s) shorter than the rollup has seen, counting from their end")
+        if recovered:
+            trace("main", f"usage ledger: recovered {recovered} record(s) missing from the rollup")
+        if recovered or reset:
+            self.save()
+
+    def _fold(self, day: str, kind: str, counts: dict, cost: float, latency_ms: int, written: bool = True):
+        for period, key in (("daily", day), ("monthly", day[:7])):
+            rollup = self.rollups[period].setdefault(key, empty_rollup())
+            rollup["cost"] += cost
+            rollup["responses"] += 1
+            rollup["latency_ms"] += latency_ms
+            rollup["kinds"][kind] = rollup["kinds"].get(kind, 0) + 1
+            for token_type, count in counts.items():
+                rollup["tokens"][token_type] = rollup["tokens"].get(token_type, 0) + count
+        if written:
+            # "folded" counts records in the day file - one that never got there mustn't shift the count
+            self.rollups["folded"][day] = self.rollups["folded"].get(day, 0) + 1
+        self.dirty = True
+
+    def record(self, usage: dict, cost: float, kind: str = RESPONSE_MAIN, latency_ms: float = 0):
+        """ one response.done """
+        day = get_current_date_string()
+        if self.current_day != day:
+            if self.current_day is not None:
+                # the day rolled over mid-run: its rollup goes to disk now
+                self.save()
+                self.prune()
+            self.current_day = day
+            self._trim_torn_record(day)
+
+        counts = usage_token_counts(usage)
+        latency_ms = max(int(latency_ms), 0)
+        kind = kind if kind in RESPONSE_KINDS else RESPONSE_MAIN
+        written = False
+        try:
+            os.makedirs(self.ledger_dir, exist_ok=True)
+            with open(self._day_path(day), "ab") as f:
+                f.write(LEDGER_RECORD.pack(time.time(), RESPONSE_KINDS.index(kind), latency_ms, cost, *counts.values()))
+            self.records_written += 1
+            written = True
+        except Exception as e:
+            # the rollups still count it - only the per-response detail is lost
+            self.write_errors += 1
+            trace("main", f"usage ledger: write failed: {e}")
+        self._fold(day, kind, counts, cost, latency_ms, written)
+
+    def _trim_torn_record(self, day: str):
+        """ drop a partial record left by a crash so appends stay aligned """
+        try:
+            path = self._day_path(day)
+            size = os.path.getsize(path)
+            if size % LEDGER_RECORD.size:
+                os.truncate(path, size - size % LEDGER_RECORD.size)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            trace("main", f"usage ledger: could not trim {day}: {e}")
+
+    def save(self):
+        """ write the rollups to disk if anything changed (atomic replace) """
+        if not self.dirty:
+            return
+        try:
+            with open(self.rollup_path + ".tmp", "w") as f:
+                json.dump(self.rollups, f)
+            os.replace(self.rollup_path + ".tmp", self.rollup_path)
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Could not save usage rollup: {e}")
+
+    def prune(self, keep_days: int = USAGE_LEDGER_KEEP_DAYS):
+        """ drop old day files from the RAM drive (and their folded counts - they can't be replayed now) """
+        cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        for day in [d for d in self.rollups["folded"] if d < cutoff]:
+            try:
+                os.remove(self._day_path(day))
+            except FileNotFoundError:
+                pass
+            except Exception:
+                continue
+            del self.rollups["folded"][day]
+            self.dirty = True
+
+    def load_day(self, day: str) -> np.ndarray:
+        """ a day's records as a structured array (LEDGER_DTYPE) - columns are sliceable without a Python loop """
+        try:
+            with open(self._day_path(day), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return np.zeros(0, dtype=LEDGER_DTYPE)
+        # a record cut short by a crash is ignored
+        return np.frombuffer(data[:len(data) - len(data) % LEDGER_RECORD.size], dtype=LEDGER_DTYPE)
+
+    def daily(self, day: str = None) -> dict:
+        return self.rollups["daily"].get(day or get_current_date_string(), empty_rollup())
+
+    def monthly(self, month: str = None) -> dict:
+        return self.rollups["monthly"].get(month or get_current_date_string()[:7], empty_rollup())
+
+    def daily_cost(self, day: str = None) -> float:
+        return self.daily(day)["cost"]
+
+    def monthly_cost(self, month: str = None) -> float:
+        return self.monthly(month)["cost"]
+
+    def get_stats(self) -> dict:
+        """ today's and this month's rollups plus ledger write health """
+        return {
+            "today": self.daily(),
+            "month": self.monthly(),
+            "records_written": self.records_written,
+            "write_errors": self.write_errors,
+        }
+
+    def log_stats(self):
+        today, month = self.daily(), self.monthly()
+        trace("main",
+            f"usage: today ${today['cost']:.2f} over {today['responses']} responses {today['kinds']}, "
+            f"month ${month['cost']:.2f}, ledger records={self.records_written}"
+            + (f" ({self.write_errors} write errors)" if self.write_errors else "")
+        )
+
+
+def load_usage_rollups(rollup_path: str = USAGE_ROLLUP_FILE) -> dict:
+    """ read-only view of the saved rollups (for the web UI - never writes or recovers) """
+    try:
+        with open(rollup_path) as f:
+            return json.load(f)
+    except Exception:
+        return {"daily": {}, "monthly": {}, "folded": {}}
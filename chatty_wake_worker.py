@@ -0,0 +1,216 @@
+# Chatty Wake Worker
+# Finley 2025
+#
+# Runs VAD and wake word inference off the event loop.  The PortAudio callback writes
+# each mic frame into a preallocated numpy ring; a dedicated thread scores frames in
+# order and posts small WakeDecision records back to the loop.  The loop pulls the
+# audio out of the ring by sequence number only when it needs to forward it.
+#
+
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from chatty_config import AUDIO_BLOCKSIZE
+from chatty_debug import trace
+from chatty_dsp import FrameFeatureExtractor, FrameFeatures
+
+
+class WakeDecision:
+    """ Result of scoring one mic frame.  seq indexes the frame in the worker's ring. """
+    __slots__ = ("seq", "is_voice", "is_wake_word", "near_miss", "capture_time", "inference_ms", "features", "post_wake_samples",
+                 "tracking_started")
+
+    def __init__(self, seq: int, is_voice: bool, is_wake_word: bool, near_miss: bool, capture_time: float, inference_ms: float,
+                 features: Optional[FrameFeatures] = None, post_wake_samples: int = 0, tracking_started: bool = False):
+        self.seq = seq
+        self.is_voice = is_voice
+        self.is_wake_word = is_wake_word
+        self.near_miss = near_miss
+        self.capture_time = capture_time
+        self.inference_ms = inference_ms
+        self.features = features
+        self.post_wake_samples = post_wake_samples
+        self.tracking_started = tracking_started
+
+
+class WakeInferenceWorker:
+    """
+    Single-producer (PortAudio callback) / single-consumer (inference thread) frame ring
+    in front of a WakeWordDetector.
+
+    The onnx/tflite runtimes release the GIL while they run, so a thread gets the models
+    off the loop without the cost of shipping frames and model state to another process.
+    The detector is used under its lock for each frame, so a reset from the loop (a new session
+    borrowing the detector) waits for the frame in progress; otherwise the loop only toggles vad_only.
+    """
+    STATS_LOG_INTERVAL_SECONDS = 30
+
+    def __init__(self, detector, slots: int = 64, frame_samples: int = AUDIO_BLOCKSIZE):
+        """
+        Args:
+            detector: object with on_audio_buffer_in(audio, vad_only), near_miss_chirp and tracking_started flags,
+                      post_wake_samples (read when a frame is a wake word) and a lock guarding all of them
+            slots: ring capacity in frames (64 x 80ms ~ 5s of slack before frames are lost)
+            frame_samples: int16 samples per mic frame
+        """
+        self.detector = detector
+        self.slots = slots
+        self.frames = np.zeros((slots, frame_samples), dtype=np.int16)
+        self.capture_times = np.zeros(slots, dtype=np.float64)
+
+        # monotonic sequence numbers: write_seq is advanced only by the callback, read_seq only by the worker
+        self.write_seq = 0
+        self.read_seq = 0
+
+        # set from the loop: True once the mic is live to the assistant (skip the wake model)
+        self.vad_only = False
+
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._post: Optional[Callable[[WakeDecision], None]] = None
+
+        # the frame's levels are measured here (worker thread) and sent back with the decision
+        self._feature_extractor = FrameFeatureExtractor(frame_samples)
+
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames_scored = 0
+        self.frames_overrun = 0
+        self.inference_ms_total = 0.0
+        self.inference_ms_max = 0.0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.last_stats_log_time = time.monotonic()
+
+    def start(self, loop: asyncio.AbstractEventLoop, post: Callable[[WakeDecision], None]):
+        """ start scoring; post(decision) is called on the loop thread for every frame """
+        self._loop = loop
+        self._post = post
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="wake_inference", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.log_stats()
+
+    def submit(self, in_data: bytes, capture_time: Optional[float] = None):
+        """
+        PortAudio callback thread: copy the frame into the ring and wake the worker.  Never blocks on inference.
+        capture_time is the monotonic time of the frame's first sample (default: now).
+        """
+        slot = self.write_seq % self.slots
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        n = min(len(samples), self.frames.shape[1])
+        self.frames[slot, :n] = samples[:n]
+        self.frames[slot, n:] = 0
+        self.capture_times[slot] = time.monotonic() if capture_time is None else capture_time
+        with self._cond:
+            self.write_seq += 1
+            self._cond.notify()
+
+    def frame(self, seq: int) -> Optional[np.ndarray]:
+        """ loop thread: copy of frame seq, or None if the callback has already reused its slot """
+        if self.write_seq - seq >= self.slots:
+            return None
+        audio = self.frames[seq % self.slots].copy()
+        # the callback may have started refilling the slot while we copied
+        if self.write_seq - seq >= self.slots:
+            return None
+        return audio
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self.read_seq == self.write_seq and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                target = self.write_seq
+
+            # fell a full ring behind - skip to the newest frames rather than score stale audio
+            if target - self.read_seq >= self.slots:
+                skipped = target - self.read_seq - 1
+                self.frames_overrun += skipped
+                self.read_seq = target - 1
+
+            while self.read_seq < target:
+                self._score(self.read_seq)
+                self.read_seq += 1
+
+            now = time.monotonic()
+            if now - self.last_stats_log_time > self.STATS_LOG_INTERVAL_SECONDS:
+                self.last_stats_log_time = now
+                self.log_stats()
+
+    def _score(self, seq: int):
+        slot = seq % self.slots
+        audio = self._feature_extractor.attach(self.frames[slot].copy())
+        capture_time = self.capture_times[slot]
+
+        with self.detector.lock:
+            start = time.perf_counter()
+            try:
+                is_voice, is_wake_word = self.detector.on_audio_buffer_in(audio, vad_only=self.vad_only)
+            except Exception as e:
+                trace("wake", f"inference error: {e}")
+                is_voice, is_wake_word = False, False
+            inference_ms = (time.perf_counter() - start) * 1000.0
+
+            near_miss = self.detector.near_miss_chirp
+            self.detector.near_miss_chirp = False
+            tracking_started = self.detector.tracking_started
+            self.detector.tracking_started = False
+
+            post_wake_samples = self.detector.post_wake_samples if is_wake_word else 0
+
+        decision = WakeDecision(seq, is_voice, is_wake_word, near_miss, capture_time, inference_ms, audio.features, post_wake_samples,
+                                tracking_started)
+        try:
+            self._loop.call_soon_threadsafe(self._post, decision)
+        except RuntimeError:
+            # loop closed underneath us during shutdown
+            self._stopping = True
+            return
+
+        latency_ms = (time.monotonic() - capture_time) * 1000.0
+        self.frames_scored += 1
+        self.inference_ms_total += inference_ms
+        self.latency_ms_total += latency_ms
+        if inference_ms > self.inference_ms_max:
+            self.inference_ms_max = inference_ms
+        if latency_ms > self.latency_ms_max:
+            self.latency_ms_max = latency_ms
+
+    def get_stats(self) -> dict:
+        """ frames scored/lost and per-frame inference and capture-to-decision latency (ms) """
+        scored = max(self.frames_scored, 1)
+        return {
+            "frames": self.frames_scored,
+            "overrun": self.frames_overrun,
+            "backlog": self.write_seq - self.read_seq,
+            "inference_ms_avg": self.inference_ms_total / scored,
+            "inference_ms_max": self.inference_ms_max,
+            "latency_ms_avg": self.latency_ms_total / scored,
+            "latency_ms_max": self.latency_ms_max,
+        }
+
+    def log_stats(self):
+        s = self.get_stats()
+        trace("wake",
+            f"worker: frames={s['frames']}, overrun={s['overrun']}, backlog={s['backlog']}, "
+            f"inference={s['inference_ms_avg']:.1f}/{s['inference_ms_max']:.1f}ms, "
+            f"latency={s['latency_ms_avg']:.1f}/{s['latency_ms_max']:.1f}ms (avg/max)"
+        )
@@ -11,8 +11,10 @@ import re
 import random
 import asyncio
 from datetime import datetime
-from chatty_config import ConfigManager, default_config, CONTACT_TYPE_PRIMARY_SUPERVISOR
+from chatty_config import ConfigManager, default_config, CONTACT_TYPE_PRIMARY_SUPERVISOR, get_current_date_string
 from chatty_secrets import SecretsManager
+from chatty_metrics import load_session_metrics
+from chatty_usage_ledger import load_usage_rollups
 from tools.news_service import RSS_NEWS_FEEDS
 import pytz
 import subprocess
@@ -957,7 +959,7 @@ else:  # we have wifi and authentication!
             "Auto Summarize After Token Usage",
             min_value=10000, max_value=500000, step=10000,
             value=int(st.session_state.config_manager.get_config('AUTO_SUMMARIZE_MAX_TOKENS') or st.session_state.config_manager.default_config.get('AUTO_SUMMARIZE_MAX_TOKENS', 50000)),
-            help="Automatically summarize conversations when estimated token usage exceeds this value. Helps control costs by keeping context windows manageable. Default: 50,000 tokens (~$0.50-1.00 depending on model).",
+            help="Automatically summarize conversations when the context the model re-reads each turn grows past this many tokens. Helps control costs by keeping context windows manageable. Default: 50,000 tokens.",
             key="auto_summarize_max_tokens",
             on_change=lambda: lock_section() if not st.session_state.section_locked else None
         )
@@ -1443,6 +1445,31 @@ else:  # we have wifi and authentication!
                         st.error(f"❌ Error saving AI settings: {message}")
                 else:
                     st.error("❌ Please fill in all required fields")
+
+        # running totals published by the assistant process as the conversation goes
+        st.subheader("📊 Current Conversation")
+        metrics = load_session_metrics()
+        if not metrics or not metrics.get("responses"):
+            st.info("No conversation in progress.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Cost", f"${metrics['cost']:.2f}")
+            col2.metric("Tokens", f"{metrics['total_tokens']:,}")
+            col3.metric("Messages", metrics["message_count"])
+            st.caption(f"Started {datetime.fromtimestamp(metrics['started']).strftime('%H:%M:%S')} · "
+                       f"{metrics['responses']} responses over {metrics['realtime_sessions']} realtime session(s)")
+            with st.expander("Details"):
+                st.json(metrics)
+
+        # rollups as of the end of the last conversation
+        rollups = load_usage_rollups()
+        today = get_current_date_string()
+        today_usage = rollups["daily"].get(today)
+        month_usage = rollups["monthly"].get(today[:7])
+        if today_usage or month_usage:
+            col1, col2 = st.columns(2)
+            col1.metric("Cost Today", f"${(today_usage or {}).get('cost', 0):.2f}", help=f"{(today_usage or {}).get('responses', 0)} responses")
+            col2.metric("Cost This Month", f"${(month_usage or {}).get('cost', 0):.2f}", help=f"{(month_usage or {}).get('responses', 0)} responses")
         
         st.markdown("</div>", unsafe_allow_html=True)
     
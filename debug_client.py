@@ -13,6 +13,7 @@ Examples:
     python debug_client.py 192.168.1.100 --filter mic
     python debug_client.py 192.168.1.100 --filter wake
     python debug_client.py 192.168.1.100 -p 9999 -f ws
+    python debug_client.py 192.168.1.100 --stats
 """
 
 import argparse
@@ -73,6 +74,7 @@ Examples:
   %(prog)s 192.168.1.100 -f mic       # Filter to mic component only
   %(prog)s 192.168.1.100 -f wake      # Filter to wake word events
   %(prog)s pi.local -p 9999           # Use hostname and custom port
+  %(prog)s 192.168.1.100 --stats      # Print conversation / job stats and exit
 
 Alternative (no dependencies):
   nc 192.168.1.100 9999 | grep '"c":"mic"'
@@ -87,9 +89,15 @@ Alternative (no dependencies):
                         help="Disable colored output")
     parser.add_argument("-r", "--reconnect", action="store_true",
                         help="Auto-reconnect on disconnect")
+    parser.add_argument("-s", "--stats", action="store_true",
+                        help="Print a stats snapshot (conversation metrics, job queue) and exit")
     
     args = parser.parse_args()
     use_color = not args.no_color and sys.stdout.isatty()
+
+    if args.stats:
+        print(json.dumps(fetch_stats(args.host, args.port), indent=2))
+        return
     
     while True:
         try:
@@ -113,6 +121,23 @@ Alternative (no dependencies):
             time.sleep(5)
 
 
+def fetch_stats(host: str, port: int) -> dict:
+    """Ask the server for its stats snapshot (the buffered log replay is skipped)."""
+    with socket.create_connection((host, port), timeout=10.0) as sock:
+        sock.sendall(b"stats\n")
+        stream = sock.makefile("r", encoding="utf-8", errors="replace")
+        for line in stream:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" in entry:
+                raise Exception(entry["error"])
+            if "stats" in entry:
+                return entry["stats"]
+    raise Exception("server closed connection without stats")
+
+
 def connect_and_stream(host: str, port: int, component_filter: str, use_color: bool):
     """Connect to server and stream logs."""
     print(f"Connecting to {host}:{port}...")
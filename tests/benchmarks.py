@@ -0,0 +1,803 @@
+#!/usr/bin/env python3
+"""
+Audio Pipeline Benchmarks
+
+Micro-benchmarks for the hot paths of the live audio pipeline.  Each benchmark
+compares the current implementation with the one it replaced, so run them on
+the target hardware (a Pi, not just the dev Mac) to see the real gain.
+
+Usage:
+    python tests/benchmarks.py                    # Run all benchmarks
+    python tests/benchmarks.py resample           # Run a specific benchmark
+    python tests/benchmarks.py --frames 5000      # More iterations per benchmark
+    python tests/benchmarks.py --list             # List available benchmarks
+    python tests/benchmarks.py event_parse --events capture.jsonl   # Parse a captured downlink
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# benchmarks exercise the real modules in the repo root
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chatty_config import AUDIO_BLOCKSIZE
+from stand_ins import StandInState
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def make_speech_like_frames(num_frames: int, frame_samples: int = AUDIO_BLOCKSIZE, seed: int = 0) -> list:
+    """Generate int16 frames with a speech-like level envelope (quiet gaps and louder bursts)."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(num_frames):
+        level = 2000.0 if (i // 10) % 2 else 150.0
+        frames.append(np.clip(rng.standard_normal(frame_samples) * level, -32768, 32767).astype(np.int16))
+    return frames
+
+
+def time_per_frame(fn, frames: list) -> float:
+    """Run fn over every frame and return seconds per frame."""
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    return (time.perf_counter() - start) / len(frames)
+
+
+def report(name: str, seconds_per_frame: float, baseline: float = None):
+    """Print one result line: frames/sec and microseconds per frame (plus speedup vs baseline)."""
+    line = f"  {name:<32} {1.0 / seconds_per_frame:>12,.0f} frames/s {seconds_per_frame * 1e6:>10.1f} us/frame"
+    if baseline:
+        line += f"   x{baseline / seconds_per_frame:.1f}"
+    print(line)
+
+
+# ============================================================================
+# Benchmarks
+# ============================================================================
+
+def bench_resample(args):
+    """16kHz -> 24kHz uplink resampling: per-sample loop vs vectorized polyphase."""
+    from chatty_dsp import upsample_audio_efficient, PolyphaseResampler
+    from chatty_config import SAMPLE_RATE_HZ, NATIVE_OAI_SAMPLE_RATE_HZ
+
+    frames = make_speech_like_frames(args.frames)
+    resampler = PolyphaseResampler(up=NATIVE_OAI_SAMPLE_RATE_HZ, down=SAMPLE_RATE_HZ)
+
+    print(f"resample: {len(frames)} frames of {AUDIO_BLOCKSIZE} samples")
+    baseline = time_per_frame(lambda f: upsample_audio_efficient(f, normalize=False), frames)
+    report("upsample_audio_efficient", baseline)
+    report("PolyphaseResampler.process", time_per_frame(resampler.process, frames), baseline)
+    report("PolyphaseResampler + tobytes", time_per_frame(lambda f: resampler.process(f).tobytes(), frames), baseline)
+
+
+async def legacy_wait_and_dispatch(manager):
+    """The pre-mailbox AsyncManager.wait_and_dispatch: two tasks per call, cancel the loser."""
+    import asyncio
+    command_task = asyncio.create_task(manager.command_q.get())
+    input_task = asyncio.create_task(manager.input_q.get())
+    done, pending = await asyncio.wait([command_task, input_task], return_when=asyncio.FIRST_COMPLETED, timeout=1)
+    results = []
+    for task in done:
+        results.append(("command" if task is command_task else "input", task.result()))
+    for task in pending:
+        task.cancel()
+    return results
+
+
+def bench_mailbox(args):
+    """Event-loop overhead per frame: task-per-call wait_and_dispatch vs AsyncMailbox."""
+    import asyncio
+    from chatty_async_manager import AsyncManager
+
+    async def noop(manager):
+        pass
+
+    async def run(dispatch) -> tuple[float, float]:
+        loop = asyncio.get_running_loop()
+        tasks_created = 0
+        default_factory = loop.get_task_factory()
+
+        def counting_factory(loop, coro, **kwargs):
+            nonlocal tasks_created
+            tasks_created += 1
+            return default_factory(loop, coro, **kwargs) if default_factory else asyncio.Task(coro, loop=loop, **kwargs)
+        loop.set_task_factory(counting_factory)
+
+        manager = AsyncManager("bench", noop)
+        frame = b"\0" * (AUDIO_BLOCKSIZE * 2)
+
+        async def producer():
+            # one frame per loop iteration, like the PortAudio callback handing frames to the loop
+            for _ in range(args.frames):
+                await manager.input_q.put(frame)
+                await asyncio.sleep(0)
+
+        producer_task = asyncio.create_task(producer())
+        tasks_created = 0
+        start = time.perf_counter()
+        received = 0
+        while received < args.frames:
+            received += len(await dispatch(manager))
+        elapsed = time.perf_counter() - start
+        await producer_task
+        loop.set_task_factory(default_factory)
+        return elapsed / args.frames, tasks_created / args.frames
+
+    print(f"mailbox: {args.frames} frames through one manager input queue")
+    baseline, legacy_tasks = asyncio.run(run(legacy_wait_and_dispatch))
+    report("legacy wait_and_dispatch", baseline)
+    print(f"  {'':<32} {legacy_tasks:>12.1f} tasks/frame")
+    per_frame, mailbox_tasks = asyncio.run(run(lambda m: m.wait_and_dispatch()))
+    report("AsyncMailbox wait_and_dispatch", per_frame, baseline)
+    print(f"  {'':<32} {mailbox_tasks:>12.1f} tasks/frame")
+
+
+def bench_features(args):
+    """Per-frame level measurements: separate converted copies per consumer vs one FrameFeatureExtractor pass."""
+    from chatty_dsp import FrameFeatureExtractor, CLIP_THRESHOLD
+
+    frames = make_speech_like_frames(args.frames)
+    extractor = FrameFeatureExtractor()
+
+    def separate_passes(audio):
+        # detector RMS, noise gate, normalizer and quality check each convert and scan the frame
+        np.sqrt(np.mean(audio.astype(np.float64) ** 2))
+        np.mean(np.abs(audio.astype(np.int32)))
+        np.mean(np.abs(audio.astype(np.int32)))
+        max_val = np.max(np.abs(audio))
+        np.sum(np.abs(audio) > CLIP_THRESHOLD)
+        np.mean(np.abs(audio.astype(np.int32)))
+        return max_val
+
+    print(f"features: {len(frames)} frames of {AUDIO_BLOCKSIZE} samples")
+    baseline = time_per_frame(separate_passes, frames)
+    report("separate passes", baseline)
+    report("FrameFeatureExtractor.attach", time_per_frame(extractor.attach, frames), baseline)
+
+
+def bench_noise(args):
+    """Idle-listening auto-noise injection: per-frame float64 randn vs pre-generated NoiseBank."""
+    from chatty_dsp import NoiseBank, FrameFeatureExtractor
+
+    # asleep in a quiet room: low-level frames with ~85 RMS injected (the AutoNoiseManager cap).
+    # frames carry their features as they do coming from the mic
+    extractor = FrameFeatureExtractor()
+    frames = [extractor.attach(f // 10) for f in make_speech_like_frames(args.frames)]
+    level = 85.0
+    bank = NoiseBank()
+
+    def randn_injection(audio):
+        noise = np.random.randn(len(audio)) * level
+        return np.clip(audio.astype(np.float64) + noise, -32768, 32767).astype(np.int16)
+
+    print(f"noise: {len(frames)} idle frames of {AUDIO_BLOCKSIZE} samples, level {level:.0f} RMS")
+    baseline = time_per_frame(randn_injection, frames)
+    report("np.random.randn injection", baseline)
+    report("NoiseBank.inject", time_per_frame(lambda f: bank.inject(f, level), frames), baseline)
+    injected = np.concatenate([bank.inject(f, level) - f for f in frames[:200]])
+    print(f"  injected noise RMS {np.sqrt(np.mean(injected.astype(np.float64) ** 2)):.1f} (target {level:.0f})")
+
+
+def bench_history(args):
+    """Wake cluster evaluation: dict deque rebuilt into lists vs FrameHistoryRing queries."""
+    from collections import deque
+    from chatty_dsp import FrameHistoryRing
+
+    rng = np.random.default_rng(0)
+    vad_threshold, entry_threshold, cluster = 0.3, 0.15, 8
+    records = [(float(i) * 0.08, float(v), float(w), 500.0, 80.0, False)
+               for i, (v, w) in enumerate(zip(rng.random(args.frames), rng.random(args.frames) * 0.4))]
+
+    frame_history = deque(maxlen=62)
+    ring = FrameHistoryRing(62)
+
+    def legacy(record):
+        t, vad, wake, rms, noise, tracking = record
+        frame_history.append({'t': t, 'vad': vad, 'wake': wake, 'rms': rms, 'noise': noise, 'tracking': tracking})
+        history = list(frame_history)
+        scores = [f['wake'] for f in history[-cluster:]]
+        vads = [f['vad'] for f in history[-cluster:]]
+        run = 0
+        for f in reversed(history[:-cluster]):
+            if f['vad'] < vad_threshold:
+                break
+            run += 1
+        return (max(scores), sum(1 for s in scores if s >= entry_threshold),
+                sum(1 for v in vads if v > vad_threshold), run)
+
+    def queries(record):
+        ring.append(*record)
+        return (ring.window_max('wake', cluster), ring.count_above('wake', entry_threshold, cluster, or_equal=True),
+                ring.count_above('vad', vad_threshold, cluster), ring.run_length_before('vad', vad_threshold, skip=cluster))
+
+    print(f"history: {len(records)} frames, {cluster}-frame cluster evaluated against a 62-frame history")
+    baseline = time_per_frame(legacy, records)
+    report("deque of dicts + lists", baseline)
+    report("FrameHistoryRing queries", time_per_frame(queries, records), baseline)
+    frame_history.clear()
+    ring.clear()
+    mismatches = sum(1 for r in records[:200]
+                     if not np.allclose(legacy(r), queries(r), atol=1e-6))
+    print(f"  mismatched evaluations: {mismatches}")
+
+
+def bench_playback(args):
+    """Speaker callback: queue + concatenate/slice/pad + float volume vs PcmRingBuffer + fixed-point PlaybackGain."""
+    import queue
+    from chatty_config import NATIVE_OAI_SAMPLE_RATE_HZ, CHUNK_DURATION_MS
+    from chatty_dsp import PcmRingBuffer, PlaybackGain
+
+    chunk = int(NATIVE_OAI_SAMPLE_RATE_HZ * CHUNK_DURATION_MS / 1000)
+    rng = np.random.default_rng(0)
+    # assistant deltas arrive in uneven sizes that don't line up with the callback chunk
+    deltas = [rng.integers(-3000, 3000, int(n), dtype=np.int16) for n in rng.integers(chunk // 2, chunk * 3, args.frames)]
+    calls = sum(len(d) for d in deltas) // chunk
+    volume = 0.7
+
+    def legacy():
+        q = queue.Queue()
+        for d in deltas:
+            q.put(d)
+        unused = None
+        for _ in range(calls):
+            buffers, available = ([unused], len(unused)) if unused is not None else ([], 0)
+            unused = None
+            while available < chunk and not q.empty():
+                b = q.get_nowait()
+                buffers.append(b)
+                available += len(b)
+            if available > chunk:
+                trim = available - chunk
+                unused = buffers[-1][-trim:]
+                buffers[-1] = buffers[-1][:-trim]
+                available = chunk
+            audio = np.concatenate(buffers) if buffers else np.array([], dtype=np.int16)
+            if available < chunk:
+                audio = np.concatenate([audio, np.zeros(chunk - available, dtype=np.int16)])
+            (audio * volume).astype(np.int16).tobytes()
+
+    def ring():
+        playback = PcmRingBuffer(sum(len(d) for d in deltas))
+        for d in deltas:
+            playback.write(d)
+        out = np.zeros(chunk, dtype=np.int16)
+        gain = PlaybackGain(volume * 100, max_frame_samples=chunk)
+        for _ in range(calls):
+            playback.read_into(out)
+            gain.apply(out)
+            out.tobytes()
+
+    print(f"playback: {len(deltas)} deltas, {calls} callbacks of {chunk} samples (writes included)")
+    start = time.perf_counter()
+    legacy()
+    baseline = (time.perf_counter() - start) / calls
+    report("queue + concatenate", baseline)
+    start = time.perf_counter()
+    ring()
+    report("PcmRingBuffer + PlaybackGain", (time.perf_counter() - start) / calls, baseline)
+
+
+class FakeWebSocket:
+    """Stands in for the realtime websocket: recv() returns queued messages."""
+    def __init__(self):
+        import asyncio
+        self.incoming = asyncio.Queue()
+
+    async def recv(self):
+        return await self.incoming.get()
+
+
+async def legacy_grand_central_dispatch(ws, managers):
+    """The pre-dispatcher grand_central_dispatch: a recv() task plus one event_q.get() task per manager, every call."""
+    import asyncio
+    websocket_task = asyncio.create_task(ws.recv())
+    manager_tasks = {name: asyncio.create_task(m.event_q.get()) for name, m in managers.items()}
+    done, pending = await asyncio.wait([websocket_task] + list(manager_tasks.values()), timeout=10, return_when=asyncio.FIRST_COMPLETED)
+    results = []
+    for task in done:
+        if task is websocket_task:
+            results.append(("assistant", task.result()))
+        else:
+            results.extend((name, task.result()) for name, t in manager_tasks.items() if t is task)
+    for task in pending:
+        task.cancel()
+    return results
+
+
+def bench_dispatch(args):
+    """Downlink event dispatch: per-call recv/get tasks vs persistent EventDispatcher."""
+    import asyncio
+    from chatty_async_manager import AsyncManager, EventDispatcher
+
+    async def noop(manager):
+        pass
+
+    message = '{"type":"response.output_audio.delta","delta":"' + "A" * 1600 + '"}'
+
+    async def run(use_dispatcher: bool) -> float:
+        managers = {name: AsyncManager(name, noop) for name in ("mic", "assistant", "speaker")}
+        ws = FakeWebSocket()
+
+        async def producer():
+            # audio deltas arriving off the network, one per loop iteration
+            for _ in range(args.frames):
+                ws.incoming.put_nowait(message)
+                await asyncio.sleep(0)
+
+        dispatcher = EventDispatcher(managers) if use_dispatcher else None
+        if dispatcher:
+            dispatcher.attach_reader(ws)
+
+        producer_task = asyncio.create_task(producer())
+        start = time.perf_counter()
+        received = 0
+        while received < args.frames:
+            if dispatcher:
+                received += 1 if await dispatcher.get(timeout=10) else 0
+            else:
+                received += len(await legacy_grand_central_dispatch(ws, managers))
+        elapsed = time.perf_counter() - start
+        await producer_task
+        if dispatcher:
+            await dispatcher.close()
+        return elapsed / args.frames
+
+    print(f"dispatch: {args.frames} websocket messages with 3 idle manager event queues")
+    baseline = asyncio.run(run(False))
+    report("legacy grand_central_dispatch", baseline)
+    report("EventDispatcher.get", asyncio.run(run(True)), baseline)
+
+
+def bench_uplink(args):
+    """Mic uplink encoding: dict + b64 str + json.dumps per chunk vs UplinkEncoder windows (80/160/240ms)."""
+    import base64
+    import json
+    from chatty_send_audio import UplinkEncoder
+    from chatty_config import SAMPLE_RATE_HZ, NATIVE_OAI_SAMPLE_RATE_HZ
+
+    chunks = [np.resize(f, AUDIO_BLOCKSIZE * NATIVE_OAI_SAMPLE_RATE_HZ // SAMPLE_RATE_HZ) for f in make_speech_like_frames(args.frames)]
+    seconds = len(chunks) * AUDIO_BLOCKSIZE / SAMPLE_RATE_HZ
+    print(f"uplink: {len(chunks)} chunks ({seconds:.0f}s of audio) - encode cost per second of audio")
+
+    def line(name, elapsed, frames, wire_bytes, baseline=None):
+        text = (f"  {name:<32} {elapsed / seconds * 1e3:>8.3f} ms/s {frames / seconds:>6.1f} frames/s "
+                f"{wire_bytes / seconds / 1024:>6.1f} KB/s {elapsed / frames * 1e6:>8.1f} us/frame")
+        if baseline:
+            text += f"   x{baseline / elapsed:.1f}"
+        print(text)
+
+    start = time.perf_counter()
+    wire_bytes = 0
+    for chunk in chunks:
+        wire_bytes += len(json.dumps({"type": "input_audio_buffer.append", "audio": base64.b64encode(chunk.tobytes()).decode()}))
+    baseline = time.perf_counter() - start
+    line("dict + json.dumps per chunk", baseline, len(chunks), wire_bytes)
+
+    for window_ms in (80, 160, 240):
+        encoder = UplinkEncoder(window_ms=window_ms)
+        start = time.perf_counter()
+        for chunk in chunks:
+            encoder.append(chunk)
+            if encoder.ready():
+                encoder.frame()
+        elapsed = time.perf_counter() - start
+        line(f"UplinkEncoder {window_ms}ms", elapsed, encoder.frames_sent, encoder.wire_bytes_sent, baseline)
+
+
+def bench_wire_format(args):
+    """Realtime wire codec: 24kHz PCM vs 8kHz G.711 mu-law - bandwidth and CPU per second of audio, both directions."""
+    import binascii
+    from chatty_send_audio import UplinkEncoder, PCMU_DECIMATOR_TAPS
+    from chatty_dsp import PolyphaseResampler, mulaw_encode, mulaw_decode
+    from chatty_config import SAMPLE_RATE_HZ, NATIVE_OAI_SAMPLE_RATE_HZ, PCMU_SAMPLE_RATE_HZ
+
+    frames = make_speech_like_frames(args.frames)
+    seconds = len(frames) * AUDIO_BLOCKSIZE / SAMPLE_RATE_HZ
+    print(f"wire_format: {len(frames)} mic frames ({seconds:.0f}s of audio) - per second of audio")
+
+    def uplink(pcmu: bool):
+        """mic frame -> resample -> (mu-law) -> append frame; returns (seconds, wire bytes, downlink deltas)"""
+        resampler = (PolyphaseResampler(up=PCMU_SAMPLE_RATE_HZ, down=SAMPLE_RATE_HZ, taps_per_phase=PCMU_DECIMATOR_TAPS) if pcmu
+                     else PolyphaseResampler(up=NATIVE_OAI_SAMPLE_RATE_HZ, down=SAMPLE_RATE_HZ))
+        encoder = UplinkEncoder(window_ms=160, sample_rate=PCMU_SAMPLE_RATE_HZ if pcmu else NATIVE_OAI_SAMPLE_RATE_HZ,
+                                sample_bytes=1 if pcmu else 2)
+        deltas = []
+        start = time.perf_counter()
+        for frame in frames:
+            audio = resampler.process(frame)
+            encoder.append(mulaw_encode(audio) if pcmu else audio)
+            if encoder.ready():
+                deltas.append(bytes(encoder.frame()[len(encoder.ENVELOPE_PREFIX):-len(encoder.ENVELOPE_SUFFIX)]))
+        return time.perf_counter() - start, encoder.wire_bytes_sent, deltas
+
+    def downlink(pcmu: bool, deltas):
+        """base64 delta -> (mu-law decode -> 8k->24k) -> int16 at the speaker rate"""
+        upsampler = PolyphaseResampler(up=NATIVE_OAI_SAMPLE_RATE_HZ, down=PCMU_SAMPLE_RATE_HZ)
+        start = time.perf_counter()
+        for delta in deltas:
+            raw = binascii.a2b_base64(delta)
+            if pcmu:
+                upsampler.process(mulaw_decode(raw))
+            else:
+                np.frombuffer(raw, dtype=np.int16)
+        return time.perf_counter() - start
+
+    for name, pcmu in (("pcm 24kHz", False), ("pcmu 8kHz", True)):
+        up_seconds, wire_bytes, deltas = uplink(pcmu)
+        down_seconds = downlink(pcmu, deltas)
+        print(f"  {name:<12} {wire_bytes / seconds / 1024:>6.1f} KB/s on the wire each way   "
+              f"uplink {up_seconds / seconds * 1e3:>6.3f} ms/s   downlink {down_seconds / seconds * 1e3:>6.3f} ms/s")
+
+
+def make_realtime_event_stream(seconds: float, delta_ms: int = 100, seed: int = 0) -> list:
+    """A synthetic downlink for one spoken response: audio deltas interleaved with transcript deltas."""
+    import base64
+    import json
+    from chatty_config import NATIVE_OAI_SAMPLE_RATE_HZ
+
+    rng = np.random.default_rng(seed)
+    ids = {"event_id": "event_CYV0e9zSLpJxgCmPdDYyB", "response_id": "resp_CYV0dXQ7hNnDm6yY3pQ2c", "item_id": "item_CYV0dYpbVzDkmy2bbXcKk"}
+    delta_samples = NATIVE_OAI_SAMPLE_RATE_HZ * delta_ms // 1000
+    events = [json.dumps({"type": "response.created", **ids, "response": {"object": "realtime.response", "status": "in_progress"}})]
+    for i in range(int(seconds * 1000 / delta_ms)):
+        pcm = (rng.standard_normal(delta_samples) * 2000).astype(np.int16).tobytes()
+        events.append(json.dumps({"type": "response.output_audio.delta", **ids, "output_index": 0, "content_index": 0,
+                                  "delta": base64.b64encode(pcm).decode("ascii")}))
+        if i % 3 == 0:
+            events.append(json.dumps({"type": "response.output_audio_transcript.delta", **ids, "output_index": 0,
+                                      "content_index": 0, "delta": " some words"}))
+    events.append(json.dumps({"type": "response.output_audio.done", **ids, "output_index": 0, "content_index": 0}))
+    events.append(json.dumps({"type": "response.done", **ids, "response": {"object": "realtime.response", "status": "completed",
+                                                                           "usage": {"total_tokens": 1234}}}))
+    return events
+
+
+def bench_event_parse(args):
+    """Downlink event parsing: json.loads + base64 per event vs prefix sniff / orjson decoder."""
+    import base64
+    import json
+    from chatty_config import NATIVE_OAI_SAMPLE_RATE_HZ
+    from chatty_event_decoder import AUDIO_DELTA_EVENT, ORJSON_AVAILABLE, parse_event, sniff_event_type, decode_audio_delta
+
+    if args.events:
+        # a captured stream: one raw websocket message per line
+        events = [line.rstrip("\n") for line in open(args.events) if line.strip()]
+    else:
+        events = make_realtime_event_stream(seconds=10)
+    handled = {"response.output_audio.done", "error", "response.done", "response.output_audio_transcript.done",
+               "response.function_call_arguments.done", "input_audio_buffer.speech_started", "input_audio_buffer.committed"}
+
+    def legacy():
+        pcm_bytes = 0
+        for event_raw in events:
+            event = json.loads(event_raw)
+            if event["type"] == AUDIO_DELTA_EVENT:
+                pcm_bytes += len(base64.b64decode(event["delta"]))
+            elif event["type"] not in handled and ("error" in event_raw or "invalid" in event_raw):
+                pass
+        return pcm_bytes
+
+    def decoder():
+        pcm_bytes = 0
+        for event_raw in events:
+            etype = sniff_event_type(event_raw)
+            if etype == AUDIO_DELTA_EVENT:
+                pcm_bytes += len(decode_audio_delta(event_raw)[1])
+            elif etype is None or etype in handled:
+                parse_event(event_raw)
+            elif '"error"' in event_raw or "invalid" in event_raw:
+                pass
+        return pcm_bytes
+
+    speech_seconds = legacy() / 2 / NATIVE_OAI_SAMPLE_RATE_HZ
+    repeats = max(1, args.frames // 100)
+    print(f"event_parse: {len(events)} events, {speech_seconds:.1f}s of speech, x{repeats} "
+          f"({'orjson' if ORJSON_AVAILABLE else 'json'} backend) - cost per second of speech")
+
+    def cost_per_speech_second(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats / speech_seconds
+
+    baseline = cost_per_speech_second(legacy)
+    print(f"  {'json.loads + b64decode':<32} {baseline * 1e3:>10.3f} ms/s of speech")
+    current = cost_per_speech_second(decoder)
+    print(f"  {'chatty_event_decoder':<32} {current * 1e3:>10.3f} ms/s of speech   x{baseline / current:.1f}")
+
+
+class StandInWakeDetector:
+    """Stands in for WakeWordDetector: fixed-cost inference that releases the GIL like onnxruntime/tflite."""
+    def __init__(self, inference_seconds: float):
+        self.inference_seconds = inference_seconds
+        self.near_miss_chirp = False
+        self.tracking_started = False
+        self.lock = threading.RLock()
+
+    def on_audio_buffer_in(self, audio, vad_only=False):
+        time.sleep(self.inference_seconds)
+        return (bool(np.abs(audio).mean() > 500), False)
+
+
+def bench_wake_worker(args):
+    """Event-loop lag while scoring mic frames: inline inference vs WakeInferenceWorker thread."""
+    import asyncio
+    import threading
+    from chatty_async_manager import AsyncManager
+    from chatty_wake_worker import WakeInferenceWorker, WakeDecision
+
+    # real time pacing, so keep the run short; frames arrive 4x faster than the 80ms mic
+    num_frames = min(args.frames, 200)
+    frame_interval, inference_seconds, tick = 0.020, 0.008, 0.001
+    frames = [f.tobytes() for f in make_speech_like_frames(num_frames)]
+
+    async def noop(manager):
+        pass
+
+    async def run(use_worker: bool) -> tuple[list, list]:
+        loop = asyncio.get_running_loop()
+        manager = AsyncManager("mic", noop)
+        detector = StandInWakeDetector(inference_seconds)
+        worker = WakeInferenceWorker(detector) if use_worker else None
+        if worker:
+            worker.start(loop, manager.input_q.put_nowait)
+
+        def portaudio():
+            # the PortAudio callback thread
+            for frame in frames:
+                if worker:
+                    worker.submit(frame)
+                else:
+                    loop.call_soon_threadsafe(manager.input_q.put_nowait, (time.monotonic(), frame))
+                time.sleep(frame_interval)
+
+        lags, latencies = [], []
+        done = False
+
+        async def ticker():
+            # anything else on the loop (websocket, speaker): how late does a 1ms sleep wake up?
+            while not done:
+                start = time.perf_counter()
+                await asyncio.sleep(tick)
+                lags.append(time.perf_counter() - start - tick)
+
+        ticker_task = asyncio.create_task(ticker())
+        threading.Thread(target=portaudio, daemon=True).start()
+        for _ in range(num_frames):
+            _, event = (await manager.wait_and_dispatch(timeout=5))[0]
+            if isinstance(event, WakeDecision):
+                worker.frame(event.seq)
+                capture_time = event.capture_time
+            else:
+                capture_time, frame = event
+                detector.on_audio_buffer_in(np.frombuffer(frame, dtype=np.int16))
+            latencies.append(time.monotonic() - capture_time)
+        done = True
+        await ticker_task
+        if worker:
+            worker.stop()
+        return lags, latencies
+
+    def show(name, lags, latencies):
+        lags_ms, latency_ms = np.array(lags) * 1000, np.array(latencies) * 1000
+        print(f"  {name:<10} loop lag avg {lags_ms.mean():5.2f}  p99 {np.percentile(lags_ms, 99):5.2f}  max {lags_ms.max():5.2f} ms"
+              f"   frame latency avg {latency_ms.mean():5.2f}  max {latency_ms.max():5.2f} ms")
+
+    print(f"wake_worker: {num_frames} frames every {frame_interval*1000:.0f}ms, {inference_seconds*1000:.0f}ms stand-in inference")
+    show("inline", *asyncio.run(run(False)))
+    show("worker", *asyncio.run(run(True)))
+
+
+class StandInRealtimeServer:
+    """
+    Local stand-in for a realtime session's server side: a websocket whose send() takes the client's
+    real messages, keeps the conversation items, and prices each response.create by what it would make
+    the model read - the session instructions plus every item, or only the items it references.
+
+    Token rates follow the realtime docs (input audio ~10 tokens/s, output audio ~20 tokens/s, text ~4
+    chars/token).  Server time is a model, not a measurement: a fixed first-token overhead, prefill per
+    input token and decode per output token - tune the PREFILL/DECODE constants to match a capture.
+    """
+    INPUT_AUDIO_TOKENS_PER_SECOND = 10
+    OUTPUT_AUDIO_TOKENS_PER_SECOND = 20
+    CHARS_PER_TEXT_TOKEN = 4
+    FIRST_TOKEN_SECONDS = 0.150
+    PREFILL_SECONDS_PER_TOKEN = 0.00005
+    DECODE_SECONDS_PER_TOKEN = 0.010
+
+    def __init__(self, instructions_tokens: int):
+        self.instructions_tokens = instructions_tokens
+        self.items = {}
+        self.responses = []
+
+    def text_tokens(self, text: str) -> int:
+        return max(1, len(text) // self.CHARS_PER_TEXT_TOKEN)
+
+    def add_user_audio(self, item_id: str, seconds: float):
+        self.items[item_id] = ("audio", int(seconds * self.INPUT_AUDIO_TOKENS_PER_SECOND))
+
+    def add_assistant_reply(self, item_id: str, seconds: float, transcript: str):
+        # replayed as input on later turns: its audio plus its transcript text
+        self.items[item_id] = ("audio", int(seconds * self.OUTPUT_AUDIO_TOKENS_PER_SECOND) + self.text_tokens(transcript))
+
+    async def send(self, message):
+        import json
+        event = json.loads(message)
+        if event["type"] == "conversation.item.delete":
+            self.items.pop(event["item_id"], None)
+            return
+        if event["type"] == "conversation.item.create":
+            text = " ".join(part.get("text", "") for part in event["item"]["content"])
+            self.items[event["item"]["id"]] = ("text", self.text_tokens(text))
+            return
+        if event["type"] != "response.create":
+            return
+        response = event.get("response", {})
+        instructions = response.get("instructions")
+        if "input" in response:
+            # only the referenced items, under the response's own instructions
+            audio = sum(self.items[ref["id"]][1] for ref in response["input"])
+            text = self.text_tokens(instructions or "")
+        else:
+            # the whole session: its instructions, every item, and any per-response instructions
+            audio = sum(tokens for _, tokens in self.items.values())
+            text = self.instructions_tokens + (self.text_tokens(instructions) if instructions else 0)
+        output_tokens = 25  # a typical one-sentence transcript
+        server_seconds = (self.FIRST_TOKEN_SECONDS + (audio + text) * self.PREFILL_SECONDS_PER_TOKEN
+                          + output_tokens * self.DECODE_SECONDS_PER_TOKEN)
+        self.responses.append({"input_text": text, "input_audio": audio, "output_text": output_tokens,
+                               "server_seconds": server_seconds})
+
+
+def bench_oob_transcription(args):
+    """OOB transcription strategies (full / reference / reference_summary): input tokens per turn and time to transcript."""
+    import asyncio
+    from chatty_config import (default_config, OOB_TRANSCRIPTION_FULL, OOB_TRANSCRIPTION_REFERENCE,
+                               OOB_TRANSCRIPTION_REFERENCE_SUMMARY)
+    from chatty_realtime_messages import on_audio_buffer_committed
+
+    turns = max(2, min(args.frames // 25, 60))
+    user_seconds, reply_seconds = 4.0, 6.0
+    reply_text = "That sounds lovely - tell me more about the garden and what you are planting this spring."
+    user_text = "I spent the morning out in the garden with Margaret planting the tomatoes."
+    cost_sheet = default_config["TOKEN_COST_PER_MILLION"]
+
+    async def run(strategy):
+        # a typical system prompt with a modest profile: ~1500 tokens of session instructions
+        server = StandInRealtimeServer(instructions_tokens=1500)
+        state = StandInState(ws=server, OOB_TRANSCRIPTION_STRATEGY=strategy, LANGUAGE="English")
+        state.transcript_history.append({"role": "system", "content": "prompt"})
+        build_seconds = 0.0
+        for turn in range(turns):
+            server.add_user_audio(f"item_user_{turn}", user_seconds)
+            start = time.perf_counter()
+            await on_audio_buffer_committed({"type": "input_audio_buffer.committed", "item_id": f"item_user_{turn}"}, state)
+            build_seconds += time.perf_counter() - start
+            state.transcript_history.append({"role": "user", "content": user_text})
+            server.add_assistant_reply(f"item_ai_{turn}", reply_seconds, reply_text)
+            state.transcript_history.append({"role": "AI", "content": reply_text})
+        return server.responses, build_seconds / turns
+
+    print(f"oob_transcription: {turns} turns of {user_seconds:.0f}s user speech / {reply_seconds:.0f}s replies "
+          f"(local realtime stand-in, modeled server time)")
+    baseline = None
+    for strategy in (OOB_TRANSCRIPTION_FULL, OOB_TRANSCRIPTION_REFERENCE, OOB_TRANSCRIPTION_REFERENCE_SUMMARY):
+        responses, build_seconds = asyncio.run(run(strategy))
+        inputs = np.array([r["input_text"] + r["input_audio"] for r in responses])
+        seconds = np.array([r["server_seconds"] for r in responses])
+        cost = sum(r["input_text"] * cost_sheet["per_input_text_token"] + r["input_audio"] * cost_sheet["per_input_audio_token"]
+                   + r["output_text"] * cost_sheet["per_output_text_token"] for r in responses) / 1_000_000
+        print(f"  {strategy:<18} input tokens/turn avg {inputs.mean():6.0f}  last {inputs[-1]:6d}   "
+              f"time to transcript avg {seconds.mean() * 1000:4.0f}  last {seconds[-1] * 1000:4.0f} ms   "
+              f"${cost:.3f} uncached   request build {build_seconds * 1e6:.0f}us"
+              + (f"   x{baseline / inputs.sum():.1f} fewer tokens" if baseline else ""))
+        baseline = baseline or inputs.sum()
+
+
+def bench_context_window(args):
+    """Context window pruning: main-response input tokens per turn over a long conversation, budget off vs on."""
+    import asyncio
+    from chatty_context_window import ContextWindow
+
+    turns = max(10, min(args.frames // 10, 150))
+    user_seconds, reply_seconds = 6.0, 10.0
+    reply_text = "That sounds lovely - tell me more about the garden and what you are planting this spring."
+    user_text = "I spent the morning out in the garden with Margaret planting the tomatoes."
+
+    async def run(budget):
+        server = StandInRealtimeServer(instructions_tokens=1500)
+        state = StandInState(ws=server, CONTEXT_WINDOW_TOKEN_BUDGET=budget, CONTEXT_WINDOW_KEEP_ITEMS=8)
+        window = ContextWindow(state)
+        inputs, prune_seconds = [], 0.0
+        for turn in range(turns):
+            user_id, ai_id = f"item_user_{turn}", f"item_ai_{turn}"
+            server.add_user_audio(user_id, user_seconds)
+            window.on_speech_started(user_id, 0)
+            window.on_speech_stopped(user_id, int(user_seconds * 1000))
+            window.on_item_added({"id": user_id, "type": "message", "role": "user", "content": [{"type": "input_audio"}]})
+            window.set_text(user_id, "user", user_text)
+            # the main response reads the instructions and every item so far
+            input_tokens = server.instructions_tokens + sum(tokens for _, tokens in server.items.values())
+            inputs.append(input_tokens)
+            server.add_assistant_reply(ai_id, reply_seconds, reply_text)
+            window.on_item_added({"id": ai_id, "type": "message", "role": "assistant", "content": [{"type": "output_audio"}]})
+            window.on_response_done({"output": [{"id": ai_id, "type": "message"}],
+                                     "usage": {"output_tokens": server.items[ai_id][1]}})
+            window.set_text(ai_id, "assistant", reply_text)
+            start = time.perf_counter()
+            await window.maybe_prune(input_tokens)
+            prune_seconds += time.perf_counter() - start
+        return np.array(inputs), window.get_stats(), prune_seconds
+
+    print(f"context_window: {turns} turns of {user_seconds:.0f}s user speech / {reply_seconds:.0f}s replies "
+          f"(local realtime stand-in)")
+    baseline = None
+    for budget in (0, 16000, 8000):
+        inputs, stats, prune_seconds = asyncio.run(run(budget))
+        label = f"budget {budget}" if budget else "no pruning"
+        print(f"  {label:<14} input tokens/turn avg {inputs.mean():6.0f}  max {inputs.max():6d}  last {inputs[-1]:6d}   "
+              f"{stats['prunes']:3d} prunes, {stats['items_pruned']:4d} items (~{stats['tokens_pruned']} tokens) "
+              f"-> {stats['recap_tokens']} token recap   prune time {prune_seconds * 1000:.1f}ms"
+              + (f"   x{baseline / inputs.sum():.1f} fewer tokens" if baseline else ""))
+        baseline = baseline or inputs.sum()
+
+
+BENCHMARKS = {
+    "resample": bench_resample,
+    "features": bench_features,
+    "noise": bench_noise,
+    "history": bench_history,
+    "playback": bench_playback,
+    "mailbox": bench_mailbox,
+    "dispatch": bench_dispatch,
+    "wake_worker": bench_wake_worker,
+    "event_parse": bench_event_parse,
+    "uplink": bench_uplink,
+    "wire_format": bench_wire_format,
+    "oob_transcription": bench_oob_transcription,
+    "context_window": bench_context_window,
+}
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Chatty Friend audio pipeline benchmarks',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all)')
+    parser.add_argument('--frames', type=int, default=1000, help='Frames (iterations) per benchmark')
+    parser.add_argument('--list', action='store_true', help='List available benchmarks')
+    parser.add_argument('--events', help='Captured websocket messages (JSONL, one raw message per line) for event_parse')
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name, fn in BENCHMARKS.items():
+            print(f"{name:<12} {fn.__doc__}")
+        return
+
+    names = args.names or list(BENCHMARKS.keys())
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    for name in names:
+        BENCHMARKS[name](args)
+        print()
+
+
+if __name__ == '__main__':
+    main()
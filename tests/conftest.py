@@ -0,0 +1,10 @@
+"""
+pytest setup for the tests directory.
+
+The tests import the chatty_* modules from the repo root.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
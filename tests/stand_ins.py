@@ -0,0 +1,42 @@
+"""
+Test Stand-ins
+
+Local stand-ins for the master state, its config manager and a realtime socket, shared by the tests
+and benchmarks.  Each test sets whatever else the code under test reads on the state it builds.
+"""
+
+import json
+
+
+class StandInConfig:
+    """ conman: get_config() from a plain dict (missing keys read as None, like an unset config value) """
+
+    def __init__(self, **config):
+        self.config = config
+
+    def get_config(self, key):
+        return self.config.get(key)
+
+
+class StandInSocket:
+    """ a realtime websocket that keeps every message sent on it, decoded """
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+    async def close(self):
+        self.closed = True
+
+
+class StandInState:
+    """ the parts of ChattyMasterState most code reads: config, the socket and the session's state """
+
+    def __init__(self, ws=None, **config):
+        self.conman = StandInConfig(**config)
+        self.ws = ws if ws is not None else StandInSocket()
+        self.remote_assistant_state = {}
+        self.transcript_history = []
@@ -0,0 +1,100 @@
+"""
+Context Window Tests
+
+Unit tests for the rolling conversation window (chatty_context_window).
+Feeds items through a stand-in session and validates what is pruned and recapped.
+"""
+
+import asyncio
+
+from chatty_context_window import ContextWindow, RECAP_HEADER
+from stand_ins import StandInState
+
+
+def window_state(budget=1000, keep=4):
+    return StandInState(CONTEXT_WINDOW_TOKEN_BUDGET=budget, CONTEXT_WINDOW_KEEP_ITEMS=keep)
+
+
+def add_turns(window, turns, transcribed=True):
+    """ user speech (10s = 100 tokens) then an assistant reply (200 output tokens) per turn """
+    for turn in range(turns):
+        user_id, ai_id = f"item_user_{turn}", f"item_ai_{turn}"
+        window.on_speech_started(user_id, turn * 20000)
+        window.on_speech_stopped(user_id, turn * 20000 + 10000)
+        window.on_item_added({"id": user_id, "type": "message", "role": "user", "content": [{"type": "input_audio"}]})
+        if transcribed:
+            window.set_text(user_id, "user", f"user turn {turn}")
+        window.on_item_added({"id": ai_id, "type": "message", "role": "assistant", "content": [{"type": "output_audio"}]})
+        window.on_response_done({"output": [{"id": ai_id, "type": "message"}], "usage": {"output_tokens": 200}})
+        window.set_text(ai_id, "assistant", f"assistant turn {turn}")
+
+
+def test_items_are_tracked_with_sizes():
+    window = ContextWindow(window_state())
+    add_turns(window, 2)
+    assert list(window.items) == ["item_user_0", "item_ai_0", "item_user_1", "item_ai_1"]
+    assert window.items["item_user_0"].tokens == 100
+    assert window.items["item_ai_0"].tokens == 200
+    assert window.items["item_user_1"].text == "user turn 1"
+    window.on_item_deleted("item_user_0")
+    assert "item_user_0" not in window.items
+
+
+def test_prune_replaces_old_audio_with_one_recap():
+    state = window_state(budget=1000, keep=6)
+    window = ContextWindow(state)
+    add_turns(window, 6)
+
+    asyncio.run(window.maybe_prune(900))
+    assert state.ws.sent == []  # under budget
+
+    asyncio.run(window.maybe_prune(1800))
+    deleted = [e["item_id"] for e in state.ws.sent if e["type"] == "conversation.item.delete"]
+    created = [e for e in state.ws.sent if e["type"] == "conversation.item.create"]
+    # aiming for half the budget (1300 tokens to free), oldest first - the last 6 items are never touched
+    assert deleted == ["item_user_0", "item_ai_0", "item_user_1", "item_ai_1", "item_user_2", "item_ai_2"]
+    assert len(created) == 1 and created[0]["previous_item_id"] == "root"
+    recap = created[0]["item"]["content"][0]["text"]
+    assert recap.startswith(RECAP_HEADER)
+    assert "User: user turn 0" in recap and "Assistant: assistant turn 2" in recap
+    assert list(window.items) == ["item_user_3", "item_ai_3", "item_user_4", "item_ai_4", "item_user_5", "item_ai_5"]
+
+    stats = window.get_stats()
+    assert stats["prunes"] == 1 and stats["items_pruned"] == 6 and stats["tokens_pruned"] == 900
+    asyncio.run(window.maybe_prune(600))
+    assert window.get_stats()["context_after_prune"] == 600
+
+
+def test_second_prune_replaces_the_recap():
+    state = window_state(budget=1000, keep=2)
+    window = ContextWindow(state)
+    add_turns(window, 3)
+    asyncio.run(window.maybe_prune(1200))
+    first_recap = window.recap_item_id
+    add_turns(window, 2)  # reuses ids 0 and 1 as new items
+    state.ws.sent.clear()
+    asyncio.run(window.maybe_prune(1200))
+    assert state.ws.sent[0] == {"type": "conversation.item.delete", "item_id": first_recap}
+    created = [e for e in state.ws.sent if e["type"] == "conversation.item.create"]
+    assert len(created) == 1 and created[0]["item"]["id"] == window.recap_item_id != first_recap
+    # the new recap carries the earlier pruned turns forward
+    assert "User: user turn 0" in created[0]["item"]["content"][0]["text"]
+
+
+def test_no_prune_without_transcripts_or_while_responding():
+    state = window_state(budget=100, keep=2)
+    window = ContextWindow(state)
+    add_turns(window, 3, transcribed=False)
+    state.remote_assistant_state["responses_in_flight"] = 1
+    asyncio.run(window.maybe_prune(5000))
+    assert state.ws.sent == []
+    state.remote_assistant_state["responses_in_flight"] = 0
+    asyncio.run(window.maybe_prune(5000))
+    # only the assistant items have text - the user's audio without a transcript stays
+    deleted = [e["item_id"] for e in state.ws.sent if e["type"] == "conversation.item.delete"]
+    assert deleted == ["item_ai_0", "item_ai_1"]
+    state.conman.config["CONTEXT_WINDOW_TOKEN_BUDGET"] = 0
+    state.ws.sent.clear()
+    add_turns(window, 3)
+    asyncio.run(window.maybe_prune(5000))
+    assert state.ws.sent == []  # 0 = off
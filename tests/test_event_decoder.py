@@ -0,0 +1,34 @@
+"""
+Event Decoder Tests
+
+Unit tests for realtime event sniffing (chatty_event_decoder).
+Classifies raw messages without a full parse and decodes audio deltas.
+"""
+
+import base64
+import json
+
+from chatty_event_decoder import EVENT_TYPE_SPAN, AUDIO_DELTA_EVENT, sniff_event_type, decode_audio_delta
+
+
+def test_type_is_sniffed_from_the_first_key():
+    event = json.dumps({"type": "response.done", "event_id": "event_1", "response": {"output": [{"type": "message"}]}})
+    assert sniff_event_type(event) == "response.done"
+    assert sniff_event_type('{"type" : "error", "error": {"type": "invalid_request_error"}}') == "error"
+
+
+def test_nested_or_late_type_falls_back_to_a_full_parse():
+    # "type" not first: the first match is the nested item's, which must not be taken as the event's
+    reordered = json.dumps({"event_id": "event_1", "item": {"type": "message"}, "type": "conversation.item.added"})
+    assert sniff_event_type(reordered) is None
+    # beyond the span
+    late = '{"event_id": "' + "x" * EVENT_TYPE_SPAN + '", "type": "response.done"}'
+    assert sniff_event_type(late) is None
+
+
+def test_audio_delta_decodes_without_parsing():
+    pcm = bytes(range(64))
+    event = json.dumps({"type": AUDIO_DELTA_EVENT, "event_id": "event_1", "item_id": "item_1",
+                        "delta": base64.b64encode(pcm).decode()})
+    assert decode_audio_delta(event) == ("item_1", pcm)
+    assert decode_audio_delta(json.dumps({"type": "response.done"})) is None
@@ -0,0 +1,101 @@
+"""
+Job Queue Tests
+
+Unit tests for the spooled background job queue (chatty_jobs).
+Runs, retries, parks and restarts jobs in a temporary spool directory.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import chatty_jobs
+from chatty_jobs import JobQueue
+
+
+async def wait_until_idle(queue, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while queue.depth() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_jobs_run_in_order_and_leave_the_spool():
+    async def run(spool_dir):
+        done = []
+
+        async def handler(master_state, payload):
+            done.append(payload["n"])
+
+        queue = JobQueue(None, spool_dir=spool_dir)
+        queue.register("note", handler)
+        queue.start()
+        for n in range(5):
+            queue.submit("note", {"n": n})
+        await wait_until_idle(queue)
+        await queue.close(timeout=0)
+        return done, queue.get_stats()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        done, stats = asyncio.run(run(spool_dir))
+        assert done == [0, 1, 2, 3, 4]
+        assert stats["completed"] == 5 and stats["depth"] == 0
+        assert [n for n in os.listdir(spool_dir) if n.endswith(".json")] == []
+
+
+def test_failures_retry_then_park_in_failed():
+    async def run(spool_dir):
+        attempts = []
+
+        def flaky(master_state, payload):
+            # blocking handlers run on a worker thread
+            attempts.append(payload["id"])
+            if payload["id"] == "always" or len(attempts) < 2:
+                raise Exception("not yet")
+
+        queue = JobQueue(None, spool_dir=spool_dir, max_attempts=3)
+        queue.register("flaky", flaky, blocking=True)
+        queue.start()
+        queue.submit("flaky", {"id": "once"})
+        await wait_until_idle(queue)
+        queue.submit("flaky", {"id": "always"})
+        await wait_until_idle(queue)
+        await queue.close(timeout=0)
+        return attempts, queue.get_stats()
+
+    saved = chatty_jobs.JOB_RETRY_BASE_SECONDS
+    chatty_jobs.JOB_RETRY_BASE_SECONDS = 0.01
+    try:
+        with tempfile.TemporaryDirectory() as spool_dir:
+            attempts, stats = asyncio.run(run(spool_dir))
+            assert attempts == ["once", "once", "always", "always", "always"]
+            assert stats["completed"] == 1 and stats["failed"] == 1 and stats["retries"] == 3
+            assert len(os.listdir(os.path.join(spool_dir, "failed"))) == 1
+    finally:
+        chatty_jobs.JOB_RETRY_BASE_SECONDS = saved
+
+
+def test_spooled_jobs_survive_a_restart():
+    async def queue_without_running(spool_dir):
+        queue = JobQueue(None, spool_dir=spool_dir)
+        queue.submit("note", {"n": 1})
+        queue.submit("note", {"n": 2})
+
+    async def restart(spool_dir):
+        done = []
+
+        async def handler(master_state, payload):
+            done.append(payload["n"])
+
+        queue = JobQueue(None, spool_dir=spool_dir)
+        queue.register("note", handler)
+        queue.start()
+        queue.start()  # idempotent - the spool is only loaded once
+        await wait_until_idle(queue)
+        await queue.close(timeout=0)
+        return done, queue.get_stats()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        asyncio.run(queue_without_running(spool_dir))
+        done, stats = asyncio.run(restart(spool_dir))
+        assert done == [1, 2]
+        assert stats["recovered"] == 2 and stats["completed"] == 2
@@ -0,0 +1,65 @@
+"""
+Mu-law Codec Tests
+
+Unit tests for the pcmu wire format (chatty_dsp).
+Compares the mu-law tables with a per-sample reference and measures the decimator.
+"""
+
+import numpy as np
+
+from chatty_dsp import mulaw_encode, mulaw_decode, PolyphaseResampler
+from chatty_send_audio import PCMU_DECIMATOR_TAPS
+
+
+def reference_encode(sample):
+    """G.711 mu-law for one int16 sample (bias 0x84, clip 32635)."""
+    sign = 0x80 if sample < 0 else 0
+    magnitude = min(abs(sample), 32635) + 0x84
+    exponent = 7
+    while exponent > 0 and not magnitude & (0x80 << exponent):
+        exponent -= 1
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def reference_decode(code):
+    code = ~code & 0xFF
+    magnitude = ((((code & 0x0F) << 3) + 0x84) << ((code >> 4) & 0x07)) - 0x84
+    return -magnitude if code & 0x80 else magnitude
+
+
+def test_encode_matches_reference():
+    samples = np.arange(-32768, 32768, 13, dtype=np.int16)
+    codes = mulaw_encode(samples)
+    assert codes.dtype == np.uint8
+    assert [int(c) for c in codes] == [reference_encode(int(s)) for s in samples]
+
+
+def test_decode_matches_reference():
+    codes = np.arange(256, dtype=np.uint8)
+    assert [int(s) for s in mulaw_decode(codes)] == [reference_decode(int(c)) for c in codes]
+    # bytes off the wire decode the same as an array
+    assert np.array_equal(mulaw_decode(codes.tobytes()), mulaw_decode(codes))
+
+
+def test_round_trip_is_within_quantization():
+    samples = np.arange(-32000, 32000, 7, dtype=np.int16)
+    decoded = mulaw_decode(mulaw_encode(samples)).astype(np.int32)
+    error = np.abs(decoded - samples)
+    # mu-law steps double each segment: error stays under ~1/16 of the magnitude (plus the first step)
+    assert np.all(error <= np.abs(samples.astype(np.int32)) // 16 + 8)
+    assert mulaw_decode(mulaw_encode(np.zeros(4, dtype=np.int16))).tolist() == [0, 0, 0, 0]
+
+
+def tone_gain_db(resampler, freq, rate=16000):
+    """Level of a 1s tone after the resampler, relative to its input (80ms frames, settling skipped)."""
+    t = np.arange(rate) / rate
+    tone = (8000 * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+    out = np.concatenate([resampler.process(tone[i:i + 1280]).copy() for i in range(0, rate, 1280)])[200:]
+    return 20 * np.log10(np.sqrt(np.mean(out.astype(np.float64) ** 2)) / (8000 / np.sqrt(2)))
+
+
+def test_pcmu_decimator_keeps_speech_and_rejects_aliases():
+    # 16kHz mic -> 8kHz pcmu: anything over 4kHz folds back into the speech band
+    assert tone_gain_db(PolyphaseResampler(up=1, down=2, taps_per_phase=PCMU_DECIMATOR_TAPS), 3000) > -1.0
+    assert tone_gain_db(PolyphaseResampler(up=1, down=2, taps_per_phase=PCMU_DECIMATOR_TAPS), 4400) < -60.0
@@ -0,0 +1,59 @@
+"""
+OOB Transcription Tests
+
+Unit tests for the out-of-band transcription request (OOB_TRANSCRIPTION_STRATEGY).
+Builds the response.create for each strategy and its fallbacks.
+"""
+
+from chatty_config import OOB_TRANSCRIPTION_FULL, OOB_TRANSCRIPTION_REFERENCE, OOB_TRANSCRIPTION_REFERENCE_SUMMARY
+from chatty_realtime_messages import build_oob_transcription_request
+from stand_ins import StandInState
+
+RECAP_MARKER = "do NOT transcribe this"
+
+
+def request(strategy, item_id="item_user_1"):
+    state = StandInState(OOB_TRANSCRIPTION_STRATEGY=strategy)
+    state.transcript_history = [
+        {"role": "user", "content": "tell me about Winnipeg"},
+        {"role": "AI", "content": "Winnipeg is the capital of Manitoba."},
+    ]
+    message = build_oob_transcription_request(state, item_id)
+    assert message["type"] == "response.create"
+    response = message["response"]
+    assert response["conversation"] == "none" and response["output_modalities"] == ["text"]
+    return response
+
+
+def assert_full(response):
+    assert "input" not in response
+    assert RECAP_MARKER not in response["instructions"]
+
+
+def test_full_reads_the_whole_session():
+    response = request(OOB_TRANSCRIPTION_FULL)
+    assert_full(response)
+    # the item id still rides along so the context window gets the text
+    assert response["metadata"] == {"kind": "transcription", "item_id": "item_user_1"}
+
+
+def test_reference_reads_only_the_committed_item():
+    response = request(OOB_TRANSCRIPTION_REFERENCE)
+    assert response["input"] == [{"type": "item_reference", "id": "item_user_1"}]
+    assert RECAP_MARKER not in response["instructions"]
+
+
+def test_reference_summary_adds_a_recap():
+    response = request(OOB_TRANSCRIPTION_REFERENCE_SUMMARY)
+    assert response["input"] == [{"type": "item_reference", "id": "item_user_1"}]
+    assert RECAP_MARKER in response["instructions"]
+    assert "User: tell me about Winnipeg\nAssistant: Winnipeg is the capital of Manitoba." in response["instructions"]
+
+
+def test_falls_back_to_full():
+    for strategy in (OOB_TRANSCRIPTION_REFERENCE, OOB_TRANSCRIPTION_REFERENCE_SUMMARY):
+        response = request(strategy, item_id=None)
+        assert_full(response)
+        assert "item_id" not in response["metadata"]
+    for strategy in ("refrence", None):
+        assert_full(request(strategy))
@@ -0,0 +1,125 @@
+"""
+Realtime Connector Tests
+
+Unit tests for realtime session pre-warming (RealtimeConnector).
+Session setup is swapped for local stand-ins - no network.
+"""
+
+import asyncio
+import json
+import time
+
+import chatty_realtime_messages
+from chatty_realtime_messages import RealtimeConnector, PreparedSession, wait_for_remote_acks
+from stand_ins import StandInSocket, StandInState
+
+
+def asleep(**config):
+    """ the state between conversations: no session open """
+    state = StandInState(**config)
+    state.ws = None
+    return state
+
+
+class RejectingSocket(StandInSocket):
+    """ a session whose server refuses the session.update """
+
+    async def recv(self):
+        await asyncio.sleep(0)
+        return json.dumps({"type": "error", "error": {"code": "invalid_value", "message": "Invalid voice"}})
+
+
+def run_with_stand_in_sessions(test):
+    """ run test(opened) with session setup replaced; opened lists the sessions it prepared """
+    opened = []
+
+    async def prepare(master_state, attempts=10, handoff_context=None):
+        await asyncio.sleep(0)
+        prepared = PreparedSession(StandInSocket(), f"sess_{len(opened)}", time.time(), {"session": "same"}, "pcm")
+        opened.append(prepared)
+        return prepared
+
+    saved = (chatty_realtime_messages.prepare_realtime_session, chatty_realtime_messages.build_session_update,
+             chatty_realtime_messages.build_system_prompt)
+    chatty_realtime_messages.prepare_realtime_session = prepare
+    chatty_realtime_messages.build_session_update = lambda master_state, prompt: ({"session": "same"}, "pcm")
+    chatty_realtime_messages.build_system_prompt = lambda master_state, handoff_context=None: "prompt"
+    try:
+        return asyncio.run(test(opened))
+    finally:
+        (chatty_realtime_messages.prepare_realtime_session, chatty_realtime_messages.build_session_update,
+         chatty_realtime_messages.build_system_prompt) = saved
+
+
+def test_off_never_prewarms():
+    async def test(opened):
+        connector = RealtimeConnector(asleep(REALTIME_PREWARM="off"))
+        connector.prewarm("tracking")
+        await asyncio.sleep(0.01)
+        assert opened == []
+        prepared = await connector.take()
+        assert opened == [prepared] and connector.adopted == 0
+    run_with_stand_in_sessions(test)
+
+
+def test_speculative_session_is_adopted():
+    async def test(opened):
+        connector = RealtimeConnector(asleep(REALTIME_PREWARM="speculative"))
+        connector.prewarm("standby")  # standby refreshes are for the standby policy only
+        assert connector._standby_task is None
+        connector.prewarm("tracking")
+        connector.prewarm("tracking")  # one open at a time
+        prepared = await connector.take()  # waits for the open in progress rather than starting over
+        assert opened == [prepared] and connector.adopted == 1 and not prepared.ws.closed
+    run_with_stand_in_sessions(test)
+
+
+def test_hourly_budget():
+    async def test(opened):
+        for budget, allowed in ((2, 2), (0, 0), (None, chatty_realtime_messages.REALTIME_PREWARM_MAX_PER_HOUR)):
+            opened.clear()
+            connector = RealtimeConnector(asleep(REALTIME_PREWARM="speculative", REALTIME_PREWARM_MAX_PER_HOUR=budget))
+            for _ in range(allowed + 3):
+                connector.prewarm("tracking")
+                await connector.take()
+            assert connector.prewarmed == connector.adopted == allowed and connector.throttled == 3
+            assert len(opened) == allowed + 3  # the throttled turns connected cold
+    run_with_stand_in_sessions(test)
+
+
+def test_unused_session_expires():
+    async def test(opened):
+        connector = RealtimeConnector(asleep(REALTIME_PREWARM="speculative", REALTIME_PREWARM_TTL_SECONDS=0.01))
+        connector.prewarm("tracking")
+        await asyncio.sleep(0.05)
+        assert connector.expired == 1 and opened[0].ws.closed
+        prepared = await connector.take()
+        assert prepared is opened[1] and connector.adopted == 0
+    run_with_stand_in_sessions(test)
+
+
+def test_setup_error_fails_fast():
+    async def test():
+        start = time.monotonic()
+        try:
+            await wait_for_remote_acks(RejectingSocket(), ["session.updated"])
+            assert False, "a rejected session.update must raise"
+        except Exception as e:
+            assert "Invalid voice" in str(e)
+        assert time.monotonic() - start < 1.0  # not the ack timeout
+    asyncio.run(test())
+
+
+def test_rejected_standby_is_discarded():
+    async def test(opened):
+        connector = RealtimeConnector(asleep(REALTIME_PREWARM="speculative"))
+        connector.prewarm("tracking")
+        await connector._standby_settled.wait()
+        # the config changed while it waited, and the server refuses the update
+        standby = opened[0]
+        standby.ws = RejectingSocket()
+        standby.session_update = {"session": "stale"}
+        prepared = await connector.take()
+        assert prepared is opened[1] and standby.ws.closed
+        assert connector.discarded == 1 and connector.adopted == 0
+    run_with_stand_in_sessions(test)
@@ -0,0 +1,134 @@
+"""
+Session Handoff Tests
+
+Unit tests for moving a conversation onto a successor session (chatty_handoff).
+Drives the swap, and the stream tracking that gates it, with a stand-in master state.
+"""
+
+import asyncio
+import json
+
+import chatty_handoff
+from chatty_context_window import ContextWindow
+from chatty_handoff import SESSION_HANDOFF_MAX_TURN_CHARS, build_handoff_context, complete_session_handoff
+from chatty_realtime_messages import PreparedSession, on_assistant_input_event
+from stand_ins import StandInSocket, StandInState
+
+
+class StandInMetrics:
+    def __init__(self):
+        self.sessions = 1
+        self.context_tokens = 0
+
+    def start_realtime_session(self):
+        self.sessions += 1
+
+
+class StandInSpeaker:
+    def __init__(self):
+        self.input_q = asyncio.Queue()
+
+
+class HandoffState(StandInState):
+    """ mid-conversation: a session open, with the parts the handoff and the event handlers touch """
+
+    def __init__(self, **config):
+        super().__init__(**config)
+        self.wire_format = "pcm"
+        self.remote_assistant_state = {"session_id": "sess_old", "session_open_time": 0}
+        self.pending_handoff = None
+        self.session_handoffs = 0
+        self.session_metrics = StandInMetrics()
+        self.context_window = ContextWindow(self)
+        self.task_managers = {"speaker": StandInSpeaker()}
+
+    async def complete_session_handoff(self, force=False):
+        return await complete_session_handoff(self, force)
+
+    def accumulate_usage(self, cost, usage=None, kind=None, latency_ms=0):
+        pass
+
+
+def successor():
+    return PreparedSession(StandInSocket(), "sess_new", 123.0, {}, "pcmu")
+
+
+def test_handoff_context_keeps_recent_turns():
+    state = HandoffState(SESSION_HANDOFF_RECENT_TURNS=3)
+    state.transcript_history = [
+        {"role": "user", "content": "first"},
+        {"role": "AI", "content": "second"},
+        {"role": "system", "content": "never handed over"},
+        {"role": "user", "content": "x" * (SESSION_HANDOFF_MAX_TURN_CHARS + 50)},
+        {"role": "AI", "content": "last"},
+    ]
+    lines = build_handoff_context(state).split("\n")
+    assert lines == ["You: second", "User: " + "x" * SESSION_HANDOFF_MAX_TURN_CHARS + "...", "You: last"]
+    state.conman.config["SESSION_HANDOFF_RECENT_TURNS"] = None  # unset falls back to 12
+    assert build_handoff_context(state).split("\n")[0] == "User: first"
+
+
+def test_handoff_waits_for_a_turn_boundary():
+    async def test():
+        state = HandoffState()
+        assert not await complete_session_handoff(state)  # nothing prepared
+        state.pending_handoff = successor()
+        for busy in ({"responses_in_flight": 1}, {"streaming_audio_item_ids": ["item_a"]}, {"user_speaking": True}):
+            state.remote_assistant_state.update(busy)
+            assert not await complete_session_handoff(state)
+            assert state.pending_handoff is not None and state.remote_assistant_state["session_id"] == "sess_old"
+            state.remote_assistant_state = {"session_id": "sess_old"}
+
+        old_ws, old_window = state.ws, state.context_window
+        assert await complete_session_handoff(state)
+        await asyncio.sleep(0)
+        assert state.ws is not old_ws and old_ws.closed and not state.ws.closed
+        assert state.remote_assistant_state == {"session_open_time": 123.0, "session_id": "sess_new"}
+        assert state.wire_format == "pcmu" and state.pending_handoff is None and state.session_handoffs == 1
+        assert state.session_metrics.sessions == 2 and state.context_window is not old_window
+    asyncio.run(test())
+
+
+def test_forced_handoff_swaps_mid_turn():
+    async def test():
+        state = HandoffState()
+        state.pending_handoff = successor()
+        state.remote_assistant_state.update({"responses_in_flight": 1, "streaming_audio_item_ids": ["item_a"]})
+        assert await complete_session_handoff(state, force=True)
+        # the old session's streaming items went with it - a barge-in can't truncate them on the new socket
+        assert state.remote_assistant_state.get("streaming_audio_item_ids") is None
+    asyncio.run(test())
+
+
+def test_end_of_stream_is_tracked_on_the_main_path():
+    async def test():
+        state = HandoffState()
+        state.pending_handoff = successor()
+        old_ws = state.ws
+        speaker_q = state.task_managers["speaker"].input_q
+        part_added = json.dumps({"type": "response.content_part.added", "item_id": "item_a", "part": {"type": "audio"}})
+        audio_done = json.dumps({"type": "response.output_audio.done", "item_id": "item_a"})
+
+        await on_assistant_input_event(part_added, state)
+        assert state.remote_assistant_state["streaming_audio_item_ids"] == ["item_a"]
+        assert not chatty_handoff.is_at_turn_boundary(state)
+
+        # the stream ending is the turn boundary: the handoff goes, and the speaker still gets the event
+        await on_assistant_input_event(audio_done, state)
+        assert state.ws is not old_ws and state.session_handoffs == 1
+        assert speaker_q.get_nowait() == audio_done and speaker_q.empty()
+    asyncio.run(test())
+
+
+def test_cancelled_response_stops_streaming():
+    async def test():
+        costs = ("per_input_text_token", "per_input_text_token_cached", "per_input_audio_token",
+                 "per_input_audio_token_cached", "per_output_text_token", "per_output_audio_token")
+        state = HandoffState(TOKEN_COST_PER_MILLION=dict.fromkeys(costs, 1.0))
+        await on_assistant_input_event(json.dumps({"type": "response.content_part.added", "item_id": "item_a",
+                                                   "part": {"type": "output_audio"}}), state)
+        # no output_audio.done after a cancel - response.done still says which items it had
+        await on_assistant_input_event(json.dumps({"type": "response.done", "response": {
+            "id": "resp_a", "status": "cancelled", "output": [{"id": "item_a", "type": "message"}]}}), state)
+        assert state.remote_assistant_state["streaming_audio_item_ids"] == []
+    asyncio.run(test())
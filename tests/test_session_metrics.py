@@ -0,0 +1,36 @@
+"""
+Session Metrics Tests
+
+Unit tests for the running conversation totals (chatty_metrics.SessionMetrics).
+Checks the totals and that the web UI snapshot is rewritten at most once a second.
+"""
+
+import os
+import tempfile
+
+import chatty_metrics
+from chatty_metrics import SessionMetrics, load_session_metrics
+
+USAGE = {"total_tokens": 300, "input_tokens": 200,
+         "input_token_details": {"audio_tokens": 200}, "output_token_details": {"audio_tokens": 100}}
+
+
+def test_totals_and_throttled_snapshot():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "metrics.json")
+        metrics = SessionMetrics(publish_path=path)
+        assert load_session_metrics(path)["responses"] == 0  # a new conversation is published at once
+
+        for _ in range(5):
+            metrics.record_response(USAGE, 0.01)
+            metrics.record_message("AI", "hello")
+        assert metrics.responses == 5 and metrics.message_count == 5 and metrics.tokens["output_audio"] == 500
+        assert metrics.context_tokens == 200
+        # all inside the first second: still the snapshot from reset()
+        assert load_session_metrics(path)["responses"] == 0 and metrics.unpublished
+
+        metrics.published_time -= chatty_metrics.SESSION_METRICS_PUBLISH_SECONDS
+        metrics.maybe_publish()
+        snapshot = load_session_metrics(path)
+        assert snapshot["responses"] == 5 and snapshot["messages"] == {"AI": 5}
+        assert not metrics.unpublished
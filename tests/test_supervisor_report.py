@@ -0,0 +1,92 @@
+"""
+Supervisor Report Tests
+
+Unit tests for handing a finished conversation to the supervisor (chatty_supervisor.report_conversation).
+A session resumed after an auto-summary must start with the resume context the report writes.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from chatty_jobs import JOB_SUPERVISOR_REPORT
+from chatty_realtime_messages import build_system_prompt
+from chatty_supervisor import report_conversation
+from stand_ins import StandInConfig, StandInState
+
+RESUME_CONTEXT = "You were helping the user plan what to plant in the garden this spring."
+
+
+class SupervisedConfig(StandInConfig):
+    """ the config calls the supervisor and the system prompt make; saves stay in memory """
+    default_config = {"VOICE_ASSISTANT_SYSTEM_PROMPT": "You are a friendly companion."}
+
+    def load_config(self):
+        pass
+
+    def save_config(self, values):
+        self.config.update(values)
+
+    def get_contact_by_type(self, contact_type):
+        return []
+
+    def save_resume_context(self, context):
+        self.save_config({"RESUME_CONTEXT": context})
+
+    def get_resume_context(self):
+        return self.config.get("RESUME_CONTEXT")
+
+
+class StandInSupervisorModel:
+    """ async_openai.responses: answers every call with the extracts, after a pause like a real call """
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(output_text=f"<summary>none</summary><resume_context>{RESUME_CONTEXT}</resume_context>")
+
+
+class StandInJobs:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, kind, payload):
+        self.submitted.append(kind)
+
+
+def finished_conversation():
+    state = StandInState(SUPERVISOR_MODEL="supervisor-model", LANGUAGE="English", USER_PROFILE=[])
+    state.conman = SupervisedConfig(**state.conman.config)
+    state.secrets_manager = SimpleNamespace(get_secret=lambda name: "key",
+                                            has_escalation_contact_configured=lambda: False,
+                                            has_email_configured=lambda: False)
+    state.async_openai = SimpleNamespace(responses=StandInSupervisorModel())
+    state.jobs = StandInJobs()
+    state.usage_history = []
+    state.get_logs_for_next_summary = lambda: []
+    state.add_log_for_next_summary = lambda log: None
+    state.transcript_history = [
+        {"role": "system", "content": "You are a friendly companion."},
+        {"role": "user", "content": "What should I plant this spring?"},
+        {"role": "AI", "content": "Tomatoes do well in a sunny spot."},
+    ]
+    return state
+
+
+def test_resumed_session_starts_with_the_new_resume_context():
+    state = finished_conversation()
+    asyncio.run(report_conversation(state, resuming=True))
+    # the next setup_assistant_session builds its prompt right after this returns
+    assert state.async_openai.responses.calls == 1
+    assert JOB_SUPERVISOR_REPORT not in state.jobs.submitted
+    assert RESUME_CONTEXT in build_system_prompt(state)
+
+
+def test_report_is_queued_when_not_resuming():
+    state = finished_conversation()
+    asyncio.run(report_conversation(state))
+    assert state.jobs.submitted == [JOB_SUPERVISOR_REPORT]
+    assert state.async_openai.responses.calls == 0
+    assert RESUME_CONTEXT not in build_system_prompt(state)
@@ -0,0 +1,75 @@
+"""
+Tone Bank Tests
+
+Regression testing for the cached tone bank (chatty_dsp.ToneBank).
+Renders every chatty_songs entry the old way and compares the cached samples.
+"""
+
+import numpy as np
+
+from chatty_config import chatty_songs, NATIVE_OAI_SAMPLE_RATE_HZ
+from chatty_dsp import ToneBank
+
+
+def legacy_chatty_tone(freq_duration_pairs, volume=0.5):
+    """The original chatty_tone: concatenate per segment, float64 result."""
+    sample_rate = NATIVE_OAI_SAMPLE_RATE_HZ
+    audio_data = np.array([], dtype=np.int16)
+    sample_multiplier = int(32767*volume)
+    for freq, duration_ms in freq_duration_pairs:
+        num_samples = int(sample_rate * duration_ms / 1000)
+        if freq == 0:
+            samples = np.zeros(num_samples, dtype=np.int16)
+        else:
+            t = np.arange(num_samples) / sample_rate
+            samples = (np.sin(2 * np.pi * freq * t) * sample_multiplier).astype(np.int16)
+        audio_data = np.concatenate([audio_data, samples])
+    return audio_data * volume
+
+
+def fade_mask(freq_duration_pairs, fade_ms):
+    """True for samples inside a tone's fade-in/fade-out."""
+    sample_rate = NATIVE_OAI_SAMPLE_RATE_HZ
+    fade_samples = int(sample_rate * fade_ms / 1000)
+    masks = []
+    for freq, duration_ms in freq_duration_pairs:
+        num_samples = int(sample_rate * duration_ms / 1000)
+        mask = np.zeros(num_samples, dtype=bool)
+        fade = min(fade_samples, num_samples // 4) if freq else 0
+        if fade:
+            mask[:fade] = True
+            mask[-fade:] = True
+        masks.append(mask)
+    return np.concatenate(masks)
+
+
+def test_bank_matches_legacy_rendering():
+    bank = ToneBank(chatty_songs)
+    for song, pairs in chatty_songs.items():
+        audio = bank.get(song)
+        # the speaker ring stores the legacy float rendering cast (truncated) to int16
+        expected = legacy_chatty_tone(pairs).astype(np.int16)
+        assert audio.dtype == np.int16, song
+        assert len(audio) == len(expected), song
+
+        faded = fade_mask(pairs, bank.fade_ms)
+        assert np.array_equal(audio[~faded], expected[~faded]), song
+        # fades only ever attenuate
+        assert np.all(np.abs(audio[faded].astype(np.int32)) <= np.abs(expected[faded].astype(np.int32)) + 1), song
+
+
+def test_bank_is_memoized_and_read_only():
+    bank = ToneBank(chatty_songs)
+    bank.render_all()
+    for song in chatty_songs:
+        audio = bank.get(song)
+        assert audio is bank.get(song)
+        assert not audio.flags.writeable
+    assert bank.get(next(iter(chatty_songs)), 0.25) is not bank.get(next(iter(chatty_songs)))
+
+
+def test_edges_fade_to_silence():
+    bank = ToneBank(chatty_songs)
+    for song in chatty_songs:
+        audio = bank.get(song).astype(np.int32)
+        assert abs(audio[0]) < 500 and abs(audio[-1]) < 500, song
@@ -0,0 +1,105 @@
+"""
+Usage Ledger Tests
+
+Unit tests for the per-response usage ledger (chatty_usage_ledger).
+Records, rolls up, saves and recovers usage in a temporary directory.
+"""
+
+import os
+import shutil
+import tempfile
+
+from chatty_config import get_current_date_string
+from chatty_usage_ledger import UsageLedger, LEDGER_RECORD
+
+USAGE = {
+    "total_tokens": 1600,
+    "input_tokens": 1200,
+    "output_tokens": 400,
+    "input_token_details": {"text_tokens": 700, "audio_tokens": 500,
+                            "cached_tokens_details": {"text_tokens": 600, "audio_tokens": 300}},
+    "output_token_details": {"text_tokens": 40, "audio_tokens": 360},
+}
+
+
+def make_ledger(root):
+    return UsageLedger(ledger_dir=os.path.join(root, "ledger"), rollup_path=os.path.join(root, "rollup.json"))
+
+
+def test_records_roll_up_by_day_month_and_kind():
+    with tempfile.TemporaryDirectory() as root:
+        ledger = make_ledger(root)
+        ledger.record(USAGE, 0.02, "main", latency_ms=850)
+        ledger.record(USAGE, 0.01, "transcription", latency_ms=300)
+
+        today = ledger.daily()
+        assert today["responses"] == 2
+        assert abs(today["cost"] - 0.03) < 1e-9
+        assert today["kinds"]["main"] == 1 and today["kinds"]["transcription"] == 1
+        assert today["tokens"]["input_audio"] == 1000 and today["tokens"]["input_audio_cached"] == 600
+        assert today["tokens"]["output_audio"] == 720
+        assert ledger.monthly()["responses"] == 2
+
+        records = ledger.load_day(get_current_date_string())
+        assert len(records) == 2
+        assert records["latency_ms"].tolist() == [850, 300]
+        assert records["input_text"].sum() == 1400
+        assert os.path.getsize(os.path.join(root, "ledger", get_current_date_string() + ".bin")) == 2 * LEDGER_RECORD.size
+
+
+def test_rollups_survive_restart():
+    with tempfile.TemporaryDirectory() as root:
+        ledger = make_ledger(root)
+        ledger.record(USAGE, 0.5, "main")
+        ledger.save()
+
+        restarted = make_ledger(root)
+        assert restarted.daily_cost() == 0.5
+        assert restarted.monthly_cost() == 0.5
+        assert restarted.daily()["responses"] == 1
+
+
+def test_unsaved_records_are_recovered_from_the_ledger():
+    with tempfile.TemporaryDirectory() as root:
+        ledger = make_ledger(root)
+        ledger.record(USAGE, 0.25, "main")
+        ledger.save()
+        # crash: these reach the ledger but never the saved rollup
+        ledger.record(USAGE, 0.25, "tool")
+        ledger.record(USAGE, 0.25, "main")
+
+        restarted = make_ledger(root)
+        assert restarted.daily()["responses"] == 3
+        assert restarted.daily_cost() == 0.75
+        assert restarted.daily()["kinds"]["tool"] == 1
+
+        # and recovering twice doesn't double count
+        assert make_ledger(root).daily()["responses"] == 3
+
+
+def test_wiped_ledger_after_save():
+    with tempfile.TemporaryDirectory() as root:
+        ledger = make_ledger(root)
+        ledger.record(USAGE, 4.0, "main")
+        ledger.record(USAGE, 4.0, "main")
+        ledger.save()
+        # reboot: the RAM drive is wiped but the saved rollup (2 records folded) survives
+        shutil.rmtree(os.path.join(root, "ledger"))
+        restarted = make_ledger(root)
+        restarted.record(USAGE, 4.0, "main")
+        # crash before the next save: the new record is only in the ledger
+        assert make_ledger(root).daily_cost() == 12.0
+
+
+def test_failed_append_is_not_counted_as_folded():
+    with tempfile.TemporaryDirectory() as root:
+        ledger = make_ledger(root)
+        day_path = os.path.join(root, "ledger", get_current_date_string() + ".bin")
+        os.makedirs(day_path)  # a directory where the day file should be - the append fails
+        ledger.record(USAGE, 4.0, "main")
+        assert ledger.write_errors == 1 and ledger.daily_cost() == 4.0
+        ledger.save()
+        os.rmdir(day_path)
+        ledger.record(USAGE, 4.0, "main")
+        # crash before the next save: the second record is the first in the file, and still recovered
+        assert make_ledger(root).daily_cost() == 8.0
@@ -10,6 +10,9 @@ Usage:
     python tests/test_wake_detection.py --id <id>    # Run specific test
     python tests/test_wake_detection.py --add        # Add new test case interactively
     python tests/test_wake_detection.py --verbose    # Verbose frame-by-frame output
+    python tests/test_wake_detection.py --cascade    # Replay through the idle-listening cascade gate (chatty_mic.WakeCascade)
+
+The bundled wake_word_test_cases.json has no recorded cases yet - add them with --add.
 """
 
 import argparse
@@ -118,6 +121,12 @@ class SimulatorConfig:
     overlap_vad_min: float = 0.18
     overlap_wake_min: float = 0.05
     overlap_lookback_frames: int = 8
+    # Idle-listening cascade (chatty_mic.WakeCascade) - off unless --cascade
+    cascade: bool = False
+    cascade_min_rms: float = 80.0
+    cascade_energy_ratio: float = 2.0
+    cascade_vad_gate: float = 0.1
+    cascade_hangover_frames: int = 12
     
     @classmethod
     def from_dict(cls, d: dict) -> 'SimulatorConfig':
@@ -159,6 +168,49 @@ class WakeDetectionSimulator:
         self.tracking_scores = []
         self.tracking_vad_scores = []
         self.result: Optional[DetectionResult] = None
+        self.cooldown_remaining = 0  # set after a detection in the real detector; replay stops at the first one
+        self.cascade = None
+        self.noise_manager = None
+        if self.config.cascade:
+            # the real gate and ambient tracker (chatty_mic needs the full runtime, so only imported for --cascade)
+            repo_root = str(Path(__file__).parent.parent)
+            if repo_root not in sys.path:
+                sys.path.insert(0, repo_root)
+            from chatty_mic import WakeCascade, AutoNoiseManager
+            self.cascade = WakeCascade(replay_frames=0)
+            self.cascade.min_rms = self.config.cascade_min_rms
+            self.cascade.energy_ratio = self.config.cascade_energy_ratio
+            self.cascade.vad_gate = self.config.cascade_vad_gate
+            self.cascade.hangover_frames = self.config.cascade_hangover_frames
+            self.noise_manager = AutoNoiseManager()
+
+    @property
+    def frames_gated(self) -> int:
+        return self.cascade.frames if self.cascade else 0
+
+    @property
+    def vad_runs(self) -> int:
+        return self.cascade.vad_runs if self.cascade else 0
+
+    @property
+    def wake_runs(self) -> int:
+        return self.cascade.wake_runs if self.cascade else 0
+    
+    def _apply_cascade(self, frame: dict) -> tuple[float, float]:
+        """
+        Drive WakeCascade the way WakeWordDetector.on_audio_buffer_in does and return the
+        (vad, wake) scores the detector would have seen: 0.0 for a tier the gate skipped.
+        Replay of skipped frames into the wake model only affects its internal state,
+        which recorded scores can't show.
+        """
+        rms = frame.get('rms', 0)
+        vad_score, wake_score = frame['vad'], frame['wake']
+        if not self.cascade.vad_open(rms, self.noise_manager.ambient_ema):
+            vad_score = 0.0
+        self.noise_manager.update(rms, vad_score)
+        if not self.cascade.wake_open(vad_score, self.tracking or self.cooldown_remaining > 0):
+            wake_score = 0.0
+        return vad_score, wake_score
     
     def process_frames(self, frames: list[dict], verbose: bool = False) -> DetectionResult:
         """
@@ -175,8 +227,11 @@ class WakeDetectionSimulator:
         last_result = None
         
         for i, frame in enumerate(frames):
-            vad_score = frame['vad']
-            wake_score = frame['wake']
+            if self.config.cascade:
+                vad_score, wake_score = self._apply_cascade(frame)
+            else:
+                vad_score = frame['vad']
+                wake_score = frame['wake']
             
             # Update history buffers (like real detector does)
             is_voice = vad_score > self.config.vad_threshold
@@ -377,13 +432,14 @@ def save_test_cases(test_file: Path, default_config: dict, test_cases: list[dict
     print(f"Saved {len(test_cases)} test cases to {test_file}")
 
 
-def run_test(test_case: dict, config: SimulatorConfig, verbose: bool = False) -> tuple[bool, str]:
+def run_test(test_case: dict, config: SimulatorConfig, verbose: bool = False,
+             simulator: Optional[WakeDetectionSimulator] = None) -> tuple[bool, str]:
     """
     Run a single test case.
     
     Returns: (passed, message)
     """
-    simulator = WakeDetectionSimulator(config)
+    simulator = simulator or WakeDetectionSimulator(config)
     
     if verbose:
         print(f"\n--- {test_case['id']}: {test_case.get('description', '')} ---")
@@ -409,14 +465,15 @@ def run_test(test_case: dict, config: SimulatorConfig, verbose: bool = False) ->
     return True, f"{result.outcome}" + (f" ({result.reason})" if result.reason else "")
 
 
-def run_all_tests(test_file: Path, test_id: Optional[str] = None, verbose: bool = False):
+def run_all_tests(test_file: Path, test_id: Optional[str] = None, verbose: bool = False, cascade: bool = False):
     """Run all tests (or a specific test) and report results."""
     
     default_config, test_cases = load_test_cases(test_file)
     config = SimulatorConfig.from_dict(default_config)
+    config.cascade = cascade or config.cascade
     
     if not test_cases:
-        print("No test cases found.")
+        print(f"No test cases found in {test_file} - record some with --add.")
         return
     
     # Filter to specific test if requested
@@ -431,9 +488,14 @@ def run_all_tests(test_file: Path, test_id: Optional[str] = None, verbose: bool
     
     passed = 0
     failed = 0
+    frames_gated = vad_runs = wake_runs = 0
     
     for tc in test_cases:
-        success, message = run_test(tc, config, verbose=verbose)
+        simulator = WakeDetectionSimulator(config)
+        success, message = run_test(tc, config, verbose=verbose, simulator=simulator)
+        frames_gated += simulator.frames_gated
+        vad_runs += simulator.vad_runs
+        wake_runs += simulator.wake_runs
         
         status = "[PASS]" if success else "[FAIL]"
         expected = tc.get('expected_outcome', 'unknown')
@@ -449,6 +511,9 @@ def run_all_tests(test_file: Path, test_id: Optional[str] = None, verbose: bool
     
     print()
     print(f"Results: {passed}/{passed + failed} passed ({100 * passed / (passed + failed):.1f}%)")
+    if config.cascade and frames_gated:
+        print(f"Cascade: {frames_gated} frames, VAD ran on {100 * vad_runs / frames_gated:.1f}%, "
+              f"wake model on {100 * wake_runs / frames_gated:.1f}%")
     
     return failed == 0
 
@@ -565,12 +630,14 @@ Examples:
   python tests/test_wake_detection.py --id tp_1   # Run specific test
   python tests/test_wake_detection.py --add        # Add new test interactively
   python tests/test_wake_detection.py --verbose    # Verbose output
+  python tests/test_wake_detection.py --cascade    # Same cases through chatty_mic.WakeCascade
         """
     )
     parser.add_argument('--id', help='Run specific test case by ID')
     parser.add_argument('--add', action='store_true', help='Add new test case interactively')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose frame-by-frame output')
     parser.add_argument('--test-file', default=None, help='Path to test cases JSON file')
+    parser.add_argument('--cascade', action='store_true', help='Gate frames through the energy/VAD cascade first')
     
     args = parser.parse_args()
     
@@ -589,7 +656,7 @@ Examples:
     if args.add:
         add_test_interactive(test_file)
     else:
-        success = run_all_tests(test_file, test_id=args.id, verbose=args.verbose)
+        success = run_all_tests(test_file, test_id=args.id, verbose=args.verbose, cascade=args.cascade)
         sys.exit(0 if success else 1)
 
 
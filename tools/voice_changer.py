@@ -62,4 +62,7 @@ class VoiceChanger(LLMTool):
         except Exception as e:
             return f"Error changing voice: {str(e)}. Please try again."
 
+        if setting_type == "volume":
+            # the speaker picks up volume changes from the config as soon as they are saved
+            return f"Successfully changed volume to {new_value}. The change takes effect right away."
         return f"Let the user know that the change will take effect next time the assistant is goes to sleep and wakes up. Successfully changed {setting_type} to {new_value} on next wake event."
\ No newline at end of file